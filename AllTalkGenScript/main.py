@@ -1,125 +1,665 @@
 import os
+import sys
 import json
-import requests
+import time
+import random
+import hashlib
+import argparse
+import wave
+import shutil
+import tempfile
+import threading
 import subprocess
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AllTalkGenScript.segment_cache import SegmentCache, wav_format  # noqa: E402
+from MediaGenCommon.catalog import asset_key, playlist_path  # noqa: E402
+from MediaGenCommon.job_manifest import DONE, JobManifest, atomic_output  # noqa: E402
+
+
+CHARACTER_VOICE = "WojciechZoladkowiczV2.wav"
+RVC_VOICE = r"W.Zoladkowicz18minMUSTAR\W.Zoladkowicz18minMUSTAR_e114_s9120.pth"
+LANGUAGE = "pl"
+# Ponawianie zapytań TTS
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+# (połączenie, odczyt) w sekundach; synteza długiego segmentu trwa długo
+REQUEST_TIMEOUT = (5, 600)
+# Odpowiedzi oznaczające chwilowy problem serwera, warte ponowienia
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# Odpowiedzi oznaczające przeciążenie, które otwierają bezpiecznik od razu
+OVERLOAD_STATUSES = {429, 503}
+# Błędy połączenia i przerwanej lub uszkodzonej odpowiedzi, warte ponowienia
+RETRY_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+)
+CHUNK_SIZE = 64 * 1024
+# Szerokość próbki WAV (w bajtach) -> surowy format wejściowy ffmpeg
+SAMPLE_FORMATS = {1: "u8", 2: "s16le", 3: "s24le", 4: "s32le"}
+# Średnia liczba zdań w segmencie TTS przy stałych granicach (wyznacza je treść zdań)
+BOUNDARY_SENTENCES = 4
+# Długość segmentu HLS w sekundach; krótszy segment to szybszy start odtwarzania
+HLS_SEGMENT_SECONDS = 4
 
 
-def split_text(text, max_length=2000):
-    sentences = text.split(". ")
+def is_boundary(sentence):
+    """Czy segment kończy się po tym zdaniu; zależy tylko od treści zdania."""
+    digest = hashlib.sha256(sentence.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % BOUNDARY_SENTENCES == 0
+
+
+def split_text(text, max_length=2000, stable=False):
+    """
+    Dzieli tekst na segmenty złożone z całych zdań.
+
+    Domyślnie zdania są pakowane do segmentu aż do ``max_length`` znaków.
+    Przy ``stable=True`` segment kończy się też po zdaniu wskazanym przez
+    ``is_boundary`` (średnio co ``BOUNDARY_SENTENCES`` zdań). Granice zależą
+    wtedy od treści zdań, a nie od ich położenia, więc edycja jednego zdania
+    zmienia tylko jego segment, a pozostałe segmenty trafiają w cache.
+    """
     segments = []
     current_segment = ""
-    for sentence in sentences:
-        if len(current_segment) + len(sentence) + 1 <= max_length:
-            current_segment += sentence + ". "
-        else:
+    for sentence in text.split(". "):
+        if current_segment and len(current_segment) + len(sentence) + 1 > max_length:
             segments.append(current_segment.strip())
-            current_segment = sentence + ". "
+            current_segment = ""
+        current_segment += sentence + ". "
+        if stable and is_boundary(sentence):
+            segments.append(current_segment.strip())
+            current_segment = ""
     if current_segment:
         segments.append(current_segment.strip())
     return segments
 
 
-def generate_tts(text, server_ip, server_port, output_file):
+class Counters:
+    """Liczniki ponowień i błędów współdzielone przez wątki."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {"requests": 0, "retries": 0, "failures": 0, "circuit_opened": 0}
+
+    def inc(self, name):
+        with self.lock:
+            self.values[name] += 1
+
+    def __str__(self):
+        with self.lock:
+            return ", ".join(f"{k}={v}" for k, v in self.values.items())
+
+
+STATS = Counters()
+
+
+class CircuitBreaker:
+    """
+    Bezpiecznik serwera: po serii błędów lub odpowiedzi o przeciążeniu
+    wstrzymuje wysyłanie zapytań do serwera na czas ``cooldown``.
+    """
+
+    def __init__(self, threshold=3, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.open_until = 0.0
+
+    def remaining(self):
+        with self.lock:
+            return max(0.0, self.open_until - time.monotonic())
+
+    def is_open(self):
+        return self.remaining() > 0
+
+    def wait(self):
+        delay = self.remaining()
+        if delay:
+            time.sleep(delay)
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+
+    def record_failure(self, overloaded=False):
+        with self.lock:
+            self.failures += 1
+            if overloaded or self.failures >= self.threshold:
+                self.failures = 0
+                self.open_until = time.monotonic() + self.cooldown
+                opened = True
+            else:
+                opened = False
+        if opened:
+            STATS.inc("circuit_opened")
+
+
+class RetryableError(Exception):
+    def __init__(self, message, overloaded=False):
+        super().__init__(message)
+        self.overloaded = overloaded
+
+
+class TTSServer:
+    """Jeden serwer AllTalk z własną sesją HTTP (keep-alive) i limitem zapytań."""
+
+    def __init__(self, address, max_in_flight=2):
+        host, _, port = address.partition(":")
+        self.ip = host
+        self.port = port or "7851"
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.breaker = CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount("http://", adapter)
+
+    def __str__(self):
+        return f"{self.ip}:{self.port}"
+
+
+class ServerPool:
+    """Rozdziela zapytania TTS między serwery, wybierając najmniej obciążony."""
+
+    def __init__(self, servers):
+        self.servers = servers
+        self.condition = threading.Condition()
+
+    @property
+    def capacity(self):
+        return sum(server.max_in_flight for server in self.servers)
+
+    @contextmanager
+    def acquire(self):
+        with self.condition:
+            while True:
+                free = [
+                    s
+                    for s in self.servers
+                    if s.in_flight < s.max_in_flight and not s.breaker.is_open()
+                ]
+                if free:
+                    server = min(free, key=lambda s: s.in_flight / s.max_in_flight)
+                    server.in_flight += 1
+                    break
+                # Serwery z otwartym bezpiecznikiem wracają po upływie cooldown
+                pauses = [s.breaker.remaining() for s in self.servers]
+                pauses = [pause for pause in pauses if pause > 0]
+                self.condition.wait(timeout=min(pauses) if pauses else None)
+        try:
+            yield server
+        finally:
+            with self.condition:
+                server.in_flight -= 1
+                self.condition.notify()
+
+
+def backoff_delay(attempt):
+    """Wykładnicze opóźnienie z pełnym losowym rozrzutem (full jitter)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def check_status(response, action):
+    if response.status_code == 200:
+        return
+    message = f"{action}: HTTP {response.status_code}"
+    if response.status_code in RETRY_STATUSES:
+        raise RetryableError(
+            message, overloaded=response.status_code in OVERLOAD_STATUSES
+        )
+    raise requests.HTTPError(message, response=response)
+
+
+def download_to_file(session, url, output_file):
+    """Pobiera plik strumieniowo, fragmentami, bez trzymania go w pamięci."""
+    with session.get(url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        check_status(response, "Błąd podczas pobierania pliku")
+        expected = response.headers.get("Content-Length")
+        written = 0
+        with open(output_file, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                written += len(chunk)
+    if expected is not None and written != int(expected):
+        raise RetryableError(f"Niepełny plik ({written}/{expected} B): {url}")
+
+
+def generate_tts(
+    text, server_ip, server_port, output_file, session=requests, breaker=None
+):
     url = f"http://{server_ip}:{server_port}/api/tts-generate"
     payload = {
         "text_input": text,
         "text_filtering": "none",
-        "character_voice_gen": "WojciechZoladkowiczV2.wav",
-        "rvccharacter_voice_gen": "W.Zoladkowicz18minMUSTAR\W.Zoladkowicz18minMUSTAR_e114_s9120.pth",
+        "character_voice_gen": CHARACTER_VOICE,
+        "rvccharacter_voice_gen": RVC_VOICE,
         "narrator_enabled": "false",
-        "language": "pl",
+        "language": LANGUAGE,
     }
-    response = requests.post(url, data=payload)
-    if response.status_code == 200:
-        response_json = response.json()
-        download_url = f"http://{server_ip}:{server_port}{response_json.get('output_cache_url')}"
-        download_response = requests.get(download_url)
-        if download_response.status_code != 200:
-            print(f"Błąd podczas pobierania pliku: {download_url}")
+    for attempt in range(MAX_RETRIES + 1):
+        if breaker:
+            breaker.wait()
+        STATS.inc("requests")
+        try:
+            response = session.post(url, data=payload, timeout=REQUEST_TIMEOUT)
+            check_status(response, "Błąd podczas generowania TTS")
+            response_json = response.json()
+            download_url = f"http://{server_ip}:{server_port}{response_json.get('output_cache_url')}"
+            download_to_file(session, download_url, output_file)
+        except (RetryableError, *RETRY_EXCEPTIONS) as e:
+            overloaded = getattr(e, "overloaded", False)
+            if breaker:
+                breaker.record_failure(overloaded)
+            if attempt == MAX_RETRIES:
+                print(f"{e} (po {MAX_RETRIES} ponowieniach)")
+                break
+            STATS.inc("retries")
+            time.sleep(backoff_delay(attempt))
+        except (requests.RequestException, ValueError) as e:
+            print(e)
+            break
+        else:
+            if breaker:
+                breaker.record_success()
+            return output_file
+    STATS.inc("failures")
+    return None
+
+
+def generate_tts_on_pool(text, pool, output_file):
+    with pool.acquire() as server:
+        return generate_tts(
+            text,
+            server.ip,
+            server.port,
+            output_file,
+            session=server.session,
+            breaker=server.breaker,
+        )
+
+
+def cached_segment(segment, key, pool, cache):
+    """Zwraca ścieżkę segmentu z cache, syntetyzując go tylko przy braku."""
+    path = cache.get(key)
+    if path:
+        return path
+    temp_file = cache.temp_path()
+    if generate_tts_on_pool(segment, pool, temp_file):
+        try:
+            return cache.put(key, temp_file)
+        except ValueError as e:
+            print(e)
             return None
-        with open(output_file, "wb") as f:
-            f.write(download_response.content)
-        return output_file
+    os.remove(temp_file)
+    return None
+
+
+def segment_keys(name, recipe, max_length, stable=False):
+    text_input = f"{name.replace('_',' ')}. {recipe}"
+    segments = split_text(text_input, max_length, stable)
+    keys = [
+        SegmentCache.key(segment, CHARACTER_VOICE, RVC_VOICE, LANGUAGE)
+        for segment in segments
+    ]
+    return segments, keys
+
+
+def resynthesize_mismatched(audio_files, segments, keys, pool, cache, segment_executor):
+    """
+    Syntezuje ponownie segmenty w innym formacie WAV niż pozostałe.
+
+    Wzorcem jest format ostatnio syntezowanego segmentu, a gdy cache go
+    nie zna (segmenty sprzed zapisu formatu), format większości segmentów.
+    """
+    formats = [wav_format(path) for path in audio_files]
+    reference = cache.format or max(set(formats), key=formats.count)
+    stale = [i for i, fmt in enumerate(formats) if fmt != reference]
+    for i in stale:
+        cache.evict(audio_files[i])
+    futures = {
+        i: segment_executor.submit(cached_segment, segments[i], keys[i], pool, cache)
+        for i in stale
+    }
+    audio_files = list(audio_files)
+    for i, future in futures.items():
+        audio_files[i] = future.result()
+    return audio_files
+
+
+def synthesize_recipe(
+    final_audio, segments, keys, pool, cache, segment_executor, encode_executor
+):
+    with cache.pinned_paths([cache.path(key) for key in keys]):
+        # Segmenty generowane są równolegle, ale składane w oryginalnej kolejności
+        futures = [
+            segment_executor.submit(cached_segment, segment, key, pool, cache)
+            for segment, key in zip(segments, keys)
+        ]
+        audio_files = [f.result() for f in futures]
+        if all(audio_files):
+            audio_files = resynthesize_mismatched(
+                audio_files, segments, keys, pool, cache, segment_executor
+            )
+        if not all(audio_files):
+            print(f"Nie udało się wygenerować wszystkich segmentów: {final_audio}")
+            return False
+        # Kodowanie w osobnym procesie, żeby nie blokowało pobierania segmentów
+        if not encode_executor.submit(
+            combine_audio_files, audio_files, final_audio
+        ).result():
+            return False
+    print(f"Pomyślnie wygenerowano plik: {final_audio}")
+    return True
+
+
+def audio_output_path(output_root, audio):
+    """
+    Ścieżka nagrania w ``output_root``: nazwa pliku małymi literami, folder
+    bez zmian (jak w kluczach ``audio`` katalogu). Ta sama ścieżka trafia
+    do rejestru zadań i jest zapisywana przez ``combine_audio_files``.
+    """
+    return os.path.join(output_root, *asset_key(audio).split("/"))
+
+
+def audio_fingerprint(keys):
+    # Odcisk zmienia się razem z treścią dowolnego segmentu
+    return hashlib.sha256("".join(keys).encode()).hexdigest()
+
+
+def process_recipe(
+    final_audio,
+    segments,
+    keys,
+    pool,
+    cache,
+    manifest,
+    segment_executor,
+    encode_executor,
+):
+    manifest.start("audio", final_audio)
+    try:
+        ok = synthesize_recipe(
+            final_audio, segments, keys, pool, cache, segment_executor, encode_executor
+        )
+    except Exception as e:
+        # Np. uszkodzony segment; błąd jednego przepisu nie przerywa całej partii
+        print(f"Błąd generowania pliku {final_audio}: {e}")
+        manifest.fail("audio", final_audio, str(e))
+        return
+    if ok:
+        manifest.finish("audio", final_audio)
     else:
-        print(f"Błąd podczas generowania TTS: {response.status_code}")
-        return None
+        manifest.fail("audio", final_audio)
 
 
-def process_json_files(folder_path, server_ip, server_port):
+def process_json_files(
+    folder_path,
+    pool,
+    cache,
+    manifest,
+    max_length=2000,
+    encode_workers=None,
+    stable_segments=False,
+):
     output_root = "audio-output"
     os.makedirs(output_root, exist_ok=True)
+    encode_workers = encode_workers or os.cpu_count() or 1
 
-    for filename in os.listdir(folder_path):
-        if filename.endswith(".json"):
-            file_path = os.path.join(folder_path, filename)
-            json_name = os.path.splitext(filename)[0]
-            json_output_folder = os.path.join(output_root, json_name)
-            os.makedirs(json_output_folder, exist_ok=True)
+    # Osobne pule: zadania przepisów czekają na segmenty i kodowanie, więc
+    # przepisów jest tyle, by serwery TTS były zajęte także podczas kodowania
+    with ThreadPoolExecutor(
+        pool.capacity + encode_workers
+    ) as recipe_executor, ThreadPoolExecutor(
+        pool.capacity
+    ) as segment_executor, ProcessPoolExecutor(
+        encode_workers
+    ) as encode_executor:
+        recipe_futures = []
+        for filename in os.listdir(folder_path):
+            if filename.endswith(".json"):
+                file_path = os.path.join(folder_path, filename)
+                json_name = os.path.splitext(filename)[0]
+                json_output_folder = os.path.join(output_root, json_name)
+                os.makedirs(json_output_folder, exist_ok=True)
 
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                for idx, entry in enumerate(data):
+                with open(file_path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+                for entry in data:
                     name = entry.get("name", "").replace(" ", "_")
                     recipe = entry.get("recipe", "")
-                    if name and recipe:
-                        # Konstruuj final_audio z małymi literami w nazwie pliku
-                        final_audio = os.path.join(
-                            json_output_folder, f"{name}.opus".lower()
-                        )
-                        if os.path.isfile(final_audio):
-                            print(
-                                f"Plik {final_audio} już istnieje. Pomijanie."
-                            )
-                            continue
-                        text_input = f"{name.replace('_',' ')}. {recipe}"
-                        segments = split_text(text_input)
-                        audio_files = []
-                        for i, segment in enumerate(segments):
-                            temp_file = os.path.join(
-                                json_output_folder, f"temp_{idx}_{i}.wav"
-                            )
-                            audio_file = generate_tts(
-                                segment, server_ip, server_port, temp_file
+                    if not (name and recipe):
+                        continue
+                    final_audio = audio_output_path(
+                        output_root, f"{json_name}/{name}.opus"
+                    )
+                    segments, keys = segment_keys(
+                        name, recipe, max_length, stable_segments
+                    )
+                    fingerprint = audio_fingerprint(keys)
+                    if manifest.sync("audio", final_audio, fingerprint) == DONE:
+                        # Nagrania sprzed segmentacji dostają tylko playlistę
+                        if not os.path.isfile(playlist_path(final_audio)):
+                            recipe_futures.append(
+                                encode_executor.submit(package_hls, final_audio)
                             )
-                            if audio_file:
-                                audio_files.append(audio_file)
-                        if audio_files:
-                            combine_audio_files(audio_files, final_audio)
-                            for file in audio_files:
-                                os.remove(file)
-                            print(f"Pomyślnie wygenerowano plik: {final_audio}")
+                        continue
+                    recipe_futures.append(
+                        recipe_executor.submit(
+                            process_recipe,
+                            final_audio,
+                            segments,
+                            keys,
+                            pool,
+                            cache,
+                            manifest,
+                            segment_executor,
+                            encode_executor,
+                        )
+                    )
+        print(f"Zadania audio do wykonania: {len(recipe_futures)}")
+        failed = 0
+        for future in recipe_futures:
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Błąd zadania audio: {e}")
+        if failed:
+            print(f"Nieudane zadania audio: {failed}")
+
+
+def read_pcm(path):
+    """Zwraca parametry i surowe próbki PCM pliku WAV."""
+    with wave.open(path, "rb") as wav:
+        params = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+        return params, wav.readframes(wav.getnframes())
 
 
 def combine_audio_files(audio_files, output_file):
-    output_file = output_file.lower()
-    with open("file_list.txt", "w") as f:
-        for file in audio_files:
-            f.write(f"file '{os.path.relpath(file)}'\n")
+    """
+    Skleja segmenty WAV w pamięci i przesyła PCM do ffmpeg przez stdin.
+
+    Wynik trafia najpierw do unikalnego pliku tymczasowego obok pliku
+    docelowego i jest podmieniany dopiero po udanym kodowaniu, więc
+    równoległe zadania nie współdzielą żadnych plików pośrednich.
+    """
+    params = None
+    chunks = []
+    for file in audio_files:
+        file_params, frames = read_pcm(file)
+        if params and file_params != params:
+            raise ValueError(f"Niezgodny format segmentu: {file}")
+        params = file_params
+        chunks.append(frames)
+    channels, sample_width, rate = params
+    if sample_width not in SAMPLE_FORMATS:
+        raise ValueError(f"Nieobsługiwana szerokość próbki: {sample_width}")
+
+    with atomic_output(output_file) as temp_output:
+        returncode = encode_pcm(
+            b"".join(chunks), channels, sample_width, rate, temp_output
+        )
+        if returncode != 0:
+            print(f"Błąd ffmpeg ({returncode}) dla pliku: {output_file}")
+            return None
+    # Brak playlisty nie blokuje odtwarzania całego pliku
+    package_hls(output_file)
+    return output_file
+
+
+def package_hls(audio_file, segment_seconds=HLS_SEGMENT_SECONDS):
+    """
+    Dzieli gotowe nagranie na krótkie segmenty fMP4 z playlistą HLS
+    (``<nagranie>.hls/index.m3u8``), dzięki czemu odtwarzacz może zacząć
+    po pobraniu playlisty i pierwszego segmentu, a przewijanie pobiera
+    tylko potrzebne segmenty. Dźwięk jest kopiowany bez ponownego
+    kodowania. Folder playlisty jest budowany obok i podmieniany w całości.
+    """
+    playlist = playlist_path(audio_file)
+    folder = os.path.dirname(playlist)
+    temp_folder = tempfile.mkdtemp(prefix=".hls-", dir=os.path.dirname(folder))
     command = [
         "ffmpeg",
+        "-y",
+        "-i",
+        audio_file,
+        "-c:a",
+        "copy",
         "-f",
-        "concat",
-        "-safe",
-        "0",
+        "hls",
+        "-hls_time",
+        str(segment_seconds),
+        "-hls_playlist_type",
+        "vod",
+        "-hls_segment_type",
+        "fmp4",
+        "-hls_fmp4_init_filename",
+        "init.mp4",
+        "-hls_segment_filename",
+        os.path.join(temp_folder, "seg_%05d.m4s"),
+        os.path.join(temp_folder, os.path.basename(playlist)),
+    ]
+    result = subprocess.run(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    if result.returncode != 0:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        print(f"Błąd ffmpeg ({result.returncode}) przy segmentacji: {audio_file}")
+        return None
+    # Stary folder jest odsuwany, bo rename nie nadpisuje niepustego folderu
+    old_folder = f"{temp_folder}.old"
+    if os.path.isdir(folder):
+        os.rename(folder, old_folder)
+    os.rename(temp_folder, folder)
+    shutil.rmtree(old_folder, ignore_errors=True)
+    return playlist
+
+
+def encode_pcm(pcm, channels, sample_width, rate, output_file):
+    command = [
+        "ffmpeg",
+        "-y",
+        "-f",
+        SAMPLE_FORMATS[sample_width],
+        "-ar",
+        str(rate),
+        "-ac",
+        str(channels),
         "-i",
-        "file_list.txt",
+        "pipe:0",
         "-c:a",
         "libopus",
         "-b:a",
         "48k",
         "-ar",
         "48000",
+        "-f",
+        "opus",
         output_file,
     ]
-    # subprocess.run(command)
-    subprocess.run(
-        command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    result = subprocess.run(
+        command, input=pcm, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
     )
-    os.remove("file_list.txt")
+    return result.returncode
 
 
-# Przykład użycia
-folder_path = "json-input"
-server_ip = "127.0.0.1"
-server_port = "7851"
-process_json_files(folder_path, server_ip, server_port)
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generowanie narracji TTS przepisów przez serwery AllTalk"
+    )
+    parser.add_argument("--input", default="json-input", help="Folder z plikami JSON")
+    parser.add_argument(
+        "--server",
+        action="append",
+        help="Adres serwera AllTalk host:port (można podać wielokrotnie)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=2,
+        help="Maksymalna liczba równoczesnych zapytań na serwer",
+    )
+    parser.add_argument(
+        "--cache-dir", default="tts-cache", help="Folder cache segmentów TTS"
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=2048,
+        help="Maksymalny rozmiar cache segmentów w MB",
+    )
+    parser.add_argument(
+        "--max-segment-length",
+        type=int,
+        default=2000,
+        help="Maksymalna długość segmentu; mniejsza daje dokładniejszy cache",
+    )
+    parser.add_argument(
+        "--stable-segments",
+        action="store_true",
+        help="Granice segmentów według treści zdań: edycja zdania nie unieważnia "
+        "cache pozostałych segmentów (zmienia podział istniejących nagrań)",
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=None,
+        help="Liczba procesów kodujących audio (domyślnie liczba rdzeni)",
+    )
+    parser.add_argument(
+        "--manifest",
+        default="jobs.sqlite3",
+        help="Plik rejestru zadań, pozwalający wznowić przerwane generowanie",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    servers = [
+        TTSServer(address, args.max_in_flight)
+        for address in (args.server or ["127.0.0.1:7851"])
+    ]
+    cache = SegmentCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    manifest = JobManifest(args.manifest)
+    process_json_files(
+        args.input,
+        ServerPool(servers),
+        cache,
+        manifest,
+        args.max_segment_length,
+        args.encode_workers,
+        args.stable_segments,
+    )
+    print(f"Statystyki zapytań TTS: {STATS}")
+    print(f"Stan zadań audio: {manifest.counts('audio')}")
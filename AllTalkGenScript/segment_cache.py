@@ -0,0 +1,153 @@
+import os
+import json
+import wave
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Plik z formatem WAV segmentów zwracanych ostatnio przez serwer TTS
+FORMAT_FILE = "format.json"
+
+
+def wav_format(path):
+    """
+    Zwraca (kanały, szerokość próbki, częstotliwość) pliku WAV albo None,
+    gdy pliku nie ma lub jest uszkodzony.
+    """
+    try:
+        with wave.open(path, "rb") as wav:
+            return (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+class SegmentCache:
+    """
+    Cache segmentów TTS adresowany treścią.
+
+    Każdy segment jest zapisywany pod skrótem SHA-256 z (tekst, głos,
+    model RVC, język), więc zmiana jednego zdania przepisu wymaga
+    syntezy tylko segmentów, których treść się zmieniła. Rozmiar cache
+    jest ograniczony; przy przekroczeniu usuwane są najdawniej używane
+    pliki (LRU według mtime, odświeżanego przy każdym trafieniu).
+
+    Cache pamięta format WAV ostatnio syntezowanego segmentu; segment
+    w innym formacie (np. po zmianie ustawień serwera) albo uszkodzony
+    jest przy odczycie usuwany i traktowany jak brak w cache.
+    """
+
+    def __init__(self, root="tts-cache", max_bytes=2 * 1024**3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pinned = {}
+        os.makedirs(root, exist_ok=True)
+        self.sizes = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(".wav"):
+                    path = os.path.join(dirpath, filename)
+                    self.sizes[path] = os.path.getsize(path)
+        self.total_bytes = sum(self.sizes.values())
+        self.format = None
+        try:
+            with open(os.path.join(root, FORMAT_FILE), "r", encoding="utf-8") as f:
+                self.format = tuple(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(text, voice, rvc_model, language):
+        data = json.dumps([text, voice, rvc_model, language], ensure_ascii=False)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.wav")
+
+    def get(self, key):
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        fmt = wav_format(path)
+        if fmt is None or (self.format is not None and fmt != self.format):
+            self.evict(path)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def temp_path(self):
+        fd, path = tempfile.mkstemp(suffix=".part", dir=self.root)
+        os.close(fd)
+        return path
+
+    def put(self, key, source_path):
+        fmt = wav_format(source_path)
+        if fmt is None:
+            os.remove(source_path)
+            raise ValueError(f"Uszkodzony plik WAV segmentu: {key}")
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(source_path, path)
+        size = os.path.getsize(path)
+        with self.lock:
+            self.total_bytes += size - self.sizes.get(path, 0)
+            self.sizes[path] = size
+            if fmt != self.format:
+                self._save_format(fmt)
+            self._evict(keep=path)
+        return path
+
+    def _save_format(self, fmt):
+        self.format = fmt
+        temp_path = self.temp_path()
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(list(fmt), f)
+        os.replace(temp_path, os.path.join(self.root, FORMAT_FILE))
+
+    def evict(self, path):
+        """Usuwa segment z cache (np. w nieaktualnym formacie)."""
+        with self.lock:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= self.sizes.pop(path, 0)
+
+    def _evict(self, keep):
+        if self.total_bytes <= self.max_bytes:
+            return
+        by_age = []
+        for path in self.sizes:
+            try:
+                by_age.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                by_age.append((0, path))
+        for _, path in sorted(by_age):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if path == keep or path in self.pinned:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= self.sizes.pop(path)
+
+    @contextmanager
+    def pinned_paths(self, paths):
+        """Chroni segmenty przed usunięciem na czas składania pliku końcowego."""
+        with self.lock:
+            for path in paths:
+                self.pinned[path] = self.pinned.get(path, 0) + 1
+        try:
+            yield paths
+        finally:
+            with self.lock:
+                for path in paths:
+                    self.pinned[path] -= 1
+                    if not self.pinned[path]:
+                        del self.pinned[path]
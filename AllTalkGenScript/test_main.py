@@ -0,0 +1,295 @@
+import os
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+
+from AllTalkGenScript.main import (
+    BACKOFF_BASE,
+    BACKOFF_MAX,
+    MAX_RETRIES,
+    CircuitBreaker,
+    ServerPool,
+    TTSServer,
+    audio_fingerprint,
+    backoff_delay,
+    generate_tts,
+    is_boundary,
+    process_recipe,
+    segment_keys,
+    split_text,
+    synthesize_recipe,
+)
+from AllTalkGenScript.segment_cache import SegmentCache, wav_format
+from MediaGenCommon.job_manifest import FAILED, JobManifest
+
+
+def recipe_text(count):
+    return ". ".join(
+        f"Krok {i}: mieszaj składniki przez {i + 1} minut" for i in range(count)
+    )
+
+
+def write_wav(path, rate=24000, channels=1, frames=240):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\0\0" * channels * frames)
+
+
+class SegmentKeysTestCase(TestCase):
+    def test_default_packs_sentences_up_to_max_length(self):
+        text = recipe_text(40)
+        self.assertEqual(split_text(text, max_length=2000), [f"{text}."])
+        segments = split_text(text, max_length=120)
+        self.assertEqual(" ".join(segments), f"{text}.")
+        for segment, following in zip(segments, segments[1:]):
+            self.assertLessEqual(len(segment), 120)
+            next_sentence = following.split(". ")[0]
+            self.assertGreater(len(segment) + len(next_sentence) + 2, 120)
+
+    def test_stable_segments_are_whole_sentences(self):
+        text = recipe_text(40)
+        segments = split_text(text, max_length=2000, stable=True)
+        self.assertGreater(len(segments), 1)
+        self.assertEqual(" ".join(segments), f"{text}.")
+        for segment in split_text(text, max_length=120, stable=True):
+            self.assertLessEqual(len(segment), 120)
+
+    def test_sentence_edit_changes_one_segment(self):
+        sentences = recipe_text(40).split(". ")
+        _, keys = segment_keys("Zupa", ". ".join(sentences), 2000, stable=True)
+        # Zdanie w środku segmentu, zmienione tak, by nadal nie było granicą
+        index = next(i for i in range(5, 40) if not is_boundary(sentences[i]))
+        edited = next(
+            f"{sentences[index]} i {n} szczypt soli"
+            for n in range(100)
+            if not is_boundary(f"{sentences[index]} i {n} szczypt soli")
+        )
+        sentences[index] = edited
+        _, new_keys = segment_keys("Zupa", ". ".join(sentences), 2000, stable=True)
+        self.assertEqual(len(new_keys), len(keys))
+        self.assertEqual(len(set(new_keys) - set(keys)), 1)
+
+
+class ProcessRecipeTestCase(TestCase):
+    def test_encoding_error_marks_job_failed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SegmentCache(os.path.join(tmp, "cache"))
+            manifest = JobManifest(os.path.join(tmp, "jobs.sqlite3"))
+            final_audio = os.path.join(tmp, "zupa.opus")
+            segments, keys = segment_keys("Zupa", "Gotuj. Podawaj", 2000)
+            for key in keys:
+                write_wav(cache.path(key), rate=22050)
+            manifest.sync("audio", final_audio, audio_fingerprint(keys))
+
+            error = ValueError("Niezgodny format segmentu")
+            with patch("AllTalkGenScript.main.combine_audio_files", side_effect=error):
+                with ThreadPoolExecutor(1) as executor:
+                    process_recipe(
+                        final_audio,
+                        segments,
+                        keys,
+                        None,
+                        cache,
+                        manifest,
+                        executor,
+                        executor,
+                    )
+            self.assertEqual(manifest.counts("audio"), {FAILED: 1})
+            row = manifest.db.execute("SELECT error FROM jobs").fetchone()
+            self.assertEqual(row[0], "Niezgodny format segmentu")
+            manifest.db.close()
+
+
+class SegmentFormatTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = SegmentCache(os.path.join(self.tmp.name, "cache"))
+        # Format, w którym serwer zwraca teraz segmenty
+        source = self.cache.temp_path()
+        write_wav(source, rate=24000)
+        self.cache.put("0" * 64, source)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_mismatched_segment_is_evicted_on_lookup(self):
+        path = self.cache.path("1" * 64)
+        write_wav(path, rate=22050)
+        self.assertIsNone(self.cache.get("1" * 64))
+        self.assertFalse(os.path.exists(path))
+        # Format jest zapamiętany między uruchomieniami
+        self.assertEqual(SegmentCache(self.cache.root).format, (1, 2, 24000))
+
+    def test_corrupt_segment_is_evicted_on_lookup(self):
+        path = self.cache.path("2" * 64)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"RIFF")
+        self.assertIsNone(self.cache.get("2" * 64))
+        self.assertFalse(os.path.exists(path))
+
+    def test_mismatched_segment_is_resynthesized(self):
+        segments, keys = segment_keys("Zupa", recipe_text(12), 120)
+        for key in keys:
+            write_wav(self.cache.path(key), rate=24000)
+        write_wav(self.cache.path(keys[1]), rate=22050)
+
+        def generate(segment, pool, output_file):
+            write_wav(output_file, rate=24000)
+            return output_file
+
+        def combine(audio_files, output_file):
+            combined.extend(wav_format(path) for path in audio_files)
+            return output_file
+
+        combined = []
+        with patch(
+            "AllTalkGenScript.main.generate_tts_on_pool", side_effect=generate
+        ) as generate_mock, patch(
+            "AllTalkGenScript.main.combine_audio_files", side_effect=combine
+        ):
+            with ThreadPoolExecutor(2) as executor:
+                ok = synthesize_recipe(
+                    os.path.join(self.tmp.name, "zupa.opus"),
+                    segments,
+                    keys,
+                    None,
+                    self.cache,
+                    executor,
+                    executor,
+                )
+        self.assertTrue(ok)
+        self.assertEqual(generate_mock.call_count, 1)
+        self.assertEqual(generate_mock.call_args[0][0], segments[1])
+        self.assertEqual(set(combined), {(1, 2, 24000)})
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, chunks=(), error=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.chunks = chunks
+        self.error = error
+        self.headers = {}
+
+    def json(self):
+        return self.body
+
+    def iter_content(self, size):
+        yield from self.chunks
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """Sesja HTTP zwracająca kolejno przygotowane odpowiedzi syntezy i pobrania."""
+
+    def __init__(self, posts, downloads=()):
+        self.posts = list(posts)
+        self.downloads = list(downloads)
+        self.post_count = 0
+
+    def post(self, url, data=None, timeout=None):
+        self.post_count += 1
+        return self.posts.pop(0)
+
+    def get(self, url, stream=False, timeout=None):
+        return self.downloads.pop(0)
+
+
+def synthesized():
+    return FakeResponse(body={"output_cache_url": "/audio/out.wav"})
+
+
+@patch("AllTalkGenScript.main.time.sleep")
+class GenerateTTSTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output = os.path.join(self.tmp.name, "segment.wav")
+
+    def test_truncated_download_is_retried(self, sleep):
+        for error in [
+            requests.exceptions.ChunkedEncodingError("Connection broken"),
+            requests.exceptions.ContentDecodingError("Bad gzip"),
+        ]:
+            session = FakeSession(
+                [synthesized(), synthesized()],
+                [
+                    FakeResponse(chunks=[b"RIFF"], error=error),
+                    FakeResponse(chunks=[b"RIFF", b"data"]),
+                ],
+            )
+            with self.subTest(error=type(error).__name__):
+                result = generate_tts("Zupa", "tts", "7851", self.output, session)
+                self.assertEqual(result, self.output)
+                self.assertEqual(session.post_count, 2)
+                with open(self.output, "rb") as f:
+                    self.assertEqual(f.read(), b"RIFFdata")
+
+    def test_gives_up_after_max_retries(self, sleep):
+        session = FakeSession([FakeResponse(500) for _ in range(MAX_RETRIES + 1)])
+        breaker = CircuitBreaker(threshold=100)
+        result = generate_tts("Zupa", "tts", "7851", self.output, session, breaker)
+        self.assertIsNone(result)
+        self.assertEqual(session.post_count, MAX_RETRIES + 1)
+        self.assertEqual(sleep.call_count, MAX_RETRIES)
+        self.assertFalse(breaker.is_open())
+
+    def test_client_error_is_not_retried(self, sleep):
+        session = FakeSession([FakeResponse(400)])
+        self.assertIsNone(generate_tts("Zupa", "tts", "7851", self.output, session))
+        self.assertEqual(session.post_count, 1)
+        sleep.assert_not_called()
+
+    def test_overload_opens_breaker(self, sleep):
+        session = FakeSession([FakeResponse(503), synthesized()], [FakeResponse()])
+        breaker = CircuitBreaker(cooldown=30.0)
+        result = generate_tts("Zupa", "tts", "7851", self.output, session, breaker)
+        self.assertEqual(result, self.output)
+        # Przed ponowieniem czeka na zamknięcie bezpiecznika
+        self.assertTrue(any(call.args[0] > 29 for call in sleep.call_args_list))
+
+
+class ResilienceTestCase(TestCase):
+    def test_backoff_delay_is_bounded(self):
+        for attempt in range(10):
+            limit = min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)
+            for _ in range(50):
+                self.assertTrue(0 <= backoff_delay(attempt) <= limit)
+
+    def test_circuit_breaker_opens_after_threshold(self):
+        breaker = CircuitBreaker(threshold=3, cooldown=60.0)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertFalse(breaker.is_open())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open())
+        self.assertGreater(breaker.remaining(), 59)
+
+    def test_server_pool_prefers_least_loaded_and_skips_open_breaker(self):
+        servers = [TTSServer("a:1", 2), TTSServer("b:1", 2), TTSServer("c:1", 2)]
+        servers[2].breaker.record_failure(overloaded=True)
+        pool = ServerPool(servers)
+        with pool.acquire() as first, pool.acquire() as second:
+            self.assertEqual({first.ip, second.ip}, {"a", "b"})
+            with pool.acquire() as third:
+                self.assertIn(third.ip, {"a", "b"})
+                self.assertEqual(servers[2].in_flight, 0)
+        self.assertEqual([server.in_flight for server in servers], [0, 0, 0])
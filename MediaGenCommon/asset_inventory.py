@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import struct
+import hashlib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MediaGenCommon.catalog import asset_key, load_json_catalog  # noqa: E402
+from MediaGenCommon.job_manifest import atomic_output  # noqa: E402
+
+# Rodzaj zasobu -> (klucz w katalogu, folder wyjściowy, rozszerzenie)
+ASSET_KINDS = {
+    "images": ("image", "images-output", ".jpg"),
+    "audio": ("audio", "audio-output", ".opus"),
+    "playlists": ("playlist", "audio-output", ".m3u8"),
+}
+INDEX_FILE = "asset-index.json"
+CHUNK_SIZE = 1024 * 1024
+# Markery SOF z wymiarami obrazu (bez DHT, JPG i DAC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_metadata(path):
+    """
+    Odczytuje wymiary JPEG z nagłówka SOF, bez dekodowania obrazu.
+    Zwraca None, gdy plik jest uszkodzony lub ucięty (brak markera EOI).
+    """
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            return None
+        dimensions = None
+        while dimensions is None:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0x01, *range(0xD0, 0xD8)):
+                continue
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            (length,) = struct.unpack(">H", length)
+            if length < 2:
+                return None
+            if marker[1] in JPEG_SOF_MARKERS:
+                sof = f.read(5)
+                if len(sof) < 5:
+                    return None
+                height, width = struct.unpack(">xHH", sof)
+                dimensions = {"width": width, "height": height}
+            else:
+                f.seek(length - 2, os.SEEK_CUR)
+        f.seek(-2, os.SEEK_END)
+        if f.read(2) != b"\xff\xd9":
+            return None
+    return dimensions
+
+
+def opus_metadata(path):
+    """
+    Odczytuje długość nagrania Ogg Opus z pozycji granule ostatniej
+    strony. Zwraca None, gdy plik jest uszkodzony lub ucięty (ostatnia
+    strona nie ma flagi końca strumienia).
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(64)
+        if len(head) < 40 or not head.startswith(b"OggS") or head[28:36] != b"OpusHead":
+            return None
+        (pre_skip,) = struct.unpack("<H", head[38:40])
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+    page = tail.rfind(b"OggS")
+    if page < 0 or len(tail) < page + 14:
+        return None
+    header_type = tail[page + 5]
+    (granule,) = struct.unpack("<q", tail[page + 6 : page + 14])
+    if not header_type & 0x04 or granule < 0:
+        return None
+    return {"duration": round(max(0, granule - pre_skip) / 48000, 3)}
+
+
+def playlist_metadata(path):
+    """
+    Odczytuje długość i liczbę segmentów playlisty HLS. Zwraca None, gdy
+    playlista jest niepełna (brak ``#EXT-X-ENDLIST``) lub brakuje
+    któregoś z plików, do których się odwołuje.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except UnicodeDecodeError:
+        return None
+    if not lines or lines[0] != "#EXTM3U" or "#EXT-X-ENDLIST" not in lines:
+        return None
+    folder = os.path.dirname(path)
+    files = []
+    duration = 0.0
+    for line in lines:
+        if line.startswith("#EXTINF:"):
+            try:
+                duration += float(line[8:].split(",")[0])
+            except ValueError:
+                return None
+        elif line.startswith("#EXT-X-MAP:") and 'URI="' in line:
+            files.append(line.split('URI="', 1)[1].split('"', 1)[0])
+        elif line and not line.startswith("#"):
+            files.append(line)
+    segments = sum(1 for line in lines if line.startswith("#EXTINF:"))
+    if not segments or not all(
+        os.path.isfile(os.path.join(folder, name)) for name in files
+    ):
+        return None
+    return {"duration": round(duration, 3), "segments": segments}
+
+
+METADATA_READERS = {
+    "images": jpeg_metadata,
+    "audio": opus_metadata,
+    "playlists": playlist_metadata,
+}
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_tree(root):
+    """Rekurencyjnie zwraca wpisy os.scandir plików w ``root``."""
+    try:
+        iterator = os.scandir(root)
+    except FileNotFoundError:
+        return
+    with iterator:
+        for entry in iterator:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_tree(entry.path)
+            elif entry.is_file():
+                yield entry
+
+
+class AssetInventory:
+    """
+    Indeks wygenerowanych plików (ścieżka, rozmiar, mtime, suma SHA-256
+    i metadane: wymiary obrazu albo długość nagrania lub playlisty).
+
+    Indeks jest zapisywany w pliku JSON i odświeżany przyrostowo: suma
+    kontrolna i metadane są liczone ponownie tylko dla plików, których
+    rozmiar lub mtime się zmienił.
+    """
+
+    def __init__(self, base_dir=".", index_path=None):
+        self.base_dir = base_dir
+        self.index_path = index_path or os.path.join(base_dir, INDEX_FILE)
+        self.index = {kind: {} for kind in ASSET_KINDS}
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index.update(json.load(f))
+
+    def refresh(self):
+        """Skanuje foldery wyjściowe raz i zwraca liczbę przeliczonych plików."""
+        rehashed = 0
+        for kind, (_, folder, extension) in ASSET_KINDS.items():
+            root = os.path.join(self.base_dir, folder)
+            previous = self.index.get(kind, {})
+            current = {}
+            for entry in scan_tree(root):
+                if not entry.name.endswith(extension):
+                    continue
+                path = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                stat = entry.stat()
+                record = previous.get(path)
+                if (
+                    record is None
+                    or record["size"] != stat.st_size
+                    or record["mtime_ns"] != stat.st_mtime_ns
+                ):
+                    record = {
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "sha256": file_checksum(entry.path),
+                        "metadata": METADATA_READERS[kind](entry.path),
+                    }
+                    rehashed += 1
+                current[path] = record
+            self.index[kind] = current
+        with atomic_output(self.index_path) as temp_path:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.index, f)
+        return rehashed
+
+    def get(self, kind, path):
+        """Zwraca rekord zasobu albo None, gdy plik nie istnieje."""
+        return self.index[kind].get(path)
+
+    def report(self, recipes):
+        """
+        Porównuje katalog przepisów z indeksem. Zwraca dla obrazów, audio
+        i playlist listy brakujących, osieroconych (bez przepisu) i uszkodzonych plików.
+        """
+        result = {}
+        for kind, (key, _, _) in ASSET_KINDS.items():
+            files = self.index[kind]
+            expected = {}
+            for recipe in recipes:
+                if recipe.get(key):
+                    expected[asset_key(recipe[key])] = recipe["name"]
+            result[kind] = {
+                "expected": len(expected),
+                "present": sum(1 for path in expected if path in files),
+                "missing": sorted(
+                    (path, name) for path, name in expected.items() if path not in files
+                ),
+                "orphaned": sorted(path for path in files if path not in expected),
+                "corrupt": sorted(
+                    path for path, record in files.items() if record["metadata"] is None
+                ),
+            }
+        return result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Inwentaryzacja wygenerowanych obrazów i nagrań"
+    )
+    parser.add_argument("--input", default="json-input", help="Folder z plikami JSON")
+    parser.add_argument(
+        "--base-dir", default=".", help="Folder z images-output i audio-output"
+    )
+    parser.add_argument("--report", help="Zapisz pełny raport JSON do pliku")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    inventory = AssetInventory(args.base_dir)
+    rehashed = inventory.refresh()
+    report = inventory.report(load_json_catalog(args.input))
+    print(f"Przeliczone pliki: {rehashed}")
+    for kind, data in report.items():
+        print(
+            f"{kind}: {data['present']}/{data['expected']} obecnych, "
+            f"{len(data['missing'])} brakujących, {len(data['orphaned'])} osieroconych, "
+            f"{len(data['corrupt'])} uszkodzonych"
+        )
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
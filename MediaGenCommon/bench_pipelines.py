@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import shutil
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AllTalkGenScript import main as tts  # noqa: E402
+from AllTalkGenScript.segment_cache import SegmentCache  # noqa: E402
+from MediaGenCommon import mock_servers  # noqa: E402
+from MediaGenCommon.job_manifest import JobManifest  # noqa: E402
+from MediaGenCommon.scheduler import (  # noqa: E402
+    AllTalkBackend,
+    MediaScheduler,
+    StableDiffusionBackend,
+)
+
+WORDS = [
+    "pokrój",
+    "cebulę",
+    "podsmaż",
+    "dodaj",
+    "czosnek",
+    "gotuj",
+    "mieszaj",
+    "sól",
+    "pieprz",
+    "masło",
+    "makaron",
+    "sos",
+    "piekarnik",
+    "minut",
+]
+
+
+def synthetic_recipes(count, sentences, seed=0):
+    rng = random.Random(seed)
+    recipes = []
+    for i in range(count):
+        text = ". ".join(
+            " ".join(rng.choices(WORDS, k=rng.randint(6, 14))) for _ in range(sentences)
+        )
+        recipes.append(
+            {
+                "name": f"Recipe {i}",
+                "recipe": text,
+                "ingredients": rng.sample(WORDS, 3),
+                "image": f"bench/recipe_{i}.jpg",
+                "audio": f"bench/recipe_{i}.opus",
+                "recency": i,
+            }
+        )
+    return recipes
+
+
+class TimedBackend:
+    """Opakowuje backend i zapisuje czas wykonania każdego zadania."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.kind = backend.kind
+        self.concurrency = backend.concurrency
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.finished = 0.0
+
+    def prepare(self, recipe):
+        return self.backend.prepare(recipe)
+
+    def run(self, output, payload):
+        start = time.perf_counter()
+        try:
+            return self.backend.run(output, payload)
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.latencies.append(end - start)
+                self.finished = max(self.finished, end)
+
+    def close(self):
+        self.backend.close()
+
+
+def report(backend, started):
+    seconds = backend.finished - started
+    latencies = sorted(backend.latencies)
+    if not latencies:
+        print(f"{backend.kind}: brak zadań")
+        return
+    # Interpolacja między próbkami; percentyle nie wychodzą poza min i max
+    cuts = (
+        statistics.quantiles(latencies, n=100, method="inclusive")
+        if len(latencies) > 1
+        else latencies * 99
+    )
+    print(
+        f"{backend.kind}: {len(latencies)} zadań w {seconds:.1f} s, "
+        f"{len(latencies) / seconds * 60:.1f}/min, "
+        f"p50={cuts[49]:.2f} s, p95={cuts[94]:.2f} s, p99={cuts[98]:.2f} s, "
+        f"max={latencies[-1]:.2f} s"
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark potoków generowania mediów na serwerach zastępczych"
+    )
+    parser.add_argument("--recipes", type=int, default=50)
+    parser.add_argument("--sentences", type=int, default=8, help="Zdań w przepisie")
+    parser.add_argument("--only", choices=["image", "audio"])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--latency-per-char", type=float, default=0.0005)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--wav-seconds", type=float, default=2.0)
+    parser.add_argument("--image-size", type=int, default=512)
+    parser.add_argument("--sd-concurrency", type=int, default=2)
+    parser.add_argument(
+        "--tts-servers", type=int, default=2, help="Liczba serwerów AllTalk"
+    )
+    parser.add_argument("--tts-max-in-flight", type=int, default=2)
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=1.0,
+        help="Przerwa po otwarciu bezpiecznika serwera TTS (s)",
+    )
+    parser.add_argument("--max-segment-length", type=int, default=2000)
+    parser.add_argument("--stable-segments", action="store_true")
+    parser.add_argument("--encode-workers", type=int, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.only != "image" and not shutil.which("ffmpeg"):
+        print("Brak ffmpeg w PATH - pomijanie potoku audio.")
+        if args.only == "audio":
+            return
+        args.only = "image"
+
+    # Krótsze ponawianie, żeby błędy serwera nie dominowały wyniku
+    tts.BACKOFF_BASE = 0.05
+    tts.BACKOFF_MAX = 1.0
+
+    def config(seed):
+        return mock_servers.MockConfig(
+            args.latency,
+            args.jitter,
+            args.latency_per_char,
+            args.failure_rate,
+            seed=seed,
+        )
+
+    mocks = []
+    workdir = tempfile.mkdtemp(prefix="bench-media-")
+    try:
+        with ProcessPoolExecutor(args.encode_workers) as encode_pool:
+            backends = []
+            if args.only in (None, "image"):
+                sd_server = mock_servers.start_stable_diffusion(
+                    config(0), args.image_size
+                )
+                mocks.append(("sd", sd_server))
+                url = f"http://127.0.0.1:{sd_server.server_port}/sdapi/v1/txt2img"
+                backends.append(
+                    StableDiffusionBackend(
+                        url,
+                        args.sd_concurrency,
+                        encode_pool,
+                        output_root=os.path.join(workdir, "images-output"),
+                    )
+                )
+            if args.only in (None, "audio"):
+                servers = []
+                for i in range(args.tts_servers):
+                    server = mock_servers.start_alltalk(config(i + 1), args.wav_seconds)
+                    mocks.append((f"alltalk{i}", server))
+                    tts_server = tts.TTSServer(
+                        f"127.0.0.1:{server.server_port}", args.tts_max_in_flight
+                    )
+                    tts_server.breaker.cooldown = args.breaker_cooldown
+                    servers.append(tts_server)
+                cache = SegmentCache(os.path.join(workdir, "tts-cache"))
+                backends.append(
+                    AllTalkBackend(
+                        tts.ServerPool(servers),
+                        cache,
+                        encode_pool,
+                        output_root=os.path.join(workdir, "audio-output"),
+                        max_length=args.max_segment_length,
+                        stable_segments=args.stable_segments,
+                    )
+                )
+
+            timed = [TimedBackend(backend) for backend in backends]
+            manifest = JobManifest(os.path.join(workdir, "jobs.sqlite3"))
+            with MediaScheduler(timed, manifest) as scheduler:
+                for recipe in synthetic_recipes(args.recipes, args.sentences):
+                    scheduler.enqueue(recipe, -recipe["recency"])
+                started = time.perf_counter()
+                stats = scheduler.run()
+    finally:
+        for _, server in mocks:
+            server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for backend in timed:
+        report(backend, started)
+    print(f"Zadania: {stats}")
+    print(f"Zapytania TTS: {tts.STATS}")
+    for name, server in mocks:
+        print(
+            f"Serwer {name}: {server.config.requests} zapytań, "
+            f"{server.config.failures} błędów"
+        )
+
+
+if __name__ == "__main__":
+    main()
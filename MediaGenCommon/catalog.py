@@ -0,0 +1,55 @@
+import os
+import json
+
+
+def asset_stem(json_name, recipe_name):
+    """Ścieżka zasobu bez rozszerzenia, jak w kluczach image/audio plików JSON."""
+    return f"{json_name}/{recipe_name.lower().replace(' ', '_')}"
+
+
+def asset_key(path):
+    """
+    Ścieżka zasobu w folderze wyjściowym i w indeksie: folder bez zmian,
+    nazwa pliku małymi literami (tak zapisują pliki generatory obrazów i audio).
+    """
+    folder, _, filename = path.replace("\\", "/").rpartition("/")
+    return f"{folder}/{filename.lower()}" if folder else filename.lower()
+
+
+def playlist_path(audio_path):
+    """Ścieżka playlisty HLS nagrania: ``<nagranie bez .opus>.hls/index.m3u8``."""
+    stem = audio_path[:-5] if audio_path.endswith(".opus") else audio_path
+    return f"{stem}.hls/index.m3u8"
+
+
+def load_json_catalog(folder_path):
+    """
+    Czyta przepisy z plików JSON. Nowszym plikom (świeżo dodanym)
+    odpowiada wyższa wartość ``recency``.
+    """
+    recipes = []
+    for filename in sorted(os.listdir(folder_path)):
+        if not filename.endswith(".json"):
+            continue
+        file_path = os.path.join(folder_path, filename)
+        json_name = os.path.splitext(filename)[0]
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        recency = os.path.getmtime(file_path)
+        for entry in data:
+            if not entry.get("name"):
+                continue
+            stem = asset_stem(json_name, entry["name"])
+            audio = entry.get("audio") or f"{stem}.opus"
+            recipes.append(
+                {
+                    "name": entry["name"],
+                    "recipe": entry.get("recipe", ""),
+                    "ingredients": entry.get("ingredients", []),
+                    "image": entry.get("image") or f"{stem}.jpg",
+                    "audio": audio,
+                    "playlist": playlist_path(asset_key(audio)),
+                    "recency": recency,
+                }
+            )
+    return recipes
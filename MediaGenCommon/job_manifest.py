@@ -0,0 +1,125 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@contextmanager
+def atomic_output(path, suffix=".part"):
+    """
+    Zwraca unikalną ścieżkę tymczasową obok ``path``; plik docelowy jest
+    podmieniany dopiero po udanym zakończeniu bloku, więc przerwane
+    zadanie nigdy nie zostawia niepełnego pliku pod docelową nazwą.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    os.close(fd)
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class JobManifest:
+    """
+    Trwały rejestr zadań generowania (SQLite), wspólny dla skryptów
+    audio i obrazów.
+
+    Każde zadanie ma rodzaj (np. ``audio``, ``image``), ścieżkę pliku
+    wyjściowego i odcisk danych wejściowych. Zmiana odcisku przywraca
+    zadanie do stanu ``pending``. Zadania ``running`` pozostawione przez
+    przerwany proces są przy starcie wznawiane.
+    """
+
+    def __init__(self, path="jobs.sqlite3"):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " kind TEXT NOT NULL,"
+            " output TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (kind, output))"
+        )
+        self.db.execute(
+            "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?",
+            (PENDING, time.time(), RUNNING),
+        )
+
+    def _execute(self, sql, params=()):
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def sync(self, kind, output, fingerprint):
+        """
+        Rejestruje zadanie i zwraca jego stan.
+
+        Nowe zadanie, którego plik wyjściowy już istnieje (wygenerowany
+        przed wprowadzeniem rejestru), jest od razu oznaczane jako ``done``.
+        """
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT fingerprint, state FROM jobs WHERE kind = ? AND output = ?",
+                (kind, output),
+            ).fetchone()
+            if row is None:
+                state = DONE if os.path.exists(output) else PENDING
+                self.db.execute(
+                    "INSERT INTO jobs (kind, output, fingerprint, state, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (kind, output, fingerprint, state, now),
+                )
+                return state
+            if row[0] != fingerprint:
+                self.db.execute(
+                    "UPDATE jobs SET fingerprint = ?, state = ?, attempts = 0,"
+                    " error = NULL, updated_at = ? WHERE kind = ? AND output = ?",
+                    (fingerprint, PENDING, now, kind, output),
+                )
+                return PENDING
+            return row[1]
+
+    def start(self, kind, output):
+        self._execute(
+            "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ?"
+            " WHERE kind = ? AND output = ?",
+            (RUNNING, time.time(), kind, output),
+        )
+
+    def finish(self, kind, output):
+        self._execute(
+            "UPDATE jobs SET state = ?, error = NULL, updated_at = ?"
+            " WHERE kind = ? AND output = ?",
+            (DONE, time.time(), kind, output),
+        )
+
+    def fail(self, kind, output, error=None):
+        self._execute(
+            "UPDATE jobs SET state = ?, error = ?, updated_at = ?"
+            " WHERE kind = ? AND output = ?",
+            (FAILED, error, time.time(), kind, output),
+        )
+
+    def counts(self, kind):
+        return dict(
+            self._execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE kind = ? GROUP BY state",
+                (kind,),
+            )
+        )
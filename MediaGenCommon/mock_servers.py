@@ -0,0 +1,224 @@
+import io
+import os
+import json
+import time
+import uuid
+import wave
+import base64
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class MockConfig:
+    """
+    Zachowanie serwera zastępczego: opóźnienie odpowiedzi (stałe, losowy
+    rozrzut i część zależna od długości tekstu), odsetek błędów oraz
+    rozmiar zwracanych danych.
+    """
+
+    def __init__(
+        self,
+        latency=0.0,
+        jitter=0.0,
+        latency_per_char=0.0,
+        failure_rate=0.0,
+        failure_status=503,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_char = latency_per_char
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    def delay(self, text_length=0):
+        with self.lock:
+            jitter = self.random.uniform(0, self.jitter)
+        time.sleep(self.latency + jitter + self.latency_per_char * text_length)
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.failure_rate
+            self.failures += failed
+        return failed
+
+
+def silent_wav(seconds, rate=24000):
+    """Poprawny plik WAV (mono, 16 bit) z ciszą o zadanej długości."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\0\0" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def noise_png(size):
+    """Obraz PNG z szumem, o rozmiarze zbliżonym do prawdziwego wyniku SD."""
+    from PIL import Image
+
+    image = Image.frombytes("RGB", (size, size), os.urandom(size * size * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def send_bytes(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, data):
+        self.send_bytes(status, json.dumps(data).encode("utf-8"), "application/json")
+
+
+class AllTalkHandler(MockHandler):
+    """Zastępczy serwer AllTalk: /api/tts-generate oraz pobieranie z cache."""
+
+    def do_POST(self):
+        if self.path != "/api/tts-generate":
+            return self.send_json(404, {"error": "not found"})
+        form = parse_qs(self.read_body().decode("utf-8"))
+        text = form.get("text_input", [""])[0]
+        config = self.server.config
+        config.delay(len(text))
+        if config.should_fail():
+            return self.send_json(config.failure_status, {"status": "generate-failure"})
+        name = f"{uuid.uuid4().hex}.wav"
+        with self.server.lock:
+            self.server.files[name] = self.server.payload
+        self.send_json(
+            200,
+            {
+                "status": "generate-success",
+                "output_file_path": f"/outputs/{name}",
+                "output_file_url": f"/audio/{name}",
+                "output_cache_url": f"/audiocache/{name}",
+            },
+        )
+
+    def do_GET(self):
+        name = self.path.rsplit("/", 1)[-1]
+        with self.server.lock:
+            # Jak w AllTalk plik z cache można pobrać raz
+            payload = self.server.files.pop(name, None)
+        if not self.path.startswith("/audiocache/") or payload is None:
+            return self.send_json(404, {"error": "not found"})
+        self.send_bytes(200, payload, "audio/wav")
+
+
+class StableDiffusionHandler(MockHandler):
+    """Zastępczy serwer SD WebUI: /sdapi/v1/txt2img."""
+
+    def do_POST(self):
+        if self.path != "/sdapi/v1/txt2img":
+            return self.send_json(404, {"error": "not found"})
+        data = json.loads(self.read_body() or b"{}")
+        config = self.server.config
+        config.delay()
+        if config.should_fail():
+            return self.send_json(config.failure_status, {"error": "busy"})
+        batch = data.get("batch_size", 1) * data.get("n_iter", 1)
+        self.send_json(
+            200,
+            {"images": [self.server.payload] * batch, "parameters": data, "info": "{}"},
+        )
+
+
+def start_server(handler, config, payload, host="127.0.0.1", port=0):
+    """Uruchamia serwer w wątku w tle i zwraca go (port w ``server_port``)."""
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.config = config
+    server.payload = payload
+    server.files = {}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_alltalk(config, wav_seconds=5.0, port=0):
+    return start_server(AllTalkHandler, config, silent_wav(wav_seconds), port=port)
+
+
+def start_stable_diffusion(config, image_size=1024, port=0):
+    return start_server(
+        StableDiffusionHandler, config, noise_png(image_size), port=port
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Lokalne serwery zastępcze AllTalk i Stable Diffusion"
+    )
+    parser.add_argument("--alltalk-port", type=int, default=7851)
+    parser.add_argument("--sd-port", type=int, default=7860)
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="Stałe opóźnienie (s)"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.2, help="Losowy rozrzut opóźnienia (s)"
+    )
+    parser.add_argument(
+        "--latency-per-char",
+        type=float,
+        default=0.001,
+        help="Dodatkowe opóźnienie TTS na znak tekstu (s)",
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument(
+        "--wav-seconds", type=float, default=5.0, help="Długość zwracanego WAV"
+    )
+    parser.add_argument(
+        "--image-size", type=int, default=1024, help="Bok zwracanego obrazu (px)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    def config():
+        return MockConfig(
+            args.latency,
+            args.jitter,
+            args.latency_per_char,
+            args.failure_rate,
+            args.failure_status,
+        )
+
+    start_alltalk(config(), args.wav_seconds, args.alltalk_port)
+    start_stable_diffusion(config(), args.image_size, args.sd_port)
+    print(
+        f"AllTalk: http://127.0.0.1:{args.alltalk_port}, "
+        f"Stable Diffusion: http://127.0.0.1:{args.sd_port} (Ctrl+C kończy)"
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import os
+import sys
+import heapq
+import shutil
+import argparse
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AllTalkGenScript import main as tts  # noqa: E402
+from AllTalkGenScript.segment_cache import SegmentCache  # noqa: E402
+from MediaGenCommon.catalog import asset_key, load_json_catalog  # noqa: E402
+from MediaGenCommon.job_manifest import DONE, JobManifest, atomic_output  # noqa: E402
+from StableDiffGenScript import main as sd  # noqa: E402
+
+
+def load_db_catalog():
+    """Czyta przepisy z tabeli Recipe; nowsze rekordy mają wyższy ``recency``."""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    django.setup()
+    from core.models import Recipe
+
+    recipes = []
+    for recipe in Recipe.objects.prefetch_related("ingredients").order_by("id"):
+        recipes.append(
+            {
+                "name": recipe.name,
+                "recipe": recipe.recipe,
+                "ingredients": [i.name for i in recipe.ingredients.all()],
+                "image": recipe.image_path,
+                "audio": recipe.audio_path,
+                "recency": recipe.id,
+            }
+        )
+    return recipes
+
+
+class StableDiffusionBackend:
+    """Generowanie obrazów przez API txt2img (StableDiffGenScript)."""
+
+    kind = "image"
+
+    def __init__(
+        self,
+        url,
+        concurrency,
+        encode_pool,
+        output_root="images-output",
+        jpeg_quality=50,
+    ):
+        self.url = url
+        self.concurrency = concurrency
+        self.encode_pool = encode_pool
+        self.output_root = output_root
+        self.jpeg_quality = jpeg_quality
+        self.session = requests.Session()
+        self.session.mount(
+            "http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+        )
+
+    def prepare(self, recipe):
+        """Zwraca (ścieżka wyjściowa, odcisk, dane zadania) albo None."""
+        if not recipe["image"]:
+            return None
+        output = os.path.join(self.output_root, *asset_key(recipe["image"]).split("/"))
+        return output, sd.request_fingerprint(sd.build_request(recipe)), recipe
+
+    def run(self, output, recipe):
+        try:
+            image_data = sd.fetch_image(self.session, recipe, self.url)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Błąd zapytania txt2img dla {output}: {e}")
+            return False
+        if not image_data:
+            return False
+        self.encode_pool.submit(
+            sd.save_image, image_data, output, self.jpeg_quality
+        ).result()
+        return True
+
+    def close(self):
+        self.session.close()
+
+
+class AllTalkBackend:
+    """Generowanie narracji przez serwery AllTalk (AllTalkGenScript)."""
+
+    kind = "audio"
+
+    def __init__(
+        self,
+        pool,
+        cache,
+        encode_pool,
+        output_root="audio-output",
+        max_length=2000,
+        stable_segments=False,
+    ):
+        self.pool = pool
+        self.cache = cache
+        self.encode_pool = encode_pool
+        self.output_root = output_root
+        self.max_length = max_length
+        self.stable_segments = stable_segments
+        # Jedno zadanie przepisu na wolne miejsce w puli serwerów
+        self.concurrency = pool.capacity
+        self.segment_executor = ThreadPoolExecutor(pool.capacity)
+
+    def prepare(self, recipe):
+        if not (recipe["audio"] and recipe["recipe"]):
+            return None
+        output = tts.audio_output_path(self.output_root, recipe["audio"])
+        name = recipe["name"].replace(" ", "_")
+        segments, keys = tts.segment_keys(
+            name, recipe["recipe"], self.max_length, self.stable_segments
+        )
+        return output, tts.audio_fingerprint(keys), (segments, keys)
+
+    def run(self, output, payload):
+        segments, keys = payload
+        return tts.synthesize_recipe(
+            output,
+            segments,
+            keys,
+            self.pool,
+            self.cache,
+            self.segment_executor,
+            self.encode_pool,
+        )
+
+    def close(self):
+        self.segment_executor.shutdown()
+
+
+class MediaScheduler:
+    """
+    Wspólna kolejka zadań generowania mediów.
+
+    Zadania są kolejkowane z priorytetem (kopiec, mniejsza wartość
+    wcześniej) osobno dla każdego backendu, a każdy backend ma własny
+    limit równoczesnych zadań. Zadania o tym samym odcisku (identyczny
+    prompt lub tekst) są wykonywane raz, a wynik kopiowany do pozostałych
+    plików wyjściowych.
+    """
+
+    def __init__(self, backends, manifest):
+        self.backends = {backend.kind: backend for backend in backends}
+        self.manifest = manifest
+        self.lock = threading.Lock()
+        self.queues = {kind: [] for kind in self.backends}
+        self.jobs = {}
+        self.counter = itertools.count()
+        self.stats = {"queued": 0, "deduplicated": 0, "done": 0, "failed": 0}
+
+    def enqueue(self, recipe, priority):
+        for kind, backend in self.backends.items():
+            prepared = backend.prepare(recipe)
+            if prepared is None:
+                continue
+            output, fingerprint, payload = prepared
+            if self.manifest.sync(kind, output, fingerprint) == DONE:
+                continue
+            with self.lock:
+                job = self.jobs.get((kind, fingerprint))
+                if job is not None:
+                    if output not in job["outputs"]:
+                        job["outputs"].append(output)
+                        self.stats["deduplicated"] += 1
+                    if priority < job["priority"]:
+                        # Poprzedni wpis w kopcu zostanie pominięty jako nieaktualny
+                        job["priority"] = priority
+                        heapq.heappush(
+                            self.queues[kind],
+                            (priority, next(self.counter), fingerprint),
+                        )
+                    continue
+                job = {"outputs": [output], "payload": payload, "priority": priority}
+                self.jobs[(kind, fingerprint)] = job
+                heapq.heappush(
+                    self.queues[kind], (priority, next(self.counter), fingerprint)
+                )
+                self.stats["queued"] += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Zwalnia zasoby backendów (pule wątków, sesje HTTP)."""
+        for backend in self.backends.values():
+            backend.close()
+
+    def _next_job(self, kind):
+        with self.lock:
+            while self.queues[kind]:
+                priority, _, fingerprint = heapq.heappop(self.queues[kind])
+                job = self.jobs.get((kind, fingerprint))
+                if job is not None and job["priority"] == priority:
+                    # Zadanie zdjęte z kolejki nie przyjmuje już kolejnych duplikatów
+                    return self.jobs.pop((kind, fingerprint))
+            return None
+
+    def _worker(self, kind):
+        backend = self.backends[kind]
+        while True:
+            job = self._next_job(kind)
+            if job is None:
+                return
+            outputs = job["outputs"]
+            for output in outputs:
+                self.manifest.start(kind, output)
+            try:
+                ok = backend.run(outputs[0], job["payload"])
+            except Exception as e:
+                print(f"Błąd zadania {kind} {outputs[0]}: {e}")
+                ok = False
+            for output in outputs[1:]:
+                if ok:
+                    with atomic_output(output) as temp_path:
+                        shutil.copyfile(outputs[0], temp_path)
+            for output in outputs:
+                if ok:
+                    self.manifest.finish(kind, output)
+                else:
+                    self.manifest.fail(kind, output)
+            with self.lock:
+                self.stats["done" if ok else "failed"] += len(outputs)
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self._worker, args=(kind,))
+            for kind, backend in self.backends.items()
+            for _ in range(backend.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.stats
+
+
+def recipe_priority(recipe, popular):
+    # Popularne przepisy najpierw, potem od najnowszych
+    return (0 if recipe["name"] in popular else 1, -recipe["recency"])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Wspólny harmonogram generowania obrazów i narracji przepisów"
+    )
+    parser.add_argument(
+        "--source",
+        choices=["json", "db"],
+        default="json",
+        help="Źródło katalogu: pliki JSON albo tabela Recipe",
+    )
+    parser.add_argument("--input", default="json-input", help="Folder z plikami JSON")
+    parser.add_argument(
+        "--only", choices=["image", "audio"], help="Generuj tylko jeden rodzaj mediów"
+    )
+    parser.add_argument(
+        "--popular", help="Plik z nazwami popularnych przepisów (po jednej w linii)"
+    )
+    parser.add_argument("--sd-url", default=sd.api_url)
+    parser.add_argument("--sd-concurrency", type=int, default=2)
+    parser.add_argument(
+        "--tts-server",
+        action="append",
+        help="Adres serwera AllTalk host:port (można podać wielokrotnie)",
+    )
+    parser.add_argument("--tts-max-in-flight", type=int, default=2)
+    parser.add_argument("--cache-dir", default="tts-cache")
+    parser.add_argument("--cache-max-mb", type=int, default=2048)
+    parser.add_argument("--stable-segments", action="store_true")
+    parser.add_argument("--encode-workers", type=int, default=None)
+    parser.add_argument("--manifest", default="jobs.sqlite3")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.source == "db":
+        recipes = load_db_catalog()
+    else:
+        recipes = load_json_catalog(args.input)
+    popular = set()
+    if args.popular:
+        with open(args.popular, "r", encoding="utf-8") as file:
+            popular = {line.strip() for line in file if line.strip()}
+
+    manifest = JobManifest(args.manifest)
+    with ProcessPoolExecutor(args.encode_workers) as encode_pool:
+        backends = []
+        if args.only in (None, "image"):
+            backends.append(
+                StableDiffusionBackend(args.sd_url, args.sd_concurrency, encode_pool)
+            )
+        if args.only in (None, "audio"):
+            servers = [
+                tts.TTSServer(address, args.tts_max_in_flight)
+                for address in (args.tts_server or ["127.0.0.1:7851"])
+            ]
+            cache = SegmentCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+            backends.append(
+                AllTalkBackend(
+                    tts.ServerPool(servers),
+                    cache,
+                    encode_pool,
+                    stable_segments=args.stable_segments,
+                )
+            )
+
+        with MediaScheduler(backends, manifest) as scheduler:
+            for recipe in recipes:
+                scheduler.enqueue(recipe, recipe_priority(recipe, popular))
+            print(f"Zadania w kolejce: {scheduler.stats['queued']}")
+            stats = scheduler.run()
+    print(f"Podsumowanie: {stats}")
+    print(f"Statystyki zapytań TTS: {tts.STATS}")
+
+
+if __name__ == "__main__":
+    main()
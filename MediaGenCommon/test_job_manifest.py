@@ -0,0 +1,65 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from MediaGenCommon.job_manifest import (
+    DONE,
+    FAILED,
+    PENDING,
+    RUNNING,
+    JobManifest,
+    atomic_output,
+)
+
+
+class JobManifestTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "jobs.sqlite3")
+        self.output = os.path.join(self.tmp.name, "zupa.opus")
+
+    def state(self, manifest):
+        return manifest._execute(
+            "SELECT state, attempts FROM jobs WHERE output = ?", (self.output,)
+        )[0]
+
+    def test_running_jobs_resume_as_pending(self):
+        manifest = JobManifest(self.path)
+        self.assertEqual(manifest.sync("audio", self.output, "a"), PENDING)
+        manifest.start("audio", self.output)
+        self.assertEqual(self.state(manifest), (RUNNING, 1))
+        manifest.db.close()
+
+        # Proces przerwany w trakcie zadania: nowy rejestr wznawia je
+        manifest = JobManifest(self.path)
+        self.assertEqual(self.state(manifest), (PENDING, 1))
+        self.assertEqual(manifest.sync("audio", self.output, "a"), PENDING)
+        self.assertEqual(manifest.counts("audio"), {PENDING: 1})
+
+    def test_fingerprint_change_resets_job(self):
+        manifest = JobManifest(self.path)
+        manifest.sync("audio", self.output, "a")
+        manifest.start("audio", self.output)
+        manifest.fail("audio", self.output, "HTTP 500")
+        self.assertEqual(manifest.sync("audio", self.output, "a"), FAILED)
+        self.assertEqual(manifest.sync("audio", self.output, "b"), PENDING)
+        self.assertEqual(self.state(manifest), (PENDING, 0))
+        manifest.start("audio", self.output)
+        manifest.finish("audio", self.output)
+        self.assertEqual(manifest.sync("audio", self.output, "b"), DONE)
+        self.assertEqual(manifest.sync("audio", self.output, "c"), PENDING)
+
+    def test_existing_output_is_done(self):
+        with open(self.output, "wb"):
+            pass
+        manifest = JobManifest(self.path)
+        self.assertEqual(manifest.sync("audio", self.output, "a"), DONE)
+
+    def test_atomic_output_keeps_target_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with atomic_output(self.output) as temp_path:
+                with open(temp_path, "wb") as f:
+                    f.write(b"part")
+                raise RuntimeError("przerwane")
+        self.assertEqual(os.listdir(self.tmp.name), [])
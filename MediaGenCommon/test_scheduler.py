@@ -0,0 +1,93 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from AllTalkGenScript.main import ServerPool, TTSServer
+from MediaGenCommon.job_manifest import DONE, JobManifest
+from MediaGenCommon.scheduler import AllTalkBackend, MediaScheduler
+
+
+class FakeBackend:
+    """Backend zapisujący prompt do pliku i kolejność wykonanych zadań."""
+
+    kind = "image"
+    concurrency = 1
+
+    def __init__(self, output_root):
+        self.output_root = output_root
+        self.runs = []
+
+    def prepare(self, recipe):
+        output = os.path.join(self.output_root, recipe["image"])
+        return output, recipe["prompt"], recipe["prompt"]
+
+    def run(self, output, prompt):
+        self.runs.append(prompt)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(prompt)
+        return True
+
+    def close(self):
+        pass
+
+
+class MediaSchedulerTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.manifest = JobManifest(os.path.join(self.tmp.name, "jobs.sqlite3"))
+        self.addCleanup(self.manifest.db.close)
+        self.backend = FakeBackend(self.tmp.name)
+
+    def enqueue(self, scheduler, image, prompt, priority):
+        scheduler.enqueue({"image": image, "prompt": prompt}, priority)
+
+    def test_jobs_run_in_priority_order(self):
+        with MediaScheduler([self.backend], self.manifest) as scheduler:
+            self.enqueue(scheduler, "a.jpg", "a", 3)
+            self.enqueue(scheduler, "b.jpg", "b", 1)
+            self.enqueue(scheduler, "c.jpg", "c", 2)
+            scheduler.run()
+        self.assertEqual(self.backend.runs, ["b", "c", "a"])
+
+    def test_duplicate_prompt_runs_once_and_is_copied(self):
+        with MediaScheduler([self.backend], self.manifest) as scheduler:
+            self.enqueue(scheduler, "a.jpg", "zupa", 2)
+            self.enqueue(scheduler, "b.jpg", "inna", 1)
+            # Duplikat z wyższym priorytetem przesuwa wspólne zadanie w kolejce
+            self.enqueue(scheduler, "c.jpg", "zupa", 0)
+            self.enqueue(scheduler, "c.jpg", "zupa", 0)
+            stats = scheduler.run()
+        self.assertEqual(self.backend.runs, ["zupa", "inna"])
+        self.assertEqual(stats["queued"], 2)
+        self.assertEqual(stats["deduplicated"], 1)
+        self.assertEqual(stats["done"], 3)
+        for name in ["a.jpg", "c.jpg"]:
+            with open(os.path.join(self.tmp.name, name), encoding="utf-8") as f:
+                self.assertEqual(f.read(), "zupa")
+        self.assertEqual(self.manifest.counts("image"), {DONE: 3})
+
+    def test_done_jobs_are_skipped(self):
+        with MediaScheduler([self.backend], self.manifest) as scheduler:
+            self.enqueue(scheduler, "a.jpg", "a", 1)
+            scheduler.run()
+        with MediaScheduler([self.backend], self.manifest) as scheduler:
+            self.enqueue(scheduler, "a.jpg", "a", 1)
+            self.assertEqual(scheduler.run()["queued"], 0)
+        self.assertEqual(self.backend.runs, ["a"])
+
+
+class AllTalkBackendTestCase(TestCase):
+    def test_manifest_path_matches_written_file(self):
+        pool = ServerPool([TTSServer("127.0.0.1:7851")])
+        backend = AllTalkBackend(pool, None, None, output_root="audio-output")
+        output, _, _ = backend.prepare(
+            {"name": "Zupa", "recipe": "Gotuj", "audio": "Polska/Zupa_Ogórkowa.opus"}
+        )
+        self.assertEqual(
+            output, os.path.join("audio-output", "Polska", "zupa_ogórkowa.opus")
+        )
+        with MediaScheduler([backend], None):
+            pass
+        with self.assertRaises(RuntimeError):
+            backend.segment_executor.submit(print)
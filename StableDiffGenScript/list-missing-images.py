@@ -1,38 +1,25 @@
 import os
-import json
+import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def check_if_image_exists(recipe, output_dir):
-    if_exists = False
-    name = recipe.get("name")
-    name = name.replace(" ", "_")
-    name = str.lower(name)
-    gen_img_name = f"{output_dir}/{name}.jpg"
-    if_exists = os.path.exists(gen_img_name)
-
-    return if_exists
+from MediaGenCommon.asset_inventory import AssetInventory  # noqa: E402
+from MediaGenCommon.catalog import load_json_catalog  # noqa: E402
 
 
 input_directory = "json-input"
 
-with open("missing-images.txt", "w", encoding="utf-8") as file:
-    file.write("\t\t\tMissing images:\n")
-
-for filename in os.listdir(input_directory):
-    if filename.endswith(".json"):
-        input_file_name = os.path.join(input_directory, filename)
+# One scan of images-output, reusing checksums of unchanged files
+inventory = AssetInventory()
+inventory.refresh()
+report = inventory.report(load_json_catalog(input_directory))["images"]
 
-        # Load the JSON data from the file
-        with open(input_file_name, "r", encoding="utf-8") as file:
-            recipes_data = json.load(file)
+lines = ["\t\t\tMissing images:\n"]
+for path, name in report["missing"]:
+    filename = f"{path.split('/')[0]}.json"
+    lines.append(f"\n{filename}:\t\t{name}")
+for path in report["corrupt"]:
+    lines.append(f"\ncorrupt:\t\t{path}")
 
-        # Create an output directory for each JSON file
-        output_dir = os.path.join("images-output", f"{filename.split('.')[0]}")
-        os.makedirs(output_dir, exist_ok=True)
-
-        for recipe in recipes_data:
-            # Check if the image already exists
-            if not check_if_image_exists(recipe, output_dir):
-                message = f"\n{filename}:\t\t{recipe.get('name')}"
-                with open("missing-images.txt", "a", encoding="utf-8") as file:
-                    file.write(message)
+with open("missing-images.txt", "w", encoding="utf-8") as file:
+    file.writelines(lines)
@@ -1,10 +1,19 @@
 import os
+import sys
+import time
+import argparse
 import requests
 import json
 import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from PIL import Image
 from io import BytesIO
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MediaGenCommon.job_manifest import DONE, JobManifest, atomic_output  # noqa: E402
+
 
 # Model absolutereality_v181.safetensors [463d6a9fe8]
 
@@ -15,12 +24,14 @@ input_directory = "json-input/"
 # Define the URL of the Stable Diffusion API endpoint
 api_url = "http://127.0.0.1:7860/sdapi/v1/txt2img"
 
+# (connect, read) timeout in seconds; a 1024px txt2img run can take minutes
+request_timeout = (10, 600)
 
+# Job manifest used to resume interrupted generation
+manifest_path = "jobs.sqlite3"
 
-# Function to generate image for a given recipe
-def generate_image_from_recipe(
-    recipe, output_dir, input_file_name, jpeg_quality=50
-):
+
+def build_request(recipe):
     name = recipe["name"]
     ingredients = ", ".join(recipe["ingredients"])
 
@@ -52,94 +63,198 @@ def generate_image_from_recipe(
         "send_images": True,
         "save_images": False,
     }
+    return data
+
+
+def image_path(recipe, output_dir):
+    name = recipe["name"]
+    name = name.replace(" ", "_")
+    name = str.lower(name)
+    return f"{output_dir}/{name}.jpg"
+
+
+def request_fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+# Function to request an image for a given recipe; runs on a network thread
+def fetch_image(session, recipe, url=api_url):
+    name = recipe["name"]
+    data = build_request(recipe)
 
     headers = {
         "Content-Type": "application/json",
     }
 
-    # Send a POST request to the API
-    response = requests.post(api_url, headers=headers, data=json.dumps(data))
+    # Send a POST request to the API; a hung backend must not block the worker
+    response = session.post(
+        url, headers=headers, data=json.dumps(data), timeout=request_timeout
+    )
 
     if response.status_code == 200:
-        # Assuming the response contains the image as base64-encoded data
+        # Assuming the response contains the image as base64-encoded data;
+        # a non-JSON body raises ValueError
         result = response.json()
-        image_data = result.get("images")[0]
+        images = result.get("images") if isinstance(result, dict) else None
+        if images and images[0]:
+            return images[0]
+        print(f"No image data found for {name}.")
+    else:
+        print(f"Request failed for {name} with status code {response.status_code}")
+        print(response.text)
+    return None
+
+
+# Decode and compress the image; runs in a worker process
+def save_image(image_data, gen_img_name, jpeg_quality=50):
+    # Decode the base64 data
+    image_bytes = base64.b64decode(image_data)
+
+    # Open the image using Pillow
+    image = Image.open(BytesIO(image_bytes))
+
+    # Compress into jpeg; the file appears under its final name only when complete
+    with atomic_output(gen_img_name) as temp_name:
+        image.convert("RGB").save(temp_name, "JPEG", quality=jpeg_quality)
+    return gen_img_name
+
+
+def generate_images(
+    recipes, output_dir, manifest, session, fetch_pool, encode_pool, jpeg_quality
+):
+    """
+    Keeps up to the fetch pool size of txt2img requests in flight while
+    decoding and JPEG encoding of finished images runs in worker processes.
+    Returns the number of saved images.
+    """
+    fetches = {}
+    for recipe in recipes:
+        # Skip images already generated from the same request
+        gen_img_name = image_path(recipe, output_dir)
+        fingerprint = request_fingerprint(build_request(recipe))
+        if manifest.sync("image", gen_img_name, fingerprint) == DONE:
+            continue
+        manifest.start("image", gen_img_name)
+        fetches[fetch_pool.submit(fetch_image, session, recipe)] = gen_img_name
 
+    saves = {}
+    for future in as_completed(fetches):
+        gen_img_name = fetches[future]
+        try:
+            image_data = future.result()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Request failed for {gen_img_name}: {e}")
+            image_data = None
         if image_data:
-            # Decode the base64 data
-            image_bytes = base64.b64decode(image_data)
+            saves[
+                encode_pool.submit(save_image, image_data, gen_img_name, jpeg_quality)
+            ] = gen_img_name
+        else:
+            manifest.fail("image", gen_img_name, "request")
 
-            # Open the image using Pillow
-            image = Image.open(BytesIO(image_bytes))
+    saved = 0
+    for future in as_completed(saves):
+        gen_img_name = saves[future]
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Failed to save {gen_img_name}: {e}")
+            manifest.fail("image", gen_img_name, "encode")
+            continue
+        manifest.finish("image", gen_img_name)
+        print(f"Image saved as JPEG: {gen_img_name}")
+        saved += 1
+    return saved
 
-            # Convert the image to JPEG
-            input_file_without_extension = os.path.splitext(input_file_name)[0]
-            input_file_without_extension = input_file_without_extension.split(
-                "/"
-            )
-            input_file_without_extension = "/".join(
-                input_file_without_extension[1:]
-            )
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Generate recipe images with the Stable Diffusion API"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=2,
+        help="Number of txt2img requests kept in flight",
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=None,
+        help="Processes decoding and encoding images (default: CPU count)",
+    )
+    parser.add_argument("--jpeg-quality", type=int, default=50)
+    parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="Continue to the next file without asking",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    manifest = JobManifest(manifest_path)
+    session = requests.Session()
+    session.mount(
+        "http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    )
+    total_images = 0
+    total_seconds = 0.0
+
+    with ThreadPoolExecutor(args.concurrency) as fetch_pool, ProcessPoolExecutor(
+        args.encode_workers
+    ) as encode_pool:
+        # Process all JSON files in the directory
+        for filename in os.listdir(input_directory):
+            if not filename.endswith(".json"):
+                continue
+            input_file_name = os.path.join(input_directory, filename)
+
+            # Load the JSON data from the file
+            with open(input_file_name, "r", encoding="utf-8") as file:
+                recipes_data = json.load(file)
+
+            # Create an output directory for each JSON file
+            output_dir = os.path.join("images-output", f"{filename.split('.')[0]}")
             os.makedirs(output_dir, exist_ok=True)
-            gen_img_name = (
-                f"{output_dir}/{name}.jpg"
-            )
-            gen_img_name = gen_img_name.replace(" ", "_")
-            gen_img_name = str.lower(gen_img_name)
-            # Compress into jpeg
-            image.convert("RGB").save(
-                gen_img_name, "JPEG", quality=jpeg_quality
+
+            file_started = time.perf_counter()
+            images_generated_counter = generate_images(
+                recipes_data,
+                output_dir,
+                manifest,
+                session,
+                fetch_pool,
+                encode_pool,
+                args.jpeg_quality,
             )
-            print(f"Image saved as JPEG for {output_dir}/{name}.")
+            seconds = time.perf_counter() - file_started
+            total_images += images_generated_counter
+            total_seconds += seconds
+            if images_generated_counter:
+                minutes = seconds / 60
+                print(
+                    f"{filename}: {images_generated_counter} images, "
+                    f"{images_generated_counter / minutes:.1f} images/min"
+                )
 
-        else:
-            print(f"No image data found for {name}.")
-    else:
+            # Ask user if they want to continue to the next file
+            if images_generated_counter > 0 and not args.yes:
+                user_input = input(
+                    f"Processed {filename}. Do you want to continue to the next file? (y/n): "
+                )
+                if user_input.lower() != "y":
+                    print("Exiting...")
+                    break
+
+    if total_images:
         print(
-            f"Request failed for {name} with status code {response.status_code}"
+            f"Total: {total_images} images, "
+            f"{total_images / (total_seconds / 60):.1f} images/min"
         )
-        print(response.text)
+    print("All files processed.")
 
 
-def check_if_image_exists(recipe, output_dir):
-    if_exists = False
-    name = recipe["name"]
-    name = name.replace(" ", "_")
-    name = str.lower(name)
-    gen_img_name = f"{output_dir}/{name}.jpg"
-    if_exists = os.path.exists(gen_img_name)
-
-    return if_exists
-
-# Process all JSON files in the directory
-for filename in os.listdir(input_directory):
-    if filename.endswith(".json"):
-        input_file_name = os.path.join(input_directory, filename)
-
-        # Load the JSON data from the file
-        with open(input_file_name, "r", encoding="utf-8") as file:
-            recipes_data = json.load(file)
-
-        # Create an output directory for each JSON file
-        output_dir = os.path.join("images-output", f"{filename.split('.')[0]}")
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Process each recipe in the JSON file
-        images_generated_counter = 0
-        for recipe in recipes_data:
-            # Check if the image already exists
-            if check_if_image_exists(recipe, output_dir):
-                # print(f"\nImage already exists for {recipe['name']}.")
-                continue
-            generate_image_from_recipe(recipe, output_dir, input_file_name)
-            images_generated_counter += 1
-
-        # Ask user if they want to continue to the next file
-        if images_generated_counter > 0:
-            user_input = input(
-                f"Processed {filename}. Do you want to continue to the next file? (y/n): "
-            )
-            if user_input.lower() != "y":
-                print("Exiting...")
-                break
-print("All files processed.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from MediaGenCommon.job_manifest import FAILED, JobManifest
+from StableDiffGenScript.main import fetch_image, generate_images, request_timeout
+
+RECIPE = {"name": "Zupa", "ingredients": ["woda"]}
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None, text="{}"):
+        self.status_code = status_code
+        self.body = body
+        self.text = text
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("Expecting value")
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.timeouts = []
+
+    def post(self, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        return self.response
+
+
+class FetchImageTestCase(TestCase):
+    def test_timeout_and_missing_images(self):
+        for body in ({}, {"images": []}, {"images": None}):
+            session = FakeSession(FakeResponse(body=body))
+            self.assertIsNone(fetch_image(session, RECIPE))
+            self.assertEqual(session.timeouts, [request_timeout])
+        session = FakeSession(FakeResponse(body={"images": ["aGVq"]}))
+        self.assertEqual(fetch_image(session, RECIPE), "aGVq")
+
+    def test_malformed_response_marks_job_failed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = JobManifest(os.path.join(tmp, "jobs.sqlite3"))
+            session = FakeSession(FakeResponse(text="<html>"))
+            with ThreadPoolExecutor(1) as pool:
+                saved = generate_images(
+                    [RECIPE], tmp, manifest, session, pool, pool, 50
+                )
+            self.assertEqual(saved, 0)
+            self.assertEqual(manifest.counts("image"), {FAILED: 1})
+            manifest.db.close()
@@ -0,0 +1,30 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    """
+    Konfiguracja aplikacji core.
+    """
+
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "core"
+
+    def ready(self):
+        """
+        Rejestruje funkcje SQL w każdym nowym połączeniu z bazą
+        oraz odbiorców sygnałów aplikacji.
+        """
+        # Kolejność odbiorców catalog_updated: najpierw repliki, potem cache
+        # i pliki pochodne, żeby nic nie zostało zbudowane ze starych danych
+        from core import replicas  # noqa: F401
+        from core import catalog, snapshot, static_api  # noqa: F401
+        from core.fields import register_sql_functions
+        from core.query_budget import install_progress_handler
+
+        connection_created.connect(
+            register_sql_functions, dispatch_uid="core.register_sql_functions"
+        )
+        connection_created.connect(
+            install_progress_handler, dispatch_uid="core.install_progress_handler"
+        )
@@ -0,0 +1,171 @@
+"""
+Moduł uzupełniający metadane plików multimedialnych przepisów.
+
+Korzysta z inwentarza zasobów (``MediaGenCommon.asset_inventory``), który
+skanuje foldery ``images-output`` i ``audio-output`` raz i przelicza tylko
+zmienione pliki, a następnie zapisuje w modelu Recipe, czy plik istnieje,
+jego rozmiar, wymiary obrazu, długość nagrania i czy istnieje jego
+wersja podzielona na segmenty HLS.
+
+Dla obrazów liczony jest też podgląd zastępczy (LQIP: miniatura JPEG
+zakodowana jako data URI) oraz kolor dominujący, wyświetlane przez
+interfejs przed wczytaniem pełnego obrazu. Dekodowanie obrazów odbywa
+się w puli procesów i tylko dla obrazów, których suma kontrolna się
+zmieniła.
+"""
+
+import base64
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from PIL import Image
+
+from core.models import Recipe
+from MediaGenCommon.asset_inventory import ASSET_KINDS, AssetInventory
+from MediaGenCommon.catalog import asset_key, playlist_path
+
+# Pola modelu Recipe aktualizowane na podstawie inwentarza
+ASSET_FIELDS = (
+    "has_image",
+    "image_size",
+    "image_width",
+    "image_height",
+    "has_audio",
+    "audio_size",
+    "audio_duration",
+    "has_audio_segments",
+    "image_checksum",
+)
+# Pola modelu Recipe z podglądem zastępczym obrazu
+PLACEHOLDER_FIELDS = ("image_placeholder", "image_color")
+BATCH_SIZE = 500
+# Dłuższy bok miniatury LQIP w pikselach i jej jakość JPEG
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 50
+# Liczba kolorów palety, z której wybierany jest kolor dominujący
+PALETTE_COLORS = 8
+
+
+def asset_values(inventory: AssetInventory, image_path: str, audio_path: str) -> dict:
+    """
+    Wyznacza wartości pól metadanych przepisu na podstawie inwentarza.
+    Uszkodzone pliki są traktowane jak brakujące.
+
+    :param inventory: Odświeżony inwentarz zasobów
+    :type inventory: AssetInventory
+    :param image_path: Ścieżka obrazu względem images-output
+    :type image_path: str
+    :param audio_path: Ścieżka nagrania względem audio-output
+    :type audio_path: str
+    :return: Słownik nazwa pola -> wartość
+    :rtype: dict
+    """
+    image = inventory.get("images", asset_key(image_path or ""))
+    audio = inventory.get("audio", asset_key(audio_path or ""))
+    playlist = inventory.get("playlists", playlist_path(asset_key(audio_path or "")))
+    image_meta = image and image["metadata"]
+    audio_meta = audio and audio["metadata"]
+    return {
+        "has_image": bool(image_meta),
+        "image_size": image["size"] if image_meta else None,
+        "image_width": image_meta["width"] if image_meta else None,
+        "image_height": image_meta["height"] if image_meta else None,
+        "has_audio": bool(audio_meta),
+        "audio_size": audio["size"] if audio_meta else None,
+        "audio_duration": audio_meta["duration"] if audio_meta else None,
+        "has_audio_segments": bool(audio_meta and playlist and playlist["metadata"]),
+        "image_checksum": image["sha256"] if image_meta else "",
+    }
+
+
+def image_placeholder(path: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Liczy podgląd zastępczy i kolor dominujący obrazu. Funkcja działa
+    w procesach puli, więc nie korzysta z ORM ani ustawień Django.
+
+    :param path: Ścieżka pliku obrazu
+    :type path: str
+    :return: Krotka (data URI miniatury JPEG, kolor ``#rrggbb``) albo
+        (None, None), gdy obrazu nie da się zdekodować
+    :rtype: Tuple[Optional[str], Optional[str]]
+    """
+    try:
+        with Image.open(path) as image:
+            image.draft("RGB", (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+            image = image.convert("RGB")
+    except (OSError, SyntaxError, ValueError):
+        return None, None
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, "JPEG", quality=PLACEHOLDER_QUALITY, optimize=True)
+    placeholder = (
+        "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+    # Kolor dominujący: najczęstszy kolor palety zredukowanego obrazu
+    palette_image = image.resize((64, 64)).quantize(colors=PALETTE_COLORS)
+    _, index = max(palette_image.getcolors())
+    red, green, blue = palette_image.getpalette()[index * 3 : index * 3 + 3]
+    return placeholder, f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def update_recipe_assets(
+    assets_dir: Optional[str] = None, workers: Optional[int] = None
+) -> int:
+    """
+    Odświeża inwentarz zasobów i zapisuje metadane plików w przepisach.
+    Zapisywane są tylko przepisy, których metadane się zmieniły; podglądy
+    zastępcze są liczone tylko dla nowych lub zmienionych obrazów.
+
+    :param assets_dir: Folder z images-output i audio-output, domyślnie ``settings.ASSETS_DIR``
+    :type assets_dir: Optional[str]
+    :param workers: Liczba procesów liczących podglądy, domyślnie liczba CPU
+    :type workers: Optional[int]
+    :return: Liczba zaktualizowanych przepisów
+    :rtype: int
+    """
+    base_dir = assets_dir or settings.ASSETS_DIR
+    inventory = AssetInventory(base_dir)
+    inventory.refresh()
+    changed = []
+    # Suma kontrolna -> ścieżka obrazu, dla którego trzeba policzyć podgląd
+    pending = {}
+    fields = ("id", "image_path", "audio_path", *ASSET_FIELDS, *PLACEHOLDER_FIELDS)
+    for recipe in Recipe.objects.only(*fields):
+        values = asset_values(inventory, recipe.image_path, recipe.audio_path)
+        if values["image_checksum"] != recipe.image_checksum:
+            values.update(image_placeholder=None, image_color=None)
+            if values["image_checksum"]:
+                pending[values["image_checksum"]] = os.path.join(
+                    base_dir, ASSET_KINDS["images"][1], asset_key(recipe.image_path)
+                )
+        if any(getattr(recipe, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(recipe, name, value)
+            changed.append(recipe)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            placeholders = dict(
+                zip(
+                    pending,
+                    executor.map(image_placeholder, pending.values(), chunksize=16),
+                )
+            )
+        for recipe in changed:
+            if recipe.image_checksum in placeholders:
+                recipe.image_placeholder, recipe.image_color = placeholders[
+                    recipe.image_checksum
+                ]
+
+    with transaction.atomic():
+        Recipe.objects.bulk_update(
+            changed, ASSET_FIELDS + PLACEHOLDER_FIELDS, batch_size=BATCH_SIZE
+        )
+    return len(changed)
@@ -0,0 +1,212 @@
+"""
+Moduł z narzędziami pomocniczymi do benchmarków.
+
+Zawiera generator syntetycznych tekstów przepisów i całego katalogu
+oraz funkcje do pomiaru czasu wykonania i podsumowywania wyników.
+"""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+SENTENCES = [
+    "Rozgrzej olej na patelni i podsmaż cebulę, aż się zeszkli.",
+    "Dodaj czosnek i smaż jeszcze minutę.",
+    "Wymieszaj wszystkie składniki w misce.",
+    "Dopraw do smaku solą i pieprzem.",
+    "Gotuj na małym ogniu przez 20 minut, często mieszając.",
+    "Rozgrzej piekarnik do 180 stopni i piecz przez około 30 minut.",
+    "Pokrój warzywa w kostkę i dodaj do garnka.",
+    "Odstaw na 10 minut, aby smaki się połączyły.",
+    "Podawaj na ciepło, udekoruj świeżymi ziołami.",
+    "Doprowadź bulion do wrzenia, a następnie zmniejsz ogień.",
+    "Ugotuj makaron al dente zgodnie z instrukcją na opakowaniu.",
+    "Zagnieć gładkie ciasto i odstaw je pod przykryciem na godzinę.",
+]
+
+INGREDIENT_WORDS = [
+    "pomidory",
+    "papryka",
+    "marchewka",
+    "ziemniaki",
+    "kurczak",
+    "wołowina",
+    "ryż",
+    "makaron",
+    "śmietana",
+    "masło",
+    "imbir",
+    "kolendra",
+    "bazylia",
+    "cukinia",
+    "bakłażan",
+    "ciecierzyca",
+    "soczewica",
+    "tofu",
+    "krewetki",
+]
+
+
+def synthetic_recipe_text(rng: random.Random, sentences: int = 12) -> str:
+    """
+    Generuje syntetyczny tekst instrukcji przepisu.
+
+    :param rng: Generator liczb losowych
+    :type rng: random.Random
+    :param sentences: Liczba zdań w tekście
+    :type sentences: int
+    :return: Tekst instrukcji
+    :rtype: str
+    """
+    parts = []
+    for _ in range(sentences):
+        sentence = rng.choice(SENTENCES)
+        if rng.random() < 0.5:
+            sentence = sentence[:-1] + f", dodając {rng.choice(INGREDIENT_WORDS)}."
+        parts.append(sentence)
+    return " ".join(parts)
+
+
+def measure(fn: Callable[[], object], repeat: int = 20) -> Dict[str, float]:
+    """
+    Mierzy czas wykonania funkcji i zwraca statystyki w milisekundach.
+
+    :param fn: Funkcja bez argumentów do zmierzenia
+    :type fn: Callable[[], object]
+    :param repeat: Liczba powtórzeń pomiaru
+    :type repeat: int
+    :return: Słownik z kluczami: median, p95, min
+    :rtype: Dict[str, float]
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Podsumowuje listę próbek czasu (w milisekundach).
+
+    :param samples: Lista zmierzonych czasów
+    :type samples: List[float]
+    :return: Słownik z kluczami: median, p95, min
+    :rtype: Dict[str, float]
+    """
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "median": statistics.median(ordered),
+        "p95": ordered[p95_index],
+        "min": ordered[0],
+    }
+
+
+def format_stats(stats: Dict[str, float]) -> str:
+    """
+    Formatuje statystyki czasu do jednej linii tekstu.
+
+    :param stats: Statystyki zwrócone przez ``measure`` lub ``summarize``
+    :type stats: Dict[str, float]
+    :return: Sformatowany tekst
+    :rtype: str
+    """
+    return (
+        f"median {stats['median']:.3f} ms, "
+        f"p95 {stats['p95']:.3f} ms, min {stats['min']:.3f} ms"
+    )
+
+
+def populate_catalog(
+    recipes: int = 1000,
+    cuisines: int = 20,
+    diets: int = 8,
+    ingredients: int = 400,
+    seed: int = 0,
+) -> None:
+    """
+    Wypełnia bazę syntetycznym katalogiem przepisów.
+
+    Składniki są losowane z rozkładem skośnym (popularne składniki
+    występują w wielu przepisach), tak jak w prawdziwym katalogu.
+
+    :param recipes: Liczba przepisów
+    :type recipes: int
+    :param cuisines: Liczba kuchni
+    :type cuisines: int
+    :param diets: Liczba diet
+    :type diets: int
+    :param ingredients: Liczba składników
+    :type ingredients: int
+    :param seed: Ziarno generatora liczb losowych
+    :type seed: int
+    """
+    from core.models import Cuisine, Diet, Ingredient, Recipe
+
+    rng = random.Random(seed)
+    cuisine_objs = Cuisine.objects.bulk_create(
+        [Cuisine(name=f"Cuisine {i}") for i in range(cuisines)]
+    )
+    diet_objs = Diet.objects.bulk_create([Diet(name=f"Diet {i}") for i in range(diets)])
+    ingredient_objs = Ingredient.objects.bulk_create(
+        [Ingredient(name=f"Ingredient {i}") for i in range(ingredients)]
+    )
+    ingredient_weights = [1 / (rank + 1) for rank in range(ingredients)]
+
+    recipe_objs = Recipe.objects.bulk_create(
+        [
+            Recipe(
+                name=f"Recipe {i}",
+                cuisine=rng.choice(cuisine_objs),
+                recipe=synthetic_recipe_text(rng, rng.randint(6, 20)),
+                image_path=f"cuisine_{i % cuisines}/recipe_{i}.jpg",
+                audio_path=f"cuisine_{i % cuisines}/recipe_{i}.opus",
+            )
+            for i in range(recipes)
+        ],
+        batch_size=500,
+    )
+
+    diet_through = Recipe.diet.through
+    ingredient_through = Recipe.ingredients.through
+    diet_rows = []
+    ingredient_rows = []
+    for recipe in recipe_objs:
+        for diet in rng.sample(diet_objs, rng.randint(1, min(3, diets))):
+            diet_rows.append(diet_through(recipe_id=recipe.id, diet_id=diet.id))
+        picked = set(
+            rng.choices(range(ingredients), ingredient_weights, k=rng.randint(5, 15))
+        )
+        for index in picked:
+            ingredient_rows.append(
+                ingredient_through(
+                    recipe_id=recipe.id, ingredient_id=ingredient_objs[index].id
+                )
+            )
+    diet_through.objects.bulk_create(diet_rows, batch_size=1000)
+    ingredient_through.objects.bulk_create(ingredient_rows, batch_size=1000)
+
+
+@contextmanager
+def synthetic_catalog_database(recipes: int = 1000, **kwargs):
+    """
+    Tworzy tymczasową bazę testową z syntetycznym katalogiem
+    i usuwa ją po zakończeniu bloku.
+
+    :param recipes: Liczba przepisów w katalogu
+    :type recipes: int
+    :param kwargs: Dodatkowe argumenty przekazywane do ``populate_catalog``
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        populate_catalog(recipes=recipes, **kwargs)
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
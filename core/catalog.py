@@ -0,0 +1,97 @@
+"""
+Moduł śledzący wersję katalogu przepisów.
+
+Wersja jest częścią kluczy cache wyników zależnych od katalogu
+(np. liczników facet), więc jej zwiększenie po imporcie unieważnia
+wszystkie takie wpisy naraz.
+
+Przy ustawionym ``CATALOG_VERSION_FILE`` wersja jest zapisywana w pliku
+podmienianym atomowo, więc zwiększenie jej przez polecenie importu widzą
+wszystkie procesy serwera (odczyt kosztuje jedno ``stat``). Bez tego
+ustawienia wersja trzyma się w domyślnym cache, który przy ``LocMemCache``
+jest osobny dla każdego procesu.
+"""
+
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+
+from core.signals import catalog_updated
+
+CATALOG_VERSION_KEY = "catalog:version"
+
+# Ostatnio odczytany plik wersji: (klucz pliku z os.stat, wersja)
+_file_version = (None, 1)
+_lock = threading.Lock()
+
+
+def _read_version_file(path: str) -> int:
+    global _file_version
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 1
+    key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+    cached_key, version = _file_version
+    if cached_key != key:
+        try:
+            with open(path, encoding="utf-8") as f:
+                version = int(f.read().strip() or 1)
+        except (OSError, ValueError):
+            version = 1
+        _file_version = (key, version)
+    return version
+
+
+def _write_version_file(path: str, version: int):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".catalog-version-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"{version}\n")
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def catalog_version() -> int:
+    """
+    Zwraca bieżącą wersję katalogu.
+
+    :return: Numer wersji katalogu
+    :rtype: int
+    """
+    if settings.CATALOG_VERSION_FILE:
+        return _read_version_file(settings.CATALOG_VERSION_FILE)
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+@receiver(catalog_updated, dispatch_uid="core.catalog.bump_catalog_version")
+def bump_catalog_version(sender=None, **kwargs) -> int:
+    """
+    Zwiększa wersję katalogu, unieważniając zależne od niej wpisy cache.
+
+    :param sender: Nadawca sygnału
+    :return: Nowy numer wersji katalogu
+    :rtype: int
+    """
+    if settings.CATALOG_VERSION_FILE:
+        with _lock:
+            version = _read_version_file(settings.CATALOG_VERSION_FILE) + 1
+            _write_version_file(settings.CATALOG_VERSION_FILE, version)
+        return version
+    catalog_version()
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 2, timeout=None)
+        return 2
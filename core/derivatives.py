@@ -0,0 +1,388 @@
+"""
+Moduł generujący pomniejszone wersje obrazów przepisów (WebP i JPEG).
+
+Pochodne są zapisywane w cache adresowanym treścią: nazwa pliku to skrót
+SHA-256 z zawartości oryginału, szerokości, formatu i jakości, więc zmiana
+obrazu źródłowego automatycznie daje nowe pliki, a identyczne obrazy
+dzielą pochodne. Rozmiar cache jest ograniczony; najdawniej używane pliki
+(według czasu dostępu, odświeżanego przy trafieniu najwyżej raz na
+``TOUCH_INTERVAL``) są usuwane. ETag pochodnej pochodzi z jej klucza
+i rozmiaru, więc nie zmienia się przy trafieniach ani po ponownym renderowaniu.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_safe
+from PIL import Image
+
+from core.media import file_response, media_file, not_found
+from MediaGenCommon.asset_inventory import INDEX_FILE
+
+# Format w adresie URL -> (format Pillow, rozszerzenie, jakość)
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", ".webp", 75),
+    "jpeg": ("JPEG", ".jpg", 70),
+}
+# Co ile zapisów w procesie sprawdzany jest rozmiar cache
+EVICT_EVERY = 100
+# Ile razy renderować pochodną usuniętą przez równoległe czyszczenie cache
+RENDER_ATTEMPTS = 2
+# Co ile sekund najwyżej odświeżany jest czas dostępu pochodnej (LRU)
+TOUCH_INTERVAL = 3600
+# Znaki ścieżki zamieniane w adresach srcset (przecinek i spacja rozdzielają
+# wpisy srcset); ``%`` musi być pierwszy
+SRCSET_ESCAPES = [("%", "%25"), (" ", "%20"), (",", "%2C"), ("?", "%3F"), ("#", "%23")]
+
+_puts_since_evict = 0
+_inventory_lock = threading.Lock()
+_inventory = (None, {})
+
+
+def source_checksum(path: str) -> str:
+    """
+    Liczy skrót SHA-256 zawartości obrazu źródłowego.
+
+    :param path: Ścieżka obrazu
+    :type path: str
+    :return: Skrót szesnastkowy
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=4096)
+def _memoized_checksum(path: str, size: int, mtime_ns: int) -> str:
+    return source_checksum(path)
+
+
+def _inventory_images() -> dict:
+    global _inventory
+    index_path = os.path.join(settings.ASSETS_DIR, INDEX_FILE)
+    try:
+        stat = os.stat(index_path)
+    except OSError:
+        return {}
+    key = (index_path, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _inventory_lock:
+        if _inventory[0] != key:
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    images = json.load(f).get("images", {})
+            except (OSError, ValueError):
+                images = {}
+            _inventory = (key, images)
+        return _inventory[1]
+
+
+def image_checksum(full_path: str, path: str, stat: os.stat_result) -> str:
+    """
+    Zwraca skrót obrazu źródłowego bez czytania pliku, gdy to możliwe.
+
+    Skrót pochodzi z inwentarza zasobów (``asset-index.json``), gdy rozmiar
+    i mtime pliku zgadzają się z rekordem; w przeciwnym razie jest liczony
+    raz i zapamiętywany dla (ścieżka, rozmiar, mtime).
+
+    :param full_path: Bezwzględna ścieżka obrazu
+    :type full_path: str
+    :param path: Ścieżka obrazu względem folderu obrazów
+    :type path: str
+    :param stat: Wynik os.stat obrazu
+    :type stat: os.stat_result
+    :return: Skrót szesnastkowy
+    :rtype: str
+    """
+    record = _inventory_images().get(path)
+    if (
+        record is not None
+        and record["size"] == stat.st_size
+        and record["mtime_ns"] == stat.st_mtime_ns
+    ):
+        return record["sha256"]
+    return _memoized_checksum(full_path, stat.st_size, stat.st_mtime_ns)
+
+
+def derivative_path(cache_dir: str, checksum: str, width: int, fmt: str) -> str:
+    """
+    Zwraca ścieżkę pochodnej w cache adresowanym treścią.
+
+    :param cache_dir: Folder cache pochodnych
+    :type cache_dir: str
+    :param checksum: Skrót zawartości obrazu źródłowego
+    :type checksum: str
+    :param width: Szerokość pochodnej w pikselach
+    :type width: int
+    :param fmt: Format pochodnej (klucz DERIVATIVE_FORMATS)
+    :type fmt: str
+    :return: Ścieżka pliku pochodnej
+    :rtype: str
+    """
+    _, extension, quality = DERIVATIVE_FORMATS[fmt]
+    key = hashlib.sha256(f"{checksum}:{width}:{fmt}:{quality}".encode()).hexdigest()
+    return os.path.join(cache_dir, key[:2], f"{key}{extension}")
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".part", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def render_derivatives(
+    source: str,
+    cache_dir: str,
+    widths: Iterable[int],
+    formats: Iterable[str],
+    checksum: Optional[str] = None,
+) -> int:
+    """
+    Tworzy brakujące pochodne jednego obrazu. Obraz jest dekodowany raz
+    dla wszystkich szerokości i formatów. Funkcja nie korzysta z ustawień
+    Django, więc może działać w puli procesów.
+
+    :param source: Ścieżka obrazu źródłowego
+    :type source: str
+    :param cache_dir: Folder cache pochodnych
+    :type cache_dir: str
+    :param widths: Szerokości pochodnych
+    :type widths: Iterable[int]
+    :param formats: Formaty pochodnych (klucze DERIVATIVE_FORMATS)
+    :type formats: Iterable[str]
+    :param checksum: Znany skrót obrazu źródłowego; domyślnie liczony z pliku
+    :type checksum: Optional[str]
+    :return: Liczba utworzonych plików
+    :rtype: int
+    """
+    checksum = checksum or source_checksum(source)
+    missing = [
+        (width, fmt)
+        for width in widths
+        for fmt in formats
+        if not os.path.exists(derivative_path(cache_dir, checksum, width, fmt))
+    ]
+    if not missing:
+        return 0
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        for width, fmt in missing:
+            # Bez powiększania mniejszych obrazów
+            scale = min(1.0, width / image.width)
+            size = (
+                max(1, round(image.width * scale)),
+                max(1, round(image.height * scale)),
+            )
+            resized = image.resize(size, Image.LANCZOS) if scale < 1 else image
+            pil_format, _, quality = DERIVATIVE_FORMATS[fmt]
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, quality=quality)
+            _write_atomic(
+                derivative_path(cache_dir, checksum, width, fmt), buffer.getvalue()
+            )
+    return len(missing)
+
+
+def evict_derivatives(cache_dir: str, max_bytes: int) -> int:
+    """
+    Usuwa najdawniej używane pochodne, aż rozmiar cache nie przekracza limitu.
+
+    :param cache_dir: Folder cache pochodnych
+    :type cache_dir: str
+    :param max_bytes: Maksymalny rozmiar cache w bajtach
+    :type max_bytes: int
+    :return: Liczba usuniętych plików
+    :rtype: int
+    """
+    files = []
+    total = 0
+    if not os.path.isdir(cache_dir):
+        return 0
+    for bucket in os.scandir(cache_dir):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            if entry.name.endswith(".part"):
+                continue
+            stat = entry.stat()
+            files.append((stat.st_atime, stat.st_size, entry.path))
+            total += stat.st_size
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def derivative_cache_dir() -> str:
+    """
+    Zwraca folder cache pochodnych z ustawień.
+
+    :return: Ścieżka folderu
+    :rtype: str
+    """
+    return settings.DERIVATIVES_DIR or os.path.join(settings.ASSETS_DIR, "derivatives")
+
+
+@lru_cache(maxsize=None)
+def _url_prefix(fmt: str, width: int) -> str:
+    return reverse("serve_derivative", args=[fmt, width, "x"])[:-1]
+
+
+def srcset_path(image_path: str) -> str:
+    """
+    Zamienia w ścieżce obrazu znaki, które psują atrybut ``srcset`` lub
+    adres URL. Zamieniane są tylko znaki z ``SRCSET_ESCAPES`` (pozostałe,
+    np. polskie litery, zostają bez zmian), tak samo jak w ``srcset_sql``.
+
+    :param image_path: Ścieżka obrazu przepisu
+    :type image_path: str
+    :return: Ścieżka do użycia w adresie srcset
+    :rtype: str
+    """
+    for char, escaped in SRCSET_ESCAPES:
+        image_path = image_path.replace(char, escaped)
+    return image_path
+
+
+def image_srcset(image_path: str, has_image: bool) -> Optional[Dict[str, str]]:
+    """
+    Buduje mapę format -> atrybut ``srcset`` z adresami pochodnych obrazu.
+
+    :param image_path: Ścieżka obrazu przepisu
+    :type image_path: str
+    :param has_image: Czy obraz istnieje
+    :type has_image: bool
+    :return: Słownik srcset albo None, gdy przepis nie ma obrazu
+    :rtype: Optional[Dict[str, str]]
+    """
+    if not has_image:
+        return None
+    path = srcset_path(image_path)
+    return {
+        fmt: ", ".join(
+            f"{_url_prefix(fmt, width)}{path} {width}w"
+            for width in settings.IMAGE_DERIVATIVE_WIDTHS
+        )
+        for fmt in DERIVATIVE_FORMATS
+    }
+
+
+def srcset_sql(column: str = 'r."image_path"') -> str:
+    """
+    Buduje wyrażenie SQL tworzące tę samą mapę srcset co ``image_srcset``
+    (alias tabeli przepisów ``r``).
+
+    :param column: Wyrażenie SQL ze ścieżką obrazu
+    :type column: str
+    :return: Fragment SQL
+    :rtype: str
+    """
+    path = column
+    for char, escaped in SRCSET_ESCAPES:
+        # char() zamiast literałów: znak % w SQL koliduje z parametrami %s
+        codes = [", ".join(str(ord(c)) for c in text) for text in (char, escaped)]
+        path = f"replace({path}, char({codes[0]}), char({codes[1]}))"
+    parts: List[str] = []
+    for fmt in DERIVATIVE_FORMATS:
+        entries = " || ', ' || ".join(
+            f"'{_url_prefix(fmt, width)}' || {path} || ' {width}w'"
+            for width in settings.IMAGE_DERIVATIVE_WIDTHS
+        )
+        parts.append(f"'{fmt}', {entries}")
+    return f"json(CASE WHEN r.\"has_image\" THEN json_object({', '.join(parts)}) END)"
+
+
+@require_safe
+def serve_derivative(request, fmt: str, width: int, path: str):
+    """
+    Zwraca pochodną obrazu przepisu, tworząc ją przy pierwszym żądaniu.
+
+    :param request: Obiekt żądania HTTP
+    :type request: HttpRequest
+    :param fmt: Format pochodnej: webp lub jpeg
+    :type fmt: str
+    :param width: Szerokość z ustawienia IMAGE_DERIVATIVE_WIDTHS
+    :type width: int
+    :param path: Ścieżka obrazu źródłowego (image_path przepisu)
+    :type path: str
+    :return: Plik pochodnej albo błąd 404 (brakujący lub uszkodzony obraz)
+        lub 503 w formacie JSON
+    :rtype: HttpResponse
+    """
+    global _puts_since_evict
+    if fmt not in DERIVATIVE_FORMATS or width not in settings.IMAGE_DERIVATIVE_WIDTHS:
+        return JsonResponse(
+            {"error": f"Nieobsługiwany format lub szerokość: {fmt}/{width}"}, status=404
+        )
+    found = media_file("images", path)
+    if found is None:
+        return not_found(path)
+    full_path, stat = found
+    cache_dir = derivative_cache_dir()
+    checksum = image_checksum(full_path, path, stat)
+    target = derivative_path(cache_dir, checksum, width, fmt)
+    # Plik otwarty przed wysłaniem pozostaje dostępny, nawet gdy czyszczenie
+    # cache usunie go w międzyczasie; brak pliku oznacza ponowne renderowanie
+    opened = _open_cached(target)
+    if opened is None:
+        for _ in range(RENDER_ATTEMPTS):
+            try:
+                render_derivatives(full_path, cache_dir, [width], [fmt], checksum)
+            except (OSError, Image.DecompressionBombError):
+                return JsonResponse(
+                    {"error": f"Uszkodzony obraz źródłowy: {path}"}, status=404
+                )
+            opened = _open_cached(target)
+            if opened is not None:
+                break
+        else:
+            return JsonResponse({"error": "Nie udało się utworzyć obrazu."}, status=503)
+        _puts_since_evict += 1
+        if _puts_since_evict >= EVICT_EVERY:
+            _puts_since_evict = 0
+            evict_derivatives(cache_dir, settings.DERIVATIVES_MAX_MB * 1024 * 1024)
+    file, target_stat = opened
+    key = os.path.splitext(os.path.basename(target))[0]
+    etag = f'"{key}-{target_stat.st_size:x}"'
+    return file_response(request, target, target_stat, file=file, etag=etag)
+
+
+def _open_cached(path: str):
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    stat = os.fstat(file.fileno())
+    # Odświeżenie czasu dostępu (LRU) bez zmiany mtime, rzadziej niż przy
+    # każdym trafieniu, by odczyty z cache nie zapisywały na dysk
+    if time.time() - stat.st_atime > TOUCH_INTERVAL:
+        try:
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except FileNotFoundError:
+            pass
+    return file, stat
@@ -0,0 +1,150 @@
+"""
+Moduł liczący facety (liczby pasujących przepisów) dla wybranych filtrów.
+
+Wszystkie liczniki (łączna liczba, kuchnie, diety i najpopularniejsze
+składniki) są wyznaczane jednym zapytaniem agregującym
+(``UNION ALL`` grup ``GROUP BY`` nad zbiorem pasujących przepisów),
+a wynik jest cache'owany dla każdego zestawu filtrów.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import QuerySet
+
+from core.catalog import catalog_version
+from core.filters import filter_recipes
+from core.models import Recipe
+from core.query_language import canonical, filter_by_query, parse_query
+
+# Parametry zapytania wpływające na wynik facet
+FACET_PARAMS = (
+    "cuisine",
+    "diet",
+    "ingredient",
+    "exclude_cuisine",
+    "exclude_diet",
+    "exclude_ingredient",
+    "has_image",
+    "has_audio",
+)
+
+
+def facets_cache_key(params, top: int) -> str:
+    """
+    Buduje klucz cache dla zestawu filtrów, niezależny od kolejności
+    i powtórzeń parametrów.
+
+    :param params: Parametry zapytania (np. request.GET)
+    :type params: QueryDict
+    :param top: Liczba zwracanych składników
+    :type top: int
+    :return: Klucz cache
+    :rtype: str
+    :raises QuerySyntaxError: Gdy wyrażenie q jest nieprawidłowe
+    """
+    normalized = {
+        name: sorted(set(params.getlist(name)))
+        for name in FACET_PARAMS
+        if params.getlist(name)
+    }
+    if params.get("q"):
+        normalized["q"] = canonical(parse_query(params.get("q")))
+    digest = hashlib.sha1(
+        json.dumps([normalized, top], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return f"facets:{catalog_version()}:{digest}"
+
+
+def _m2m_facet_sql(field_name: str) -> str:
+    """
+    Buduje zapytanie grupujące pasujące przepisy według powiązanych
+    obiektów (diet lub składników).
+
+    :param field_name: Nazwa pola ManyToMany modelu Recipe
+    :type field_name: str
+    :return: Fragment SQL
+    :rtype: str
+    """
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through._meta.db_table
+    target = field.related_model._meta.db_table
+    return (
+        f"SELECT '{field_name}' AS kind, t.\"name\" AS name, COUNT(*) AS n "
+        f'FROM matched m INNER JOIN "{through}" x ON x."{field.m2m_column_name()}" = m.id '
+        f'INNER JOIN "{target}" t ON t."id" = x."{field.m2m_reverse_name()}" '
+        f'GROUP BY t."name"'
+    )
+
+
+def facet_counts(qs: QuerySet, top: int) -> dict:
+    """
+    Liczy pasujące przepisy łącznie oraz według kuchni, diet
+    i ``top`` najczęstszych składników, jednym zapytaniem.
+
+    :param qs: Przefiltrowany QuerySet przepisów
+    :type qs: QuerySet
+    :param top: Liczba zwracanych składników
+    :type top: int
+    :return: Słownik z kluczami: total, cuisines, diets, ingredients
+    :rtype: dict
+    """
+    result = {"total": 0, "cuisines": [], "diets": [], "ingredients": []}
+    try:
+        ids_sql, params = qs.order_by().values("id").query.get_compiler(qs.db).as_sql()
+    except EmptyResultSet:
+        return result
+
+    cuisine_table = Recipe._meta.get_field("cuisine").related_model._meta.db_table
+    sql = (
+        f"WITH matched(id) AS ({ids_sql}) "
+        "SELECT 'total', NULL, COUNT(*) FROM matched "
+        "UNION ALL "
+        "SELECT 'cuisine', c.\"name\", COUNT(*) FROM matched m "
+        f'INNER JOIN "{Recipe._meta.db_table}" r ON r."id" = m.id '
+        f'INNER JOIN "{cuisine_table}" c ON c."id" = r."cuisine_id" '
+        'GROUP BY c."name" '
+        f"UNION ALL {_m2m_facet_sql('diet')} "
+        "UNION ALL SELECT * FROM ("
+        f"{_m2m_facet_sql('ingredients')} ORDER BY n DESC, name LIMIT %s)"
+    )
+    keys = {"cuisine": "cuisines", "diet": "diets", "ingredients": "ingredients"}
+    with connections[qs.db].cursor() as cursor:
+        cursor.execute(sql, (*params, top))
+        for kind, name, count in cursor.fetchall():
+            if kind == "total":
+                result["total"] = count
+            else:
+                result[keys[kind]].append({"name": name, "count": count})
+
+    for key in ("cuisines", "diets", "ingredients"):
+        result[key].sort(key=lambda item: (-item["count"], item["name"]))
+    return result
+
+
+def cached_facet_counts(params, top: int) -> dict:
+    """
+    Zwraca liczniki facet dla filtrów z parametrów zapytania, z cache
+    lub liczy je i zapisuje w cache. Przy trafieniu w cache nie jest
+    wykonywane żadne zapytanie do bazy.
+
+    :param params: Parametry zapytania z filtrami (jak w RecipeFilterView)
+    :type params: QueryDict
+    :param top: Liczba zwracanych składników
+    :type top: int
+    :return: Słownik z licznikami facet
+    :rtype: dict
+    :raises QuerySyntaxError: Gdy wyrażenie q jest nieprawidłowe
+    """
+    key = facets_cache_key(params, top)
+    result = cache.get(key)
+    if result is None:
+        qs = filter_recipes(Recipe.objects.all(), params)
+        qs = filter_by_query(qs, params.get("q"))
+        result = facet_counts(qs, top)
+        cache.set(key, result, settings.FACETS_CACHE_TIMEOUT)
+    return result
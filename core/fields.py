@@ -0,0 +1,172 @@
+"""
+Moduł z niestandardowymi polami modeli.
+
+Zawiera pole ``CompressedTextField``, które przechowuje długie teksty
+(instrukcje przepisów) w bazie jako skompresowane dane binarne zlib
+i rozpakowuje je leniwie, dopiero przy pierwszym odczycie atrybutu.
+"""
+
+import zlib
+from typing import Union
+
+from django import forms
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+# Nagłówek formatu: pierwszy bajt określa wersję słownika zlib.
+# Zmiana słownika wymaga nowej wersji, inaczej stare wiersze nie dadzą się odczytać.
+FORMAT_PLAIN = 0x00
+FORMAT_ZDICT_V1 = 0x01
+
+COMPRESSION_LEVEL = 9
+
+# Wspólny słownik wstępny zlib (zdict) z typowymi frazami instrukcji przepisów.
+# Najczęstsze frazy znajdują się na końcu, bo tam są najtańsze do referencji.
+ZDICT_V1 = (
+    "szczypta soli i pieprzu, łyżeczka, łyżka, szklanka, ząbki czosnku, "
+    "cebula, marchewka, pomidory, papryka, śmietana, masło, mąka, cukier, "
+    "jajka, mleko, woda, bulion, oliwa z oliwek, olej roślinny, ryż, makaron, "
+    "ziemniaki, kurczak, wołowina, wieprzowina, ryba, ser, pietruszka, koperek, "
+    "Rozgrzej piekarnik do 180 stopni. Piecz przez około 30 minut. "
+    "Gotuj na małym ogniu, aż zgęstnieje. Doprowadź do wrzenia, "
+    "Wymieszaj wszystkie składniki w misce. Odstaw na 10 minut. "
+    "Pokrój w kostkę. Posiekaj drobno. Dopraw do smaku solą i pieprzem. "
+    "Rozgrzej olej na patelni i podsmaż cebulę, aż się zeszkli. "
+    "Dodaj czosnek i smaż jeszcze minutę. Dodaj pozostałe składniki i "
+    "gotuj przez 10 minut, często mieszając. Zdejmij z ognia. "
+    "Podawaj na ciepło. Podawaj od razu, udekoruj świeżymi ziołami. "
+    "Dodaj sól i pieprz do smaku. Dokładnie wymieszaj. Następnie dodaj "
+).encode("utf-8")
+
+
+def compress_text(text: str) -> bytes:
+    """
+    Kompresuje tekst do formatu zapisywanego w ``CompressedTextField``.
+
+    :param text: Tekst do skompresowania
+    :type text: str
+    :return: Bajt nagłówka i dane zlib ze wspólnym słownikiem
+    :rtype: bytes
+    """
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=ZDICT_V1)
+    payload = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    return bytes((FORMAT_ZDICT_V1,)) + payload
+
+
+def decompress_text(data: Union[bytes, memoryview]) -> str:
+    """
+    Rozpakowuje dane zapisane przez ``compress_text``.
+
+    :param data: Skompresowane dane z bazy
+    :type data: Union[bytes, memoryview]
+    :return: Oryginalny tekst
+    :rtype: str
+    :raises ValueError: Gdy nagłówek danych ma nieznaną wersję
+    """
+    data = bytes(data)
+    if not data:
+        return ""
+    header, payload = data[0], data[1:]
+    if header == FORMAT_ZDICT_V1:
+        decompressor = zlib.decompressobj(zdict=ZDICT_V1)
+        raw = decompressor.decompress(payload) + decompressor.flush()
+    elif header == FORMAT_PLAIN:
+        raw = zlib.decompress(payload)
+    else:
+        raise ValueError(f"Nieznany format skompresowanego tekstu: {header}")
+    return raw.decode("utf-8")
+
+
+def inflate_sql_function(data):
+    """
+    Funkcja SQL ``inflate_text`` rozpakowująca kolumnę ``CompressedTextField``
+    bezpośrednio w zapytaniu SQLite.
+
+    :param data: Skompresowane dane lub NULL
+    :type data: Optional[bytes]
+    :return: Rozpakowany tekst lub None
+    :rtype: Optional[str]
+    """
+    if data is None:
+        return None
+    if isinstance(data, str):
+        return data
+    return decompress_text(data)
+
+
+def register_sql_functions(sender, connection, **kwargs):
+    """
+    Rejestruje funkcje SQL pola w nowym połączeniu SQLite.
+
+    Podłączana do sygnału ``connection_created``.
+
+    :param sender: Klasa wrappera bazy danych
+    :param connection: Wrapper połączenia Django
+    :type connection: BaseDatabaseWrapper
+    """
+    if connection.vendor == "sqlite":
+        connection.connection.create_function(
+            "inflate_text", 1, inflate_sql_function, deterministic=True
+        )
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    """
+    Deskryptor przechowujący surowe bajty z bazy i rozpakowujący je
+    dopiero przy pierwszym odczycie atrybutu.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, (bytes, memoryview)):
+            value = decompress_text(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Pole tekstowe przechowywane w bazie jako skompresowany BLOB.
+
+    Z punktu widzenia kodu zachowuje się jak ``TextField``: przyjmuje
+    i zwraca ``str``. Przypisanie wartości typu ``bytes`` jest traktowane
+    jako już skompresowane dane.
+    """
+
+    descriptor_class = CompressedTextDescriptor
+    description = "Compressed text"
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("editable", True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.editable:
+            kwargs.pop("editable", None)
+        else:
+            kwargs["editable"] = False
+        return name, path, args, kwargs
+
+    def get_prep_value(self, value):
+        if isinstance(value, str):
+            return compress_text(value)
+        return super().get_prep_value(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decompress_text(value)
+        return value
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return super(models.BinaryField, self).formfield(
+            **{"form_class": forms.CharField, "widget": forms.Textarea, **kwargs}
+        )
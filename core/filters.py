@@ -0,0 +1,154 @@
+"""
+Moduł budujący zapytania filtrujące przepisy.
+
+Filtry "przepis ma wszystkie podane diety/składniki" są wyrażane jednym
+półzłączeniem (``recipe_id IN (... GROUP BY recipe_id HAVING COUNT = N)``)
+na tabeli pośredniej zamiast N osobnych złączeń, a filtry wykluczające
+jako antyzłączenia (``NOT EXISTS``). Nazwy są zamieniane na identyfikatory
+jednym zapytaniem na typ obiektu.
+"""
+
+from typing import Dict, Iterable, List, Type
+
+from django.db.models import Count, Exists, Model, OuterRef, QuerySet
+
+from core.models import Cuisine, Diet, Ingredient, Recipe
+
+# Filtry obecności plików multimedialnych (parametr -> pole modelu Recipe)
+ASSET_FILTERS = ("has_image", "has_audio")
+TRUE_VALUES = ("1", "true")
+FALSE_VALUES = ("0", "false")
+
+# Pola ManyToMany modelu Recipe dla poszczególnych filtrów
+M2M_FILTERS = {
+    "diet": ("diet", Diet),
+    "ingredient": ("ingredients", Ingredient),
+}
+
+
+def resolve_name_ids(model: Type[Model], names: Iterable[str]) -> Dict[str, List[int]]:
+    """
+    Zamienia nazwy obiektów na ich identyfikatory jednym zapytaniem.
+
+    :param model: Model z polem name (Cuisine, Diet lub Ingredient)
+    :type model: Type[Model]
+    :param names: Nazwy do wyszukania
+    :type names: Iterable[str]
+    :return: Słownik nazwa -> lista identyfikatorów (tylko znalezione nazwy)
+    :rtype: Dict[str, List[int]]
+    """
+    resolved: Dict[str, List[int]] = {}
+    names = set(names)
+    if not names:
+        return resolved
+    for pk, name in model.objects.filter(name__in=names).values_list("id", "name"):
+        resolved.setdefault(name, []).append(pk)
+    return resolved
+
+
+def has_all_subquery(field_name: str, name_ids: Dict[str, List[int]]) -> QuerySet:
+    """
+    Buduje podzapytanie zwracające identyfikatory przepisów powiązanych
+    ze wszystkimi podanymi obiektami (GROUP BY / HAVING COUNT = N).
+
+    :param field_name: Nazwa pola ManyToMany modelu Recipe
+    :type field_name: str
+    :param name_ids: Słownik nazwa -> identyfikatory z ``resolve_name_ids``
+    :type name_ids: Dict[str, List[int]]
+    :return: QuerySet wartości recipe_id
+    :rtype: QuerySet
+    """
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    target = field.m2m_reverse_field_name()
+    ids = [pk for pks in name_ids.values() for pk in pks]
+    # Przy zduplikowanych nazwach liczymy nazwy, a nie identyfikatory
+    count_field = target if len(ids) == len(name_ids) else f"{target}__name"
+    return (
+        through.objects.filter(**{f"{target}_id__in": ids})
+        .values("recipe_id")
+        .annotate(matched=Count(count_field, distinct=True))
+        .filter(matched=len(name_ids))
+        .values("recipe_id")
+    )
+
+
+def has_any_exists(field_name: str, ids: List[int]) -> Exists:
+    """
+    Buduje warunek EXISTS: przepis jest powiązany z co najmniej jednym
+    z podanych obiektów. Zanegowany daje antyzłączenie.
+
+    :param field_name: Nazwa pola ManyToMany modelu Recipe
+    :type field_name: str
+    :param ids: Identyfikatory powiązanych obiektów
+    :type ids: List[int]
+    :return: Wyrażenie Exists
+    :rtype: Exists
+    """
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through
+    target = field.m2m_reverse_field_name()
+    return Exists(
+        through.objects.filter(recipe_id=OuterRef("pk"), **{f"{target}_id__in": ids})
+    )
+
+
+def filter_recipes(qs: QuerySet, params) -> QuerySet:
+    """
+    Stosuje filtry inkluzywne i ekskluzywne z parametrów zapytania:
+    cuisine, diet, ingredient, exclude_cuisine, exclude_diet, exclude_ingredient,
+    oraz filtry obecności plików has_image i has_audio (``1``/``0``).
+
+    Kuchnie są łączone alternatywą, diety i składniki koniunkcją
+    ("przepis ma wszystkie"), a wykluczenia odrzucają przepisy mające
+    którykolwiek z podanych obiektów.
+
+    :param qs: QuerySet przepisów do przefiltrowania
+    :type qs: QuerySet
+    :param params: Parametry zapytania (np. request.GET)
+    :type params: QueryDict
+    :return: Przefiltrowany QuerySet
+    :rtype: QuerySet
+    """
+    for param in ASSET_FILTERS:
+        value = (params.get(param) or "").lower()
+        if value in TRUE_VALUES:
+            qs = qs.filter(**{param: True})
+        elif value in FALSE_VALUES:
+            qs = qs.filter(**{param: False})
+
+    cuisines = params.getlist("cuisine")
+    exclude_cuisines = params.getlist("exclude_cuisine")
+    if cuisines or exclude_cuisines:
+        cuisine_ids = resolve_name_ids(Cuisine, [*cuisines, *exclude_cuisines])
+        if cuisines:
+            qs = qs.filter(
+                cuisine_id__in=[
+                    pk for name in cuisines for pk in cuisine_ids.get(name, [])
+                ]
+            )
+        excluded = [pk for name in exclude_cuisines for pk in cuisine_ids.get(name, [])]
+        if excluded:
+            qs = qs.exclude(cuisine_id__in=excluded)
+
+    for param, (field_name, model) in M2M_FILTERS.items():
+        required = set(params.getlist(param))
+        excluded_names = set(params.getlist(f"exclude_{param}"))
+        if not required and not excluded_names:
+            continue
+        name_ids = resolve_name_ids(model, required | excluded_names)
+
+        if required:
+            if not required.issubset(name_ids):
+                return qs.none()
+            qs = qs.filter(
+                id__in=has_all_subquery(
+                    field_name, {name: name_ids[name] for name in required}
+                )
+            )
+
+        excluded = [pk for name in excluded_names for pk in name_ids.get(name, [])]
+        if excluded:
+            qs = qs.filter(~has_any_exists(field_name, excluded))
+
+    return qs
@@ -0,0 +1,241 @@
+import http.client
+import math
+import random
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.bench import format_stats, summarize
+from core.media import audio_playlist_url
+from core.models import Recipe
+
+READ_SIZE = 16 * 1024
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django porównująca start odtwarzania narracji z jednego pliku
+    .opus i z wersji podzielonej na segmenty HLS.
+
+    Pliki są pobierane przez HTTP z lokalnego serwera WSGI z aplikacją,
+    a łącze mobilne jest symulowane po stronie klienta: każde zapytanie
+    kosztuje jeden RTT, a treść jest odbierana z ograniczoną przepustowością.
+    Mierzone są: czas do pierwszego bajtu (TTFB), czas do zbuforowania
+    pierwszych sekund nagrania, czas przewinięcia do połowy oraz pobranie
+    całego pliku, na które czekają klienci bez odtwarzania progresywnego.
+    """
+
+    help = (
+        "Benchmark time-to-first-byte and startup latency of single-file vs HLS audio"
+    )
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--recipes", type=int, default=20, help="Number of sampled recipes"
+        )
+        parser.add_argument(
+            "--bandwidth-kbps",
+            type=int,
+            default=1600,
+            help="Simulated downlink bandwidth in kbit/s (default: 3G)",
+        )
+        parser.add_argument(
+            "--rtt-ms", type=float, default=150.0, help="Simulated round-trip time"
+        )
+        parser.add_argument(
+            "--startup-seconds",
+            type=float,
+            default=2.0,
+            help="Seconds of audio buffered before playback starts",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda wykonująca benchmark.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        :raises CommandError: Gdy żaden przepis nie ma nagrania w obu wersjach
+        """
+        recipes = list(
+            Recipe.objects.filter(has_audio=True, has_audio_segments=True).values_list(
+                "audio_path", "audio_size", "audio_duration"
+            )
+        )
+        if not recipes:
+            raise CommandError(
+                "No recipes with segmented audio; run inventory_assets after packaging."
+            )
+        recipes = random.Random(0).sample(
+            recipes, min(options["recipes"], len(recipes))
+        )
+        self.rtt = options["rtt_ms"] / 1000
+        self.bytes_per_second = options["bandwidth_kbps"] * 1000 / 8
+        startup_seconds = options["startup_seconds"]
+
+        server = make_server(
+            "127.0.0.1", 0, WSGIHandler(), ThreadingWSGIServer, QuietHandler
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        with override_settings(ALLOWED_HOSTS=["127.0.0.1"]):
+            thread.start()
+            self.port = server.server_port
+            try:
+                single = self.bench_single(recipes, startup_seconds)
+                segmented = self.bench_segmented(recipes, startup_seconds)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        self.stdout.write(
+            f"Recipes: {len(recipes)}, bandwidth: {options['bandwidth_kbps']} kbit/s, "
+            f"RTT: {options['rtt_ms']:.0f} ms, startup buffer: {startup_seconds:.1f} s"
+        )
+        for label, results in (("single file", single), ("segmented", segmented)):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for metric, samples in results.items():
+                self.stdout.write(f"  {metric:<16} {format_stats(summarize(samples))}")
+
+    def fetch(self, url, limit=None, byte_range=None):
+        """
+        Pobiera adres przez symulowane łącze.
+
+        :param url: Ścieżka zasobu
+        :type url: str
+        :param limit: Liczba bajtów, po której pobieranie jest przerywane
+        :type limit: Optional[int]
+        :param byte_range: Początek zakresu bajtów (nagłówek Range)
+        :type byte_range: Optional[int]
+        :return: Krotka (TTFB w ms, czas całkowity w ms, pobrane dane)
+        :rtype: tuple
+        """
+        start = time.perf_counter()
+        # Połowa RTT na zapytanie i połowa na pierwszy bajt odpowiedzi
+        time.sleep(self.rtt / 2)
+        conn = http.client.HTTPConnection("127.0.0.1", self.port)
+        headers = {"Range": f"bytes={byte_range}-"} if byte_range is not None else {}
+        conn.request("GET", url, headers=headers)
+        response = conn.getresponse()
+        if response.status not in (200, 206):
+            raise CommandError(f"GET {url} returned {response.status}")
+        time.sleep(self.rtt / 2)
+        first_byte = time.perf_counter()
+        data = b""
+        while limit is None or len(data) < limit:
+            chunk = response.read(READ_SIZE)
+            if not chunk:
+                break
+            data += chunk
+            # Odbiór nie szybszy niż przepustowość łącza
+            delay = first_byte + len(data) / self.bytes_per_second - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        conn.close()
+        end = time.perf_counter()
+        return (first_byte - start) * 1000, (end - start) * 1000, data
+
+    def bench_single(self, recipes, startup_seconds):
+        """
+        Mierzy odtwarzanie progresywne jednego pliku .opus.
+
+        :param recipes: Krotki (audio_path, audio_size, audio_duration)
+        :type recipes: list
+        :param startup_seconds: Sekundy nagrania buforowane przed startem
+        :type startup_seconds: float
+        :return: Słownik metryka -> lista czasów w ms
+        :rtype: dict
+        """
+        results = {"ttfb": [], "startup": [], "seek to middle": [], "full download": []}
+        for audio_path, size, duration in recipes:
+            url = reverse("serve_media", args=["audio", audio_path])
+            # Zakładany stały bitrate: bajty odpowiadające buforowi startowemu
+            needed = math.ceil(size * min(1.0, startup_seconds / max(duration, 0.001)))
+            ttfb, startup, _ = self.fetch(url, limit=needed)
+            results["ttfb"].append(ttfb)
+            results["startup"].append(startup)
+            _, seek, _ = self.fetch(url, limit=needed, byte_range=size // 2)
+            results["seek to middle"].append(seek)
+            results["full download"].append(self.fetch(url)[1])
+        return results
+
+    def bench_segmented(self, recipes, startup_seconds):
+        """
+        Mierzy odtwarzanie wersji HLS: playlista, segment inicjujący
+        i segmenty pokrywające bufor startowy.
+
+        :param recipes: Krotki (audio_path, audio_size, audio_duration)
+        :type recipes: list
+        :param startup_seconds: Sekundy nagrania buforowane przed startem
+        :type startup_seconds: float
+        :return: Słownik metryka -> lista czasów w ms
+        :rtype: dict
+        """
+        results = {"ttfb": [], "startup": [], "seek to middle": []}
+        for audio_path, _, duration in recipes:
+            url = audio_playlist_url(audio_path, True)
+            base = url.rsplit("/", 1)[0]
+            ttfb, elapsed, data = self.fetch(url)
+            init, segments = self.parse_playlist(data.decode("utf-8"))
+            if init:
+                elapsed += self.fetch(f"{base}/{init}")[1]
+            seek = elapsed
+            buffered = 0.0
+            position = 0.0
+            for segment_duration, name in segments:
+                # Start: segmenty od początku aż do wypełnienia bufora
+                if buffered < startup_seconds:
+                    elapsed += self.fetch(f"{base}/{name}")[1]
+                    buffered += segment_duration
+                # Przewinięcie: segment zawierający połowę nagrania
+                if position <= duration / 2 < position + segment_duration:
+                    seek += self.fetch(f"{base}/{name}")[1]
+                position += segment_duration
+            results["ttfb"].append(ttfb)
+            results["startup"].append(elapsed)
+            results["seek to middle"].append(seek)
+        return results
+
+    @staticmethod
+    def parse_playlist(text):
+        """
+        Odczytuje segment inicjujący i listę segmentów playlisty HLS.
+
+        :param text: Treść playlisty
+        :type text: str
+        :return: Krotka (nazwa segmentu inicjującego lub None, lista krotek
+            (długość, nazwa segmentu))
+        :rtype: tuple
+        """
+        init = None
+        segments = []
+        duration = 0.0
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith("#EXT-X-MAP:") and 'URI="' in line:
+                init = line.split('URI="', 1)[1].split('"', 1)[0]
+            elif line.startswith("#EXTINF:"):
+                duration = float(line[8:].split(",")[0])
+            elif line and not line.startswith("#"):
+                segments.append((duration, line))
+        return init, segments
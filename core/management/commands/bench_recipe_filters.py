@@ -0,0 +1,114 @@
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from core.bench import format_stats, measure, synthetic_catalog_database
+from core.filters import filter_recipes
+from core.models import Ingredient, Recipe
+
+
+def legacy_filter_recipes(qs, params):
+    """
+    Dawna implementacja filtrów: jedno złączenie na każdą wartość
+    diet/składników i ``distinct()`` na całym zbiorze wyników.
+
+    :param qs: QuerySet przepisów
+    :type qs: QuerySet
+    :param params: Parametry zapytania
+    :type params: QueryDict
+    :return: Przefiltrowany QuerySet
+    :rtype: QuerySet
+    """
+    qs = qs.distinct()
+    for diet in params.getlist("diet"):
+        qs = qs.filter(diet__name=diet)
+    for ing in params.getlist("ingredient"):
+        qs = qs.filter(ingredients__name=ing)
+    exclude_ingredients = params.getlist("exclude_ingredient")
+    if exclude_ingredients:
+        qs = qs.exclude(ingredients__name__in=exclude_ingredients)
+    return qs
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django porównująca plany zapytań i opóźnienia filtrów
+    wielowartościowych: N złączeń (dawna wersja) kontra jedno
+    półzłączenie z GROUP BY/HAVING (``core.filters``).
+    """
+
+    help = "Compare query plans and latency of multi-value recipe filters"
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--recipes", type=int, default=5000, help="Size of the synthetic catalog"
+        )
+        parser.add_argument(
+            "--max-values", type=int, default=10, help="Largest number of filter values"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Number of timed repetitions"
+        )
+        parser.add_argument(
+            "--explain", action="store_true", help="Print EXPLAIN QUERY PLAN output"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda wykonująca benchmark.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        """
+        with synthetic_catalog_database(recipes=options["recipes"]):
+            # Najpopularniejsze składniki, żeby wyniki nie były od razu puste
+            names = list(
+                Ingredient.objects.order_by("id").values_list("name", flat=True)[
+                    : options["max_values"]
+                ]
+            )
+            for count in range(1, options["max_values"] + 1):
+                params = QueryDict(mutable=True)
+                params.setlist("ingredient", names[:count])
+                params.setlist(
+                    "exclude_ingredient", names[-1:] if count < len(names) else []
+                )
+                self.compare(count, params, options)
+
+    def compare(self, count, params, options):
+        """
+        Mierzy i wypisuje wyniki obu implementacji dla jednego zestawu filtrów.
+
+        :param count: Liczba wartości filtra ingredient
+        :type count: int
+        :param params: Parametry zapytania
+        :type params: QueryDict
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        """
+        base = Recipe.objects.order_by("id")
+        variants = {
+            "joins": lambda: legacy_filter_recipes(base, params),
+            "having": lambda: filter_recipes(base, params),
+        }
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{count} ingredient value(s)"))
+        for label, build in variants.items():
+            matched = build().count()
+
+            def run():
+                qs = build()
+                qs.count()
+                list(qs.values_list("id", flat=True)[:10])
+
+            self.stdout.write(
+                f"  {label:<6} matched {matched:>5}: "
+                f"{format_stats(measure(run, options['repeat']))}"
+            )
+            if options["explain"]:
+                for line in build().values("id").explain().splitlines():
+                    self.stdout.write(f"      {line}")
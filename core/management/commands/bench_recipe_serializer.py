@@ -0,0 +1,99 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.bench import format_stats, measure, synthetic_catalog_database
+from core.models import Recipe
+from core.sql_serializers import recipe_page_json
+from core.views import COMPACT_JSON, serialize_recipe
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django porównująca serializację strony przepisów przez
+    ``serialize_recipe`` (prefetch_related) z serializacją w SQL (funkcje JSON SQLite).
+    """
+
+    help = "Benchmark serialize_recipe against SQL JSON page assembly"
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--recipes", type=int, default=5000, help="Size of the synthetic catalog"
+        )
+        parser.add_argument(
+            "--use-db",
+            action="store_true",
+            help="Benchmark the configured database instead of a synthetic catalog",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=50, help="Number of timed repetitions"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda wykonująca benchmark.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        """
+        if options["use_db"]:
+            self.run(options["repeat"])
+            return
+        with synthetic_catalog_database(recipes=options["recipes"]):
+            self.run(options["repeat"])
+
+    def run(self, repeat):
+        """
+        Mierzy obie ścieżki serializacji dla kilku rozmiarów strony.
+
+        :param repeat: Liczba powtórzeń pomiaru
+        :type repeat: int
+        """
+        total = Recipe.objects.count()
+        for per_page in (10, 25):
+            offset = max(0, total // 2 - per_page)
+
+            def page_qs():
+                return Recipe.objects.order_by("id")[offset : offset + per_page]
+
+            def python_path():
+                qs = (
+                    page_qs()
+                    .select_related("cuisine")
+                    .prefetch_related("diet", "ingredients")
+                )
+                return json.dumps([serialize_recipe(r) for r in qs], **COMPACT_JSON)
+
+            def sql_path():
+                return recipe_page_json(page_qs())
+
+            identical = python_path() == sql_path()
+            queries = {}
+            for label, fn in (
+                ("serialize_recipe", python_path),
+                ("sql json", sql_path),
+            ):
+                with CaptureQueriesContext(connection) as ctx:
+                    fn()
+                queries[label] = len(ctx.captured_queries)
+
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(f"page size {per_page} ({total} recipes)")
+            )
+            self.stdout.write(f"  byte-identical output: {identical}")
+            self.stdout.write(
+                f"  serialize_recipe ({queries['serialize_recipe']} queries): "
+                f"{format_stats(measure(python_path, repeat))}"
+            )
+            self.stdout.write(
+                f"  sql json ({queries['sql json']} queries):         "
+                f"{format_stats(measure(sql_path, repeat))}"
+            )
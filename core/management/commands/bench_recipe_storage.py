@@ -0,0 +1,181 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bench import format_stats, measure, synthetic_recipe_text
+from core.fields import compress_text, decompress_text
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django porównująca przechowywanie instrukcji przepisów
+    jako zwykły tekst i jako skompresowany BLOB.
+
+    Mierzy rozmiar pliku bazy SQLite, czas zimnego startu (nowe połączenie
+    i pierwsza strona wyników) oraz koszt serializacji jednej strony.
+    """
+
+    help = "Benchmark plain vs compressed storage of Recipe.recipe"
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=5000,
+            help="Number of synthetic recipes (ignored with --json-dir)",
+        )
+        parser.add_argument(
+            "--json-dir",
+            type=str,
+            help="Use recipe texts from JSON files in this directory",
+        )
+        parser.add_argument(
+            "--per-page", type=int, default=10, help="Page size to serialize"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=50, help="Number of timed repetitions"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda wykonująca benchmark.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        :raises CommandError: Gdy podana ścieżka nie jest katalogiem
+        """
+        texts = self.load_texts(options)
+        per_page = options["per_page"]
+        repeat = options["repeat"]
+        self.stdout.write(f"Recipes: {len(texts)}, page size: {per_page}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            variants = {
+                "plain": (os.path.join(tmp, "plain.sqlite3"), lambda t: t, str),
+                "compressed": (
+                    os.path.join(tmp, "compressed.sqlite3"),
+                    compress_text,
+                    decompress_text,
+                ),
+            }
+            for label, (path, encode, decode) in variants.items():
+                self.build_database(path, texts, encode)
+                size_kb = os.path.getsize(path) / 1024
+                offset = max(0, len(texts) // 2 - per_page)
+
+                def cold_start():
+                    conn = sqlite3.connect(path)
+                    try:
+                        rows = self.fetch_page(conn, offset, per_page)
+                        return [decode(row[2]) for row in rows]
+                    finally:
+                        conn.close()
+
+                conn = sqlite3.connect(path)
+
+                def serialize_page():
+                    rows = self.fetch_page(conn, offset, per_page)
+                    return json.dumps(
+                        [
+                            {"id": row[0], "name": row[1], "recipe": decode(row[2])}
+                            for row in rows
+                        ]
+                    )
+
+                def list_without_text():
+                    rows = self.fetch_page(conn, offset, per_page)
+                    return json.dumps([{"id": row[0], "name": row[1]} for row in rows])
+
+                self.stdout.write(self.style.MIGRATE_HEADING(label))
+                self.stdout.write(f"  database size:       {size_kb:.1f} KiB")
+                self.stdout.write(
+                    f"  cold start:          {format_stats(measure(cold_start, repeat))}"
+                )
+                self.stdout.write(
+                    f"  page serialization:  {format_stats(measure(serialize_page, repeat))}"
+                )
+                self.stdout.write(
+                    f"  page without text:   {format_stats(measure(list_without_text, repeat))}"
+                )
+                conn.close()
+
+    def load_texts(self, options):
+        """
+        Wczytuje teksty przepisów z plików JSON lub generuje syntetyczne.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        :return: Lista tekstów instrukcji
+        :rtype: list
+        :raises CommandError: Gdy podana ścieżka nie jest katalogiem
+        """
+        json_dir = options.get("json_dir")
+        if not json_dir:
+            rng = random.Random(0)
+            return [
+                synthetic_recipe_text(rng, rng.randint(6, 20))
+                for _ in range(options["recipes"])
+            ]
+
+        if not os.path.isdir(json_dir):
+            raise CommandError(f'The provided path "{json_dir}" is not a directory.')
+        texts = []
+        for filename in sorted(os.listdir(json_dir)):
+            if not filename.lower().endswith(".json"):
+                continue
+            with open(os.path.join(json_dir, filename), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            recipes = data if isinstance(data, list) else [data]
+            texts.extend(r.get("recipe") or "" for r in recipes)
+        return texts
+
+    @staticmethod
+    def build_database(path, texts, encode):
+        """
+        Tworzy bazę SQLite z tabelą przepisów zapisanych wskazanym kodowaniem.
+
+        :param path: Ścieżka pliku bazy
+        :type path: str
+        :param texts: Teksty instrukcji
+        :type texts: list
+        :param encode: Funkcja kodująca tekst przed zapisem
+        :type encode: Callable
+        """
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE recipe (id INTEGER PRIMARY KEY, name TEXT, recipe)")
+        conn.executemany(
+            "INSERT INTO recipe (name, recipe) VALUES (?, ?)",
+            ((f"Recipe {i}", encode(text)) for i, text in enumerate(texts)),
+        )
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+
+    @staticmethod
+    def fetch_page(conn, offset, limit):
+        """
+        Pobiera jedną stronę przepisów.
+
+        :param conn: Połączenie z bazą SQLite
+        :type conn: sqlite3.Connection
+        :param offset: Przesunięcie pierwszego wiersza
+        :type offset: int
+        :param limit: Liczba wierszy na stronie
+        :type limit: int
+        :return: Lista krotek (id, name, recipe)
+        :rtype: list
+        """
+        return conn.execute(
+            "SELECT id, name, recipe FROM recipe ORDER BY id LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
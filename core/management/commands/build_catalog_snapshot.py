@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.snapshot import build_snapshot
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django budująca migawkę katalogu współdzieloną przez procesy
+    serwera. Migawka jest też przebudowywana automatycznie po imporcie;
+    komenda służy do jej utworzenia przy wdrożeniu.
+    """
+
+    help = "Build the memory-mapped catalog snapshot shared by server workers"
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--output", help="Snapshot file (default: CATALOG_SNAPSHOT setting)"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda budująca migawkę.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        :raises CommandError: Gdy nie podano pliku migawki
+        """
+        path = options["output"] or settings.CATALOG_SNAPSHOT
+        if not path:
+            raise CommandError("Set CATALOG_SNAPSHOT or pass --output.")
+        recipes = build_snapshot(path)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote snapshot of {recipes} recipes to {path}")
+        )
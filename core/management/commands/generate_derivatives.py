@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.derivatives import (
+    DERIVATIVE_FORMATS,
+    derivative_cache_dir,
+    evict_derivatives,
+    render_derivatives,
+)
+from core.media import media_file
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django tworząca z wyprzedzeniem pomniejszone wersje obrazów.
+
+    Obrazy przepisów są przetwarzane równolegle w puli procesów; istniejące
+    pochodne są pomijane, a na końcu cache jest przycinany do limitu rozmiaru.
+    """
+
+    help = "Pre-generate resized WebP/JPEG versions of recipe images"
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes (default: CPU count)",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda wykonująca generowanie pochodnych.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        """
+        cache_dir = derivative_cache_dir()
+        sources = []
+        image_paths = Recipe.objects.filter(has_image=True).values_list(
+            "image_path", flat=True
+        )
+        for image_path in image_paths.iterator():
+            found = media_file("images", image_path)
+            if found is not None:
+                sources.append(found[0])
+
+        created = failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+            futures = {
+                executor.submit(
+                    render_derivatives,
+                    source,
+                    cache_dir,
+                    settings.IMAGE_DERIVATIVE_WIDTHS,
+                    list(DERIVATIVE_FORMATS),
+                ): source
+                for source in sources
+            }
+            for future in as_completed(futures):
+                try:
+                    created += future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Error processing {futures[future]}: {e}")
+
+        removed = evict_derivatives(
+            cache_dir, settings.DERIVATIVES_MAX_MB * 1024 * 1024
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} derivatives of {len(sources)} images "
+                f"({failed} failed, {removed} evicted)"
+            )
+        )
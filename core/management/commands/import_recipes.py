@@ -3,13 +3,15 @@ import json
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from core.assets import update_recipe_assets
 from core.models import Ingredient, Cuisine, Diet, Recipe
+from core.signals import catalog_updated
 
 
 class Command(BaseCommand):
     """
     Komenda Django do importowania przepisów kulinarnych z plików JSON.
-    
+
     Odczytuje pliki JSON z określonego katalogu i tworzy odpowiednie obiekty
     w bazie danych (przepisy, składniki, kuchnie i diety).
     """
@@ -19,7 +21,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         """
         Konfiguruje argumenty linii poleceń dla komendy.
-        
+
         :param parser: Parser argumentów linii poleceń
         :type parser: argparse.ArgumentParser
         """
@@ -28,11 +30,16 @@ class Command(BaseCommand):
             type=str,
             help="Path to the directory containing JSON files",
         )
+        parser.add_argument(
+            "--skip-assets",
+            action="store_true",
+            help="Do not record media file metadata after the import",
+        )
 
     def handle(self, *args, **options):
         """
         Główna metoda wykonująca import przepisów z plików JSON.
-        
+
         :param options: Słownik zawierający opcje przekazane do komendy
         :type options: dict
         :raises CommandError: Gdy podana ścieżka nie jest katalogiem
@@ -40,9 +47,7 @@ class Command(BaseCommand):
         json_dir = options["json_dir"]
 
         if not os.path.isdir(json_dir):
-            raise CommandError(
-                f'The provided path "{json_dir}" is not a directory.'
-            )
+            raise CommandError(f'The provided path "{json_dir}" is not a directory.')
 
         # Get all JSON files from the directory
         json_files = [
@@ -53,9 +58,7 @@ class Command(BaseCommand):
 
         if not json_files:
             self.stdout.write(
-                self.style.WARNING(
-                    f"No JSON files found in directory: {json_dir}"
-                )
+                self.style.WARNING(f"No JSON files found in directory: {json_dir}")
             )
             return
 
@@ -82,7 +85,6 @@ class Command(BaseCommand):
                         # Process Audio: using the 'audio' field (expects a file path)
                         audio_value = recipe_data.get("audio")
 
-
                         # Process Cuisine
                         cuisine_name = recipe_data.get("cuisine")
                         cuisine_obj, _ = Cuisine.objects.get_or_create(
@@ -99,21 +101,15 @@ class Command(BaseCommand):
                         )
 
                         # Process Ingredients list
-                        for ingredient_name in recipe_data.get(
-                            "ingredients", []
-                        ):
-                            ingredient_obj, _ = (
-                                Ingredient.objects.get_or_create(
-                                    name=ingredient_name
-                                )
+                        for ingredient_name in recipe_data.get("ingredients", []):
+                            ingredient_obj, _ = Ingredient.objects.get_or_create(
+                                name=ingredient_name
                             )
                             recipe_obj.ingredients.add(ingredient_obj)
 
                         # Process Diet list
                         for diet_name in recipe_data.get("diet", []):
-                            diet_obj, _ = Diet.objects.get_or_create(
-                                name=diet_name
-                            )
+                            diet_obj, _ = Diet.objects.get_or_create(name=diet_name)
                             recipe_obj.diet.add(diet_obj)
 
                         recipe_obj.save()
@@ -127,7 +123,11 @@ class Command(BaseCommand):
                         )
                     )
             self.stdout.write(
-                self.style.SUCCESS(
-                    f"Successfully imported file: {file_path}"
-                )
+                self.style.SUCCESS(f"Successfully imported file: {file_path}")
             )
+
+        if not options["skip_assets"]:
+            updated = update_recipe_assets()
+            self.stdout.write(f"Updated media metadata of {updated} recipes")
+
+        catalog_updated.send(sender=self.__class__)
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from core.assets import update_recipe_assets
+from core.signals import catalog_updated
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django inwentaryzująca wygenerowane obrazy i nagrania.
+
+    Zapisuje w przepisach, czy ich pliki istnieją, oraz ich rozmiar,
+    wymiary, długość i podgląd zastępczy obrazu, a następnie unieważnia
+    cache zależne od katalogu.
+    """
+
+    help = "Record existence, size, dimensions and duration of recipe media files"
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--assets-dir",
+            help="Directory containing images-output/ and audio-output/ (default: ASSETS_DIR)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Processes computing image placeholders (default: CPU count)",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda wykonująca inwentaryzację.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        """
+        updated = update_recipe_assets(options["assets_dir"], options["workers"])
+        if updated:
+            catalog_updated.send(sender=self.__class__)
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated media metadata of {updated} recipes")
+        )
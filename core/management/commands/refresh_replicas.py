@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replicas import refresh_replicas
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django kopiująca bazę główną do replik tylko do odczytu.
+    Repliki są też odświeżane automatycznie po imporcie; komenda służy do
+    ich utworzenia przy wdrożeniu.
+    """
+
+    help = "Copy the primary database into the READ_REPLICAS files"
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda odświeżająca repliki.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        :raises CommandError: Gdy nie skonfigurowano replik
+        """
+        if not settings.READ_REPLICAS:
+            raise CommandError("Set READ_REPLICAS to enable read replicas.")
+        refreshed = refresh_replicas()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} replicas"))
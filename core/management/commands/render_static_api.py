@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.static_api import default_urls, render_static_api
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django renderująca najczęściej pobierane odpowiedzi API do
+    statycznych plików JSON (z wersjami .gz i .br) serwowanych przez nginx.
+    """
+
+    help = "Render popular API responses into static, precompressed JSON files"
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--output", help="Output directory (default: STATIC_API_DIR setting)"
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=settings.STATIC_API_PAGES,
+            help="Number of leading pages of each list and filter",
+        )
+        parser.add_argument(
+            "--all-pages",
+            action="store_true",
+            help="Render the whole unfiltered recipe pagination",
+        )
+        parser.add_argument(
+            "--urls",
+            help="File with extra URLs (one per line, e.g. popular filter combinations)",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Number of rendering threads"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda wykonująca renderowanie.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        :raises CommandError: Gdy nie podano folderu wyjściowego
+        """
+        output = options["output"] or settings.STATIC_API_DIR
+        if not output:
+            raise CommandError("Set STATIC_API_DIR or pass --output.")
+        urls = default_urls(options["pages"], options["all_pages"])
+        if options["urls"]:
+            with open(options["urls"], "r", encoding="utf-8") as f:
+                urls.extend(line.strip() for line in f if line.strip())
+        stats = render_static_api(output, urls, options["workers"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {stats['rendered']} responses into {stats['files']} files "
+                f"({stats['skipped']} skipped)"
+            )
+        )
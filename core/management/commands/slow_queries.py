@@ -0,0 +1,104 @@
+import json
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bench import summarize
+from core.slow_queries import sql_fingerprint
+
+
+class Command(BaseCommand):
+    """
+    Komenda Django podsumowująca log wolnych zapytań SQL.
+
+    Zapytania są grupowane po znormalizowanym tekście SQL, a grupy
+    sortowane po łącznym czasie lub 95. percentylu. Dla każdej grupy
+    wypisywany jest plan najwolniejszego wykonania.
+    """
+
+    help = "Summarize the slow query log: top offenders by total and p95 time"
+
+    def add_arguments(self, parser):
+        """
+        Konfiguruje argumenty linii poleceń dla komendy.
+
+        :param parser: Parser argumentów linii poleceń
+        :type parser: argparse.ArgumentParser
+        """
+        parser.add_argument(
+            "--log", help="Slow query log file (default: SLOW_QUERY_LOG setting)"
+        )
+        parser.add_argument(
+            "--top", type=int, default=10, help="Number of queries to show"
+        )
+        parser.add_argument(
+            "--sort",
+            choices=["total", "p95"],
+            default="total",
+            help="Sort by total or 95th percentile time",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Główna metoda wypisująca podsumowanie.
+
+        :param options: Słownik zawierający opcje przekazane do komendy
+        :type options: dict
+        :raises CommandError: Gdy nie podano pliku logu lub plik nie istnieje
+        """
+        path = options["log"] or settings.SLOW_QUERY_LOG
+        if not path:
+            raise CommandError("Set SLOW_QUERY_LOG or pass --log.")
+        # Plik bieżący i pliki po rotacji (log.1, log.2, ...)
+        files = [path] + [
+            f"{path}.{index}" for index in range(1, settings.SLOW_QUERY_LOG_BACKUPS + 1)
+        ]
+        files = [f for f in files if os.path.isfile(f)]
+        if not files:
+            raise CommandError(f'The slow query log "{path}" does not exist.')
+
+        groups = defaultdict(list)
+        for file in files:
+            with open(file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    groups[sql_fingerprint(entry["sql"])].append(entry)
+
+        rows = []
+        for fingerprint, entries in groups.items():
+            durations = [e["duration_ms"] for e in entries]
+            stats = summarize(durations)
+            rows.append(
+                {
+                    "sql": fingerprint,
+                    "count": len(entries),
+                    "total": sum(durations),
+                    "p95": stats["p95"],
+                    "views": sorted({e["view"] or "-" for e in entries}),
+                    "slowest": max(entries, key=lambda e: e["duration_ms"]),
+                }
+            )
+        rows.sort(key=lambda row: row[options["sort"]], reverse=True)
+
+        self.stdout.write(
+            f"{sum(len(e) for e in groups.values())} slow queries, "
+            f"{len(groups)} distinct, from {len(files)} file(s)"
+        )
+        for rank, row in enumerate(rows[: options["top"]], start=1):
+            slowest = row["slowest"]
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"#{rank} total {row['total']:.1f} ms, p95 {row['p95']:.1f} ms, "
+                    f"max {slowest['duration_ms']:.1f} ms, count {row['count']}"
+                )
+            )
+            self.stdout.write(f"  views: {', '.join(row['views'])}")
+            self.stdout.write(f"  slowest: {slowest['path']}?{slowest['query']}")
+            self.stdout.write(f"  sql: {row['sql']}")
+            for node_id, parent, detail in slowest.get("plan") or []:
+                self.stdout.write(f"  plan: {detail}")
@@ -0,0 +1,278 @@
+"""
+Moduł serwujący wygenerowane obrazy i nagrania przepisów.
+
+Pliki są wysyłane przez ``FileResponse``, więc serwer WSGI może użyć
+``wsgi.file_wrapper`` (sendfile) i plik nigdy nie jest wczytywany w całości
+do pamięci. Obsługiwane są zapytania Range (przewijanie nagrań .opus),
+warunkowe GET (ETag z rozmiaru i mtime, Last-Modified) oraz nagłówki cache.
+Nagrania mogą mieć też wersję HLS (playlista i krótkie segmenty), serwowaną
+tym samym widokiem.
+"""
+
+import mimetypes
+import os
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from MediaGenCommon.catalog import playlist_path
+
+# Rodzaj mediów w adresie URL -> folder w ASSETS_DIR
+MEDIA_FOLDERS = {
+    "images": "images-output",
+    "audio": "audio-output",
+}
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+BLOCK_SIZE = 64 * 1024
+
+mimetypes.add_type("audio/ogg", ".opus")
+# Playlisty i segmenty HLS nagrań
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("audio/mp4", ".m4s")
+
+
+class FileRange:
+    """
+    Obiekt plikopodobny ograniczony do zakresu bajtów otwartego pliku.
+
+    Udostępnia ``fileno()``, dzięki czemu serwery z sendfile (np. gunicorn)
+    wysyłają dane bezpośrednio z bieżącej pozycji pliku, a ``read()`` nie
+    zwraca danych spoza zakresu przy zwykłym strumieniowaniu.
+    """
+
+    def __init__(self, file, start: int, length: int):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def media_etag(stat: os.stat_result) -> str:
+    """
+    Buduje ETag pliku z jego rozmiaru i czasu modyfikacji.
+
+    :param stat: Wynik os.stat pliku
+    :type stat: os.stat_result
+    :return: ETag w cudzysłowach
+    :rtype: str
+    """
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parsuje nagłówek Range z jednym zakresem bajtów.
+
+    :param header: Wartość nagłówka Range
+    :type header: str
+    :param size: Rozmiar pliku w bajtach
+    :type size: int
+    :return: Krotka (początek, koniec włącznie) albo None dla nieobsługiwanego
+        nagłówka (np. wielu zakresów), który jest ignorowany
+    :rtype: Optional[Tuple[int, int]]
+    :raises ValueError: Gdy zakres jest niespełnialny (odpowiedź 416)
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end or start >= size:
+            raise ValueError(header)
+    else:
+        # Sufiks: ostatnie N bajtów
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError(header)
+        start, end = max(0, size - suffix), size - 1
+    return start, end
+
+
+def file_response(
+    request, full_path: str, stat: os.stat_result, file=None, etag: Optional[str] = None
+) -> HttpResponse:
+    """
+    Buduje odpowiedź z plikiem: warunkowe GET, zakres bajtów i nagłówki cache.
+
+    :param request: Obiekt żądania HTTP
+    :type request: HttpRequest
+    :param full_path: Bezwzględna ścieżka istniejącego pliku
+    :type full_path: str
+    :param stat: Wynik os.stat pliku
+    :type stat: os.stat_result
+    :param file: Już otwarty plik (zamykany, gdy odpowiedź go nie wysyła);
+        domyślnie plik jest otwierany z ``full_path``
+    :param etag: ETag odpowiedzi; domyślnie ``media_etag(stat)``
+    :type etag: Optional[str]
+    :return: Plik (200/206), 304, 412 albo 416
+    :rtype: HttpResponse
+    """
+    etag = etag or media_etag(stat)
+    last_modified = int(stat.st_mtime)
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if conditional is not None:
+        if file is not None:
+            file.close()
+        patch_cache_control(
+            conditional, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE
+        )
+        return conditional
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    # If-Range: zakres tylko, gdy klient ma aktualną wersję pliku
+    if range_header and (
+        not if_range
+        or if_range == etag
+        or parse_http_date_safe(if_range) == last_modified
+    ):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            if file is not None:
+                file.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    if file is None:
+        file = open(full_path, "rb")
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(file, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response.block_size = BLOCK_SIZE
+        response["Content-Length"] = str(end - start + 1)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    else:
+        response = FileResponse(file, content_type=content_type)
+        response.block_size = BLOCK_SIZE
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def media_file(kind: str, path: str) -> Optional[Tuple[str, os.stat_result]]:
+    """
+    Zwraca ścieżkę i stat pliku mediów, odrzucając ścieżki spoza folderu.
+
+    :param kind: Rodzaj mediów: images lub audio
+    :type kind: str
+    :param path: Ścieżka pliku względem folderu mediów
+    :type path: str
+    :return: Krotka (ścieżka bezwzględna, stat) albo None, gdy plik nie istnieje
+    :rtype: Optional[Tuple[str, os.stat_result]]
+    """
+    root = os.path.join(settings.ASSETS_DIR, MEDIA_FOLDERS[kind])
+    try:
+        full_path = safe_join(root, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        return None
+    if not os.path.isfile(full_path):
+        return None
+    return full_path, stat
+
+
+@lru_cache(maxsize=None)
+def _audio_url_prefix() -> str:
+    return reverse("serve_media", args=["audio", "x"])[:-1]
+
+
+def audio_playlist_url(audio_path: str, has_segments: bool) -> Optional[str]:
+    """
+    Zwraca adres playlisty HLS nagrania przepisu.
+
+    :param audio_path: Ścieżka nagrania przepisu
+    :type audio_path: str
+    :param has_segments: Czy istnieje wersja podzielona na segmenty
+    :type has_segments: bool
+    :return: Adres playlisty albo None
+    :rtype: Optional[str]
+    """
+    if not has_segments:
+        return None
+    return _audio_url_prefix() + playlist_path(audio_path)
+
+
+def audio_playlist_sql() -> str:
+    """
+    Buduje wyrażenie SQL zwracające ten sam adres co ``audio_playlist_url``
+    (alias tabeli przepisów ``r``).
+
+    :return: Fragment SQL
+    :rtype: str
+    """
+    audio = 'r."audio_path"'
+    stem = (
+        f"CASE WHEN substr({audio}, -5) = '.opus' "
+        f"THEN substr({audio}, 1, length({audio}) - 5) ELSE {audio} END"
+    )
+    return (
+        f'CASE WHEN r."has_audio_segments" '
+        f"THEN '{_audio_url_prefix()}' || {stem} || '.hls/index.m3u8' END"
+    )
+
+
+def not_found(path: str) -> JsonResponse:
+    """
+    Zwraca błąd 404 w formacie JSON dla brakującego pliku.
+
+    :param path: Ścieżka żądanego pliku
+    :type path: str
+    :return: Odpowiedź z błędem
+    :rtype: JsonResponse
+    """
+    return JsonResponse({"error": f"Plik nie istnieje: {path}"}, status=404)
+
+
+@require_safe
+def serve_media(request, kind: str, path: str):
+    """
+    Zwraca plik obrazu lub nagrania przepisu z obsługą Range i warunkowego GET.
+
+    :param request: Obiekt żądania HTTP
+    :type request: HttpRequest
+    :param kind: Rodzaj mediów: images lub audio
+    :type kind: str
+    :param path: Ścieżka pliku względem folderu mediów (jak image_path/audio_path)
+    :type path: str
+    :return: Plik (200/206), 304, 412, 416 albo błąd 404 w formacie JSON
+    :rtype: HttpResponse
+    """
+    found = media_file(kind, path)
+    if found is None:
+        return not_found(path)
+    return file_response(request, *found)
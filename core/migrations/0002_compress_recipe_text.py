@@ -0,0 +1,71 @@
+from django.db import migrations, models
+
+import core.fields
+
+BATCH_SIZE = 500
+
+
+def compress_recipes(apps, schema_editor):
+    Recipe = apps.get_model("core", "Recipe")
+    batch = []
+    for recipe in Recipe.objects.only("id", "recipe").iterator(chunk_size=BATCH_SIZE):
+        recipe.recipe_compressed = recipe.recipe or ""
+        batch.append(recipe)
+        if len(batch) >= BATCH_SIZE:
+            Recipe.objects.bulk_update(batch, ["recipe_compressed"])
+            batch = []
+    if batch:
+        Recipe.objects.bulk_update(batch, ["recipe_compressed"])
+
+
+def decompress_recipes(apps, schema_editor):
+    Recipe = apps.get_model("core", "Recipe")
+    batch = []
+    for recipe in Recipe.objects.only("id", "recipe_compressed").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        recipe.recipe = recipe.recipe_compressed
+        batch.append(recipe)
+        if len(batch) >= BATCH_SIZE:
+            Recipe.objects.bulk_update(batch, ["recipe"])
+            batch = []
+    if batch:
+        Recipe.objects.bulk_update(batch, ["recipe"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="recipe_compressed",
+            field=core.fields.CompressedTextField(
+                default=b"",
+                help_text="Step-by-step instructions for preparing the recipe",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(compress_recipes, decompress_recipes),
+        # Domyślna wartość pozwala odtworzyć kolumnę przy cofaniu migracji.
+        migrations.AlterField(
+            model_name="recipe",
+            name="recipe",
+            field=models.TextField(
+                default="",
+                help_text="Step-by-step instructions for preparing the recipe",
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="recipe",
+            name="recipe",
+        ),
+        migrations.RenameField(
+            model_name="recipe",
+            old_name="recipe_compressed",
+            new_name="recipe",
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.7 on 2026-10-19 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_compress_recipe_text"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="audio_duration",
+            field=models.FloatField(
+                blank=True, help_text="Audio duration in seconds", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="audio_size",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Audio file size in bytes", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="has_audio",
+            field=models.BooleanField(
+                default=False, help_text="Whether the audio file exists and is valid"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="has_image",
+            field=models.BooleanField(
+                default=False, help_text="Whether the image file exists and is valid"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Image height in pixels", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_size",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Image file size in bytes", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Image width in pixels", null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-19 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_recipe_asset_metadata"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_checksum",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="SHA-256 of the image the placeholder was computed from",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_color",
+            field=models.CharField(
+                blank=True,
+                help_text="Dominant image color (#rrggbb)",
+                max_length=7,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                help_text="Tiny JPEG thumbnail as a base64 data URI",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-19 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_recipe_image_placeholder"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="has_audio_segments",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether a segmented HLS playlist of the audio exists",
+            ),
+        ),
+    ]
@@ -1,12 +1,15 @@
 from django.db import models
 
+from core.fields import CompressedTextField
+
 
 class Cuisine(models.Model):
     """
     Model reprezentujący kuchnię określonego regionu lub typu.
-    
+
     Przechowuje nazwy różnych kuchni światowych, które można przypisać do przepisów.
     """
+
     name = models.CharField(
         max_length=50, help_text="Name of the cuisine (e.g., Italian)"
     )
@@ -14,7 +17,7 @@ class Cuisine(models.Model):
     def __str__(self):
         """
         Zwraca reprezentację tekstową obiektu Cuisine.
-        
+
         :return: Nazwa kuchni
         :rtype: str
         """
@@ -24,10 +27,11 @@ class Cuisine(models.Model):
 class Diet(models.Model):
     """
     Model reprezentujący rodzaj diety.
-    
+
     Przechowuje różne typy diet, które można przypisać do przepisów,
     np. wegetariańska, wegańska, bezglutenowa.
     """
+
     name = models.CharField(
         max_length=50, help_text="Dietary category (e.g., Omnivore, Carnivore)"
     )
@@ -35,7 +39,7 @@ class Diet(models.Model):
     def __str__(self):
         """
         Zwraca reprezentację tekstową obiektu Diet.
-        
+
         :return: Nazwa diety
         :rtype: str
         """
@@ -45,9 +49,10 @@ class Diet(models.Model):
 class Ingredient(models.Model):
     """
     Model reprezentujący składnik używany w przepisach.
-    
+
     Przechowuje nazwy składników, które można przypisać do przepisów kulinarnych.
     """
+
     name = models.CharField(
         max_length=50, help_text="Name of the ingredient (e.g., Spaghetti)"
     )
@@ -55,7 +60,7 @@ class Ingredient(models.Model):
     def __str__(self):
         """
         Zwraca reprezentację tekstową obiektu Ingredient.
-        
+
         :return: Nazwa składnika
         :rtype: str
         """
@@ -65,10 +70,11 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     """
     Model reprezentujący przepis kulinarny.
-    
+
     Przechowuje wszystkie informacje związane z przepisem, w tym nazwę,
     kuchnię, dietę, składniki, instrukcje oraz ścieżki do plików multimedialnych.
     """
+
     name = models.CharField(
         max_length=100,
         help_text="Name of the recipe (e.g., Spaghetti Carbonara)",
@@ -84,22 +90,58 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField(
         Ingredient, help_text="Ingredients used in the recipe"
     )
-    recipe = models.TextField(
+    recipe = CompressedTextField(
         help_text="Step-by-step instructions for preparing the recipe"
     )
     image_path = models.TextField(
-        max_length=100,
-        help_text="Path for the photo of the recipe"
+        max_length=100, help_text="Path for the photo of the recipe"
     )
     audio_path = models.TextField(
-        max_length=100,
-        help_text="Path for the audio TTS of the recipe"
+        max_length=100, help_text="Path for the audio TTS of the recipe"
+    )
+    # Metadane plików multimedialnych, uzupełniane przy imporcie i inwentaryzacji
+    has_image = models.BooleanField(
+        default=False, help_text="Whether the image file exists and is valid"
+    )
+    image_size = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Image file size in bytes"
+    )
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Image width in pixels"
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Image height in pixels"
+    )
+    has_audio = models.BooleanField(
+        default=False, help_text="Whether the audio file exists and is valid"
+    )
+    audio_size = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Audio file size in bytes"
+    )
+    audio_duration = models.FloatField(
+        null=True, blank=True, help_text="Audio duration in seconds"
+    )
+    has_audio_segments = models.BooleanField(
+        default=False, help_text="Whether a segmented HLS playlist of the audio exists"
+    )
+    # Podgląd zastępczy obrazu wyświetlany przed wczytaniem pełnego pliku
+    image_checksum = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        help_text="SHA-256 of the image the placeholder was computed from",
+    )
+    image_placeholder = models.TextField(
+        null=True, blank=True, help_text="Tiny JPEG thumbnail as a base64 data URI"
+    )
+    image_color = models.CharField(
+        max_length=7, null=True, blank=True, help_text="Dominant image color (#rrggbb)"
     )
 
     def __str__(self):
         """
         Zwraca reprezentację tekstową obiektu Recipe.
-        
+
         :return: Nazwa przepisu
         :rtype: str
         """
@@ -0,0 +1,144 @@
+"""
+Moduł ograniczający czas zapytań SQL jednego żądania API.
+
+Każde połączenie SQLite dostaje przy utworzeniu procedurę postępu
+(``set_progress_handler``), wywoływaną co ``PROGRESS_STEPS`` instrukcji
+maszyny wirtualnej SQLite. Middleware ustawia termin żądania według
+budżetu jego endpointu; gdy termin minie, procedura przerywa bieżące
+zapytanie (``sqlite3.OperationalError: interrupted``), a middleware
+zamienia błąd na odpowiedź JSON 503, zlicza zdarzenie i zapisuje w logu
+znormalizowane parametry zapytania.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, Optional
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import OperationalError
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+# Co ile instrukcji maszyny wirtualnej SQLite sprawdzany jest termin
+PROGRESS_STEPS = 1000
+# Moduły widoków objętych budżetem czasu
+BUDGET_VIEW_MODULES = ("core.views",)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("query_deadline", default=None)
+_stats_lock = threading.Lock()
+EXCEEDED = Counter()
+
+
+def _deadline_passed() -> int:
+    deadline = _deadline.get()
+    return 1 if deadline is not None and time.monotonic() > deadline else 0
+
+
+def install_progress_handler(sender, connection, **kwargs):
+    """
+    Ustawia procedurę postępu przerywającą zapytania po terminie żądania.
+
+    Podłączana do sygnału ``connection_created``.
+
+    :param sender: Klasa wrappera bazy danych
+    :param connection: Wrapper połączenia Django
+    :type connection: BaseDatabaseWrapper
+    """
+    if connection.vendor == "sqlite":
+        connection.connection.set_progress_handler(_deadline_passed, PROGRESS_STEPS)
+
+
+def endpoint_budget(url_name: Optional[str]) -> float:
+    """
+    Zwraca budżet czasu zapytań endpointu w sekundach.
+
+    :param url_name: Nazwa adresu URL widoku
+    :type url_name: Optional[str]
+    :return: Budżet w sekundach
+    :rtype: float
+    """
+    return settings.QUERY_BUDGETS_MS.get(url_name, settings.QUERY_BUDGET_MS) / 1000
+
+
+def normalized_query(params) -> str:
+    """
+    Buduje znormalizowany tekst parametrów zapytania do logów: pary są
+    posortowane, a wartości przycięte i zapisane małymi literami.
+
+    :param params: Parametry zapytania (QueryDict)
+    :type params: QueryDict
+    :return: Znormalizowane parametry w formacie query string
+    :rtype: str
+    """
+    pairs = sorted(
+        (key, value.strip().lower())
+        for key, values in params.lists()
+        for value in values
+    )
+    return urlencode(pairs)
+
+
+def exceeded_counts() -> Dict[str, int]:
+    """
+    Zwraca liczby przerwanych żądań w tym procesie według endpointów.
+
+    :return: Słownik nazwa endpointu -> liczba przerwanych żądań
+    :rtype: Dict[str, int]
+    """
+    with _stats_lock:
+        return dict(EXCEEDED)
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware ustawiające termin zapytań SQL dla widoków z
+    ``BUDGET_VIEW_MODULES`` i obsługujące przerwane zapytania.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            token = getattr(request, "_query_budget_token", None)
+            if token is not None:
+                _deadline.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "view_class", view_func)
+        if view.__module__ in BUDGET_VIEW_MODULES:
+            budget = endpoint_budget(request.resolver_match.url_name)
+            request._query_budget_token = _deadline.set(time.monotonic() + budget)
+        return None
+
+    def process_exception(self, request, exception):
+        if not (
+            isinstance(exception, OperationalError)
+            and getattr(request, "_query_budget_token", None) is not None
+            and _deadline_passed()
+        ):
+            return None
+        url_name = request.resolver_match.url_name
+        budget_ms = round(endpoint_budget(url_name) * 1000)
+        with _stats_lock:
+            EXCEEDED[url_name] += 1
+        logger.warning(
+            "Query budget of %d ms exceeded: %s?%s",
+            budget_ms,
+            request.path,
+            normalized_query(request.GET),
+        )
+        return JsonResponse(
+            {
+                "error": "Zapytanie przekroczyło limit czasu. Zawęź filtry.",
+                "budget_ms": budget_ms,
+            },
+            status=503,
+        )
@@ -0,0 +1,496 @@
+"""
+Moduł z językiem wyrażeń filtrujących przepisy (parametr ``q``).
+
+Obsługiwana składnia::
+
+    (ingredient:chicken OR ingredient:turkey) AND NOT ingredient:"orzechy"
+
+Warunki mają postać ``pole:wartość`` dla pól cuisine, diet i ingredient.
+Wartości ze spacjami podaje się w cudzysłowie. Operatory AND, OR i NOT
+(wielkość liter bez znaczenia) można grupować nawiasami, a warunki
+zapisane obok siebie łączone są przez AND.
+
+Wyrażenie jest parsowane do drzewa, normalizowane (spłaszczanie,
+usuwanie duplikatów, sortowanie, podwójna negacja) i kompilowane
+do planu, który jest cache'owany według postaci kanonicznej.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache, reduce
+from typing import Dict, Optional, Tuple
+
+from django.db.models import Count, Exists, OuterRef, Q, QuerySet
+
+from core.models import Cuisine, Diet, Ingredient, Recipe
+
+# Maksymalna liczba warunków w jednym wyrażeniu
+MAX_TERMS = 32
+
+# Maksymalne zagnieżdżenie nawiasów i operatorów NOT (ogranicza rekurencję)
+MAX_DEPTH = 32
+
+# Maksymalna liczba planów trzymanych w cache
+PLAN_CACHE_SIZE = 256
+
+# Pole wyrażenia -> (model, nazwa pola ManyToMany modelu Recipe lub None dla kuchni)
+TERM_FIELDS = {
+    "cuisine": (Cuisine, None),
+    "diet": (Diet, "diet"),
+    "ingredient": (Ingredient, "ingredients"),
+}
+
+# Kolejność argumentów w postaci kanonicznej: warunki, negacje, grupy
+NODE_ORDER = {"term": 0, "not": 1, "and": 2, "or": 2}
+
+TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<paren>[()])
+        |(?P<field>\w+):(?:"(?P<quoted>(?:[^"\\]|\\.)*)"|(?P<bare>[^\s()"]+))
+        |(?P<word>[^\s()]+)
+    )""",
+    re.VERBOSE,
+)
+
+
+class QuerySyntaxError(ValueError):
+    """
+    Błąd składni wyrażenia filtrującego.
+    """
+
+
+def tokenize(text: str):
+    """
+    Dzieli wyrażenie na tokeny: nawiasy, operatory i warunki.
+
+    :param text: Wyrażenie filtrujące
+    :type text: str
+    :return: Lista tokenów: ("(",), (")",), ("op", nazwa) lub ("term", pole, wartość)
+    :rtype: list
+    :raises QuerySyntaxError: Gdy wyrażenie zawiera nieznane pole lub słowo
+    """
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match:
+            raise QuerySyntaxError(f"Nieprawidłowe wyrażenie q w pozycji {pos}")
+        pos = match.end()
+        if match.group("paren"):
+            tokens.append((match.group("paren"),))
+        elif match.group("field"):
+            field = match.group("field").lower()
+            if field not in TERM_FIELDS:
+                raise QuerySyntaxError(
+                    f"Nieznane pole w wyrażeniu q: {field}. "
+                    f"Dozwolone pola: {', '.join(TERM_FIELDS)}"
+                )
+            if match.group("quoted") is not None:
+                value = re.sub(r"\\(.)", r"\1", match.group("quoted"))
+            else:
+                value = match.group("bare")
+            tokens.append(("term", field, value))
+        else:
+            word = match.group("word").upper()
+            if word not in ("AND", "OR", "NOT"):
+                raise QuerySyntaxError(
+                    f"Nieoczekiwane słowo w wyrażeniu q: {match.group('word')}"
+                )
+            tokens.append(("op", word))
+    return tokens
+
+
+class _Parser:
+    """
+    Parser zstępujący: OR ma najniższy priorytet, potem AND, potem NOT.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.depth = 0
+
+    def descend(self):
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise QuerySyntaxError(
+                f"Zbyt głębokie zagnieżdżenie wyrażenia q (maksymalnie {MAX_DEPTH})"
+            )
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise QuerySyntaxError("Puste wyrażenie q")
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QuerySyntaxError("Nieoczekiwany nawias zamykający w wyrażeniu q")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == ("op", "OR"):
+            self.take()
+            children.append(self.parse_and())
+        return ("or", tuple(children)) if len(children) > 1 else children[0]
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while True:
+            token = self.peek()
+            if token == ("op", "AND"):
+                self.take()
+            elif token is None or token in ((")",), ("op", "OR")):
+                break
+            children.append(self.parse_not())
+        return ("and", tuple(children)) if len(children) > 1 else children[0]
+
+    def parse_not(self):
+        if self.peek() == ("op", "NOT"):
+            self.take()
+            self.descend()
+            node = ("not", self.parse_not())
+            self.depth -= 1
+            return node
+        return self.parse_atom()
+
+    def parse_atom(self):
+        token = self.take()
+        if token is None:
+            raise QuerySyntaxError("Niekompletne wyrażenie q")
+        if token == ("(",):
+            self.descend()
+            node = self.parse_or()
+            if self.take() != (")",):
+                raise QuerySyntaxError("Brak nawiasu zamykającego w wyrażeniu q")
+            self.depth -= 1
+            return node
+        if token[0] == "term":
+            return token
+        raise QuerySyntaxError(f"Nieoczekiwany token w wyrażeniu q: {token[-1]}")
+
+
+def normalize(node):
+    """
+    Normalizuje drzewo wyrażenia: spłaszcza zagnieżdżone AND/OR, usuwa
+    duplikaty, sortuje argumenty i usuwa podwójne negacje.
+
+    :param node: Węzeł drzewa wyrażenia
+    :type node: tuple
+    :return: Znormalizowany węzeł
+    :rtype: tuple
+    """
+    kind = node[0]
+    if kind == "term":
+        return node
+    if kind == "not":
+        child = normalize(node[1])
+        return child[1] if child[0] == "not" else ("not", child)
+
+    children = {}
+    for child in node[1]:
+        child = normalize(child)
+        for item in child[1] if child[0] == kind else (child,):
+            children[canonical(item)] = item
+    if len(children) == 1:
+        return next(iter(children.values()))
+    ordered = sorted(children, key=lambda key: (NODE_ORDER[children[key][0]], key))
+    return (kind, tuple(children[key] for key in ordered))
+
+
+def canonical(node) -> str:
+    """
+    Zwraca tekstową postać kanoniczną węzła (klucz cache planów).
+
+    :param node: Węzeł drzewa wyrażenia
+    :type node: tuple
+    :return: Postać kanoniczna
+    :rtype: str
+    """
+    kind = node[0]
+    if kind == "term":
+        value = node[2].replace("\\", "\\\\").replace('"', '\\"')
+        return f'{node[1]}:"{value}"'
+    if kind == "not":
+        return f"NOT {canonical(node[1])}"
+    separator = f" {kind.upper()} "
+    return "(" + separator.join(canonical(child) for child in node[1]) + ")"
+
+
+def count_terms(node) -> int:
+    """
+    Liczy warunki w drzewie wyrażenia.
+
+    :param node: Węzeł drzewa wyrażenia
+    :type node: tuple
+    :return: Liczba warunków
+    :rtype: int
+    """
+    if node[0] == "term":
+        return 1
+    if node[0] == "not":
+        return count_terms(node[1])
+    return sum(count_terms(child) for child in node[1])
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def parse_query(text: str):
+    """
+    Parsuje i normalizuje wyrażenie filtrujące.
+
+    :param text: Wyrażenie filtrujące
+    :type text: str
+    :return: Znormalizowane drzewo wyrażenia
+    :rtype: tuple
+    :raises QuerySyntaxError: Gdy wyrażenie jest nieprawidłowe lub zbyt duże
+    """
+    tree = _Parser(tokenize(text)).parse()
+    if count_terms(tree) > MAX_TERMS:
+        raise QuerySyntaxError(
+            f"Zbyt wiele warunków w wyrażeniu q (maksymalnie {MAX_TERMS})"
+        )
+    return normalize(tree)
+
+
+def _compile(node) -> Q:
+    """
+    Kompiluje węzeł drzewa do obiektu Q.
+
+    :param node: Węzeł drzewa wyrażenia
+    :type node: tuple
+    :return: Warunek Django
+    :rtype: Q
+    """
+    kind = node[0]
+    if kind == "term":
+        _, field_name = TERM_FIELDS[node[1]]
+        if field_name is None:
+            return Q(cuisine__name=node[2])
+        m2m = Recipe._meta.get_field(field_name)
+        target = m2m.m2m_reverse_field_name()
+        return Q(
+            Exists(
+                m2m.remote_field.through.objects.filter(
+                    recipe_id=OuterRef("pk"), **{f"{target}__name": node[2]}
+                )
+            )
+        )
+    if kind == "not":
+        return ~_compile(node[1])
+    children = [_compile(child) for child in node[1]]
+    return reduce(
+        (lambda a, b: a & b) if kind == "and" else (lambda a, b: a | b), children
+    )
+
+
+class QueryPlan:
+    """
+    Skompilowany plan wyrażenia filtrującego.
+
+    :ivar tree: Znormalizowane drzewo wyrażenia
+    :ivar canonical: Postać kanoniczna wyrażenia
+    :ivar condition: Warunek Django do użycia w ``QuerySet.filter``
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.canonical = canonical(tree)
+        self.condition = _compile(tree)
+
+    def apply(self, qs: QuerySet) -> QuerySet:
+        """
+        Filtruje QuerySet przepisów według planu.
+
+        :param qs: QuerySet przepisów
+        :type qs: QuerySet
+        :return: Przefiltrowany QuerySet
+        :rtype: QuerySet
+        """
+        return qs.filter(self.condition)
+
+    def explain(self) -> dict:
+        """
+        Opisuje plan wraz z szacowanym kosztem.
+
+        Liczba pasujących przepisów jest szacowana z częstości warunków
+        przy założeniu ich niezależności, a koszt to liczba wierszy tabel
+        pośrednich odczytywanych przez warunki.
+
+        :return: Słownik z postacią kanoniczną, drzewem planu i kosztem
+        :rtype: dict
+        """
+        total = Recipe.objects.count()
+        frequencies = term_frequencies(self.tree)
+        tree = _explain_node(self.tree, frequencies, total)
+        return {
+            "canonical": self.canonical,
+            "strategy": "database",
+            "total_recipes": total,
+            "estimated_rows": tree["estimated_rows"],
+            "cost": tree["cost"],
+            "plan": tree,
+        }
+
+
+def _collect_terms(node, terms: Dict[str, set]):
+    if node[0] == "term":
+        terms.setdefault(node[1], set()).add(node[2])
+    elif node[0] == "not":
+        _collect_terms(node[1], terms)
+    else:
+        for child in node[1]:
+            _collect_terms(child, terms)
+
+
+def term_frequencies(tree) -> Dict[Tuple[str, str], int]:
+    """
+    Liczy przepisy pasujące do każdego warunku w drzewie,
+    jednym zapytaniem grupującym na pole.
+
+    :param tree: Drzewo wyrażenia
+    :type tree: tuple
+    :return: Słownik (pole, wartość) -> liczba przepisów
+    :rtype: Dict[Tuple[str, str], int]
+    """
+    terms: Dict[str, set] = {}
+    _collect_terms(tree, terms)
+    frequencies = {}
+    for field, values in terms.items():
+        _, field_name = TERM_FIELDS[field]
+        if field_name is None:
+            rows = (
+                Recipe.objects.filter(cuisine__name__in=values)
+                .values_list("cuisine__name")
+                .annotate(n=Count("id"))
+            )
+        else:
+            m2m = Recipe._meta.get_field(field_name)
+            target = m2m.m2m_reverse_field_name()
+            rows = (
+                m2m.remote_field.through.objects.filter(
+                    **{f"{target}__name__in": values}
+                )
+                .values_list(f"{target}__name")
+                .annotate(n=Count("recipe_id", distinct=True))
+            )
+        counts = dict(rows)
+        for value in values:
+            frequencies[(field, value)] = counts.get(value, 0)
+    return frequencies
+
+
+def _explain_node(node, frequencies, total) -> dict:
+    kind = node[0]
+    if kind == "term":
+        rows = frequencies[(node[1], node[2])]
+        return {
+            "op": "term",
+            "term": canonical(node),
+            "estimated_rows": rows,
+            "cost": rows,
+        }
+    if kind == "not":
+        child = _explain_node(node[1], frequencies, total)
+        return {
+            "op": "not",
+            "estimated_rows": total - child["estimated_rows"],
+            "cost": child["cost"],
+            "children": [child],
+        }
+    children = sorted(
+        (_explain_node(child, frequencies, total) for child in node[1]),
+        key=lambda child: child["estimated_rows"],
+        reverse=kind == "or",
+    )
+    fractions = [child["estimated_rows"] / total if total else 0 for child in children]
+    if kind == "and":
+        fraction = reduce(lambda a, b: a * b, fractions, 1.0)
+    else:
+        fraction = 1 - reduce(lambda a, b: a * (1 - b), fractions, 1.0)
+    return {
+        "op": kind,
+        "estimated_rows": round(fraction * total),
+        "cost": sum(child["cost"] for child in children),
+        "children": children,
+    }
+
+
+# Znormalizowane drzewo -> plan, od najdawniej używanego
+_plans: "OrderedDict[tuple, QueryPlan]" = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def clear_plan_cache():
+    """
+    Usuwa wszystkie plany z cache.
+    """
+    with _plans_lock:
+        _plans.clear()
+
+
+def get_plan(text: str) -> Tuple[QueryPlan, bool]:
+    """
+    Zwraca plan dla wyrażenia, korzystając z cache według postaci kanonicznej.
+
+    :param text: Wyrażenie filtrujące
+    :type text: str
+    :return: Plan oraz informacja, czy pochodził z cache
+    :rtype: Tuple[QueryPlan, bool]
+    :raises QuerySyntaxError: Gdy wyrażenie jest nieprawidłowe
+    """
+    tree = parse_query(text)
+    with _plans_lock:
+        plan = _plans.get(tree)
+        if plan is not None:
+            _plans.move_to_end(tree)
+            return plan, True
+    plan = QueryPlan(tree)
+    with _plans_lock:
+        _plans[tree] = plan
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan, False
+
+
+def apply_query(
+    qs: QuerySet, text: Optional[str]
+) -> Tuple[QuerySet, Optional[QueryPlan], bool]:
+    """
+    Filtruje QuerySet przepisów wyrażeniem ``q`` i zwraca użyty plan.
+
+    :param qs: QuerySet przepisów
+    :type qs: QuerySet
+    :param text: Wyrażenie filtrujące lub None
+    :type text: Optional[str]
+    :return: Przefiltrowany QuerySet, plan (None bez wyrażenia) oraz
+        informacja, czy plan pochodził z cache
+    :rtype: Tuple[QuerySet, Optional[QueryPlan], bool]
+    :raises QuerySyntaxError: Gdy wyrażenie jest nieprawidłowe
+    """
+    if not text:
+        return qs, None, False
+    plan, cached = get_plan(text)
+    return plan.apply(qs), plan, cached
+
+
+def filter_by_query(qs: QuerySet, text: Optional[str]) -> QuerySet:
+    """
+    Filtruje QuerySet przepisów wyrażeniem ``q``, jeśli zostało podane.
+
+    :param qs: QuerySet przepisów
+    :type qs: QuerySet
+    :param text: Wyrażenie filtrujące lub None
+    :type text: Optional[str]
+    :return: Przefiltrowany QuerySet
+    :rtype: QuerySet
+    :raises QuerySyntaxError: Gdy wyrażenie jest nieprawidłowe
+    """
+    return apply_query(qs, text)[0]
@@ -0,0 +1,104 @@
+"""
+Moduł do testów pilnujących liczby zapytań SQL i pobranych wierszy.
+
+``QueryLimits`` działa jako menedżer kontekstu i jako dekorator. Zapisuje
+zapytania wykonane w bloku na wszystkich połączeniach i zaraz po każdym
+zapytaniu SELECT liczy zwrócone przez nie wiersze (``SELECT COUNT(*)``
+z tymi samymi parametrami), więc późniejsze zapisy w bloku nie zmieniają
+wyniku. Po przekroczeniu limitu zgłaszany jest ``AssertionError`` z listą
+zapytań, dzięki czemu przywrócone zapytania N+1 są od razu widoczne
+w wyniku testu::
+
+    with QueryLimits(max_queries=4, max_rows=200):
+        client.get("/api/recipes/")
+
+    @QueryLimits(max_queries=2)
+    def test_list(self):
+        ...
+"""
+
+from contextlib import ContextDecorator, ExitStack
+from typing import List, Optional
+
+from django.db import connections
+
+
+class QueryLimits(ContextDecorator):
+    """
+    Sprawdza, czy blok kodu nie przekracza limitu zapytań i pobranych wierszy.
+
+    :param max_queries: Największa dozwolona liczba zapytań (None = bez limitu)
+    :type max_queries: Optional[int]
+    :param max_rows: Największa dozwolona łączna liczba wierszy zwróconych przez
+        zapytania SELECT (None = bez limitu)
+    :type max_rows: Optional[int]
+    """
+
+    def __init__(
+        self, max_queries: Optional[int] = None, max_rows: Optional[int] = None
+    ):
+        self.max_queries = max_queries
+        self.max_rows = max_rows
+        self.queries: List[dict] = []
+        self._counting = False
+
+    def __enter__(self):
+        self.queries = []
+        self._counting = False
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._record))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        if exc_type is None:
+            self.check()
+        return False
+
+    def _record(self, execute, sql, params, many, context):
+        if self._counting:
+            return execute(sql, params, many, context)
+        result = execute(sql, params, many, context)
+        rows = 0
+        if not many and sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            rows = self._count_rows(context["connection"], sql, params)
+        self.queries.append({"sql": sql, "params": params, "rows": rows})
+        return result
+
+    def _count_rows(self, connection, sql: str, params) -> int:
+        self._counting = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM ({sql})", params)
+                return cursor.fetchone()[0]
+        finally:
+            self._counting = False
+
+    @property
+    def rows(self) -> int:
+        """
+        Łączna liczba wierszy zwróconych przez zapytania bloku.
+
+        :return: Liczba wierszy
+        :rtype: int
+        """
+        return sum(query["rows"] for query in self.queries)
+
+    def check(self):
+        """
+        Porównuje zapisane zapytania z limitami.
+
+        :raises AssertionError: Gdy przekroczono limit zapytań lub wierszy
+        """
+        problems = []
+        if self.max_queries is not None and len(self.queries) > self.max_queries:
+            problems.append(f"{len(self.queries)} queries (limit {self.max_queries})")
+        if self.max_rows is not None and self.rows > self.max_rows:
+            problems.append(f"{self.rows} rows fetched (limit {self.max_rows})")
+        if problems:
+            listing = "\n".join(
+                f"{number}. [{query['rows']} rows] {query['sql']}"
+                for number, query in enumerate(self.queries, start=1)
+            )
+            raise AssertionError(f"{', '.join(problems)}:\n{listing}")
@@ -0,0 +1,193 @@
+"""
+Moduł kierujący odczyty widoków API do replik bazy SQLite.
+
+Repliki to spójne kopie pliku bazy wykonywane przez API kopii zapasowych
+SQLite (``sqlite3.Connection.backup``) po każdym imporcie. Kopia powstaje
+w pliku tymczasowym i zastępuje replikę przez ``os.replace``, więc otwarte
+połączenia czytają dalej poprzednią wersję, a nowe widzą już nową.
+Repliki są otwierane tylko do odczytu (``mode=ro&immutable=1``), więc
+odczyty API nie czekają na blokadę zapisu trzymaną przez import.
+
+Odczyty trafiają do repliki tylko w żądaniach GET/HEAD obsługiwanych przez
+widoki z ``REPLICA_VIEW_MODULES``; pozostały kod (np. komendy importu)
+czyta i zapisuje w bazie głównej. Replika jest losowana raz na żądanie,
+więc wszystkie zapytania żądania czytają ten sam, spójny plik.
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import receiver
+
+from core.signals import catalog_updated
+
+# Moduły widoków, których odczyty są kierowane do replik
+REPLICA_VIEW_MODULES = ("core.views",)
+
+# Alias repliki wybranej dla bieżącego żądania (None = baza główna)
+_replica_reads: ContextVar[Optional[str]] = ContextVar("replica_reads", default=None)
+
+
+def replica_alias(index: int) -> str:
+    """
+    Zwraca alias bazy danych repliki (wpisy DATABASES repliki tworzy
+    ``core.settings``).
+
+    :param index: Pozycja repliki w ustawieniu READ_REPLICAS
+    :type index: int
+    :return: Alias w DATABASES
+    :rtype: str
+    """
+    return f"replica_{index}"
+
+
+def available_replicas() -> Dict[str, str]:
+    """
+    Zwraca repliki, których pliki już istnieją.
+
+    :return: Słownik alias -> ścieżka pliku
+    :rtype: Dict[str, str]
+    """
+    return {
+        replica_alias(index): path
+        for index, path in enumerate(settings.READ_REPLICAS)
+        if os.path.exists(path)
+    }
+
+
+def choose_replica() -> Optional[str]:
+    """
+    Losuje jedną z istniejących replik.
+
+    :return: Alias repliki albo None, gdy żadna replika jeszcze nie istnieje
+    :rtype: Optional[str]
+    """
+    aliases = list(available_replicas())
+    return random.choice(aliases) if aliases else None
+
+
+@contextmanager
+def replica_reads():
+    """
+    Kieruje wszystkie odczyty wewnątrz bloku do jednej wylosowanej repliki.
+    """
+    token = _replica_reads.set(choose_replica())
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Router baz danych: odczyty w bloku ``replica_reads`` trafiają do repliki
+    wybranej dla tego bloku, wszystko inne do bazy głównej.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return _replica_reads.get()
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        # Repliki zawierają te same dane co baza główna
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> Optional[bool]:
+        if db.startswith("replica_"):
+            return False
+        return None
+
+
+class ReplicaReadMiddleware:
+    """
+    Middleware włączające odczyty z replik dla żądań GET/HEAD do widoków
+    z ``REPLICA_VIEW_MODULES``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            token = getattr(request, "_replica_token", None)
+            if token is not None:
+                _replica_reads.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "view_class", view_func)
+        if (
+            request.method in ("GET", "HEAD")
+            and view.__module__ in REPLICA_VIEW_MODULES
+        ):
+            request._replica_token = _replica_reads.set(choose_replica())
+        return None
+
+
+def refresh_replicas(using: str = "default") -> int:
+    """
+    Kopiuje bazę główną do wszystkich replik z ustawienia READ_REPLICAS.
+
+    Baza jest kopiowana raz przez API kopii zapasowych do pliku
+    tymczasowego, a pozostałe repliki są kopiami tego pliku. Każda replika
+    jest podmieniana atomowo.
+
+    :param using: Alias bazy głównej
+    :type using: str
+    :return: Liczba odświeżonych replik
+    :rtype: int
+    """
+    paths = settings.READ_REPLICAS
+    if not paths:
+        return 0
+    source = connections[using]
+    source.ensure_connection()
+
+    temp_paths = []
+    try:
+        for path in paths:
+            folder = os.path.dirname(os.path.abspath(path))
+            os.makedirs(folder, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix=".part", dir=folder)
+            os.close(fd)
+            temp_paths.append(temp_path)
+
+        target = sqlite3.connect(temp_paths[0])
+        try:
+            source.connection.backup(target)
+            # Replika ma być jednym plikiem, bez pliku WAL obok
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+        for temp_path in temp_paths[1:]:
+            shutil.copyfile(temp_paths[0], temp_path)
+        for temp_path, path in zip(temp_paths, paths):
+            os.replace(temp_path, path)
+    finally:
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return len(paths)
+
+
+@receiver(catalog_updated, dispatch_uid="core.replicas.refresh_replicas")
+def refresh_after_import(sender=None, **kwargs) -> int:
+    """
+    Odświeża repliki po zmianie katalogu.
+
+    :param sender: Nadawca sygnału
+    :return: Liczba odświeżonych replik
+    :rtype: int
+    """
+    return refresh_replicas()
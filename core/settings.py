@@ -72,6 +72,9 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.replicas.ReplicaReadMiddleware",
+    "core.query_budget.QueryBudgetMiddleware",
+    "core.slow_queries.SlowQueryMiddleware",
 ]
 
 ROOT_URLCONF = "core.urls"
@@ -105,6 +108,74 @@ DATABASES = {
     }
 }
 
+# Pliki replik tylko do odczytu dla widoków API, odświeżane po imporcie
+READ_REPLICAS = [path for path in os.getenv("READ_REPLICAS", "").split(";") if path]
+for index, path in enumerate(READ_REPLICAS):
+    DATABASES[f"replica_{index}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        # Replika nigdy nie jest modyfikowana w miejscu, tylko podmieniana
+        "NAME": f"{Path(path).resolve().as_uri()}?mode=ro&immutable=1",
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+
+# Serializacja stron przepisów jednym zapytaniem SQL (funkcje JSON SQLite)
+RECIPE_SQL_SERIALIZER = os.getenv("RECIPE_SQL_SERIALIZER", "False") == "True"
+
+# Folder zawierający images-output i audio-output z wygenerowanymi mediami
+ASSETS_DIR = os.getenv("ASSETS_DIR", str(BASE_DIR))
+
+# Czas (w sekundach), przez który klienci mogą cache'ować pliki mediów
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", "86400"))
+
+# Szerokości (w pikselach) pomniejszonych wersji obrazów przepisów
+IMAGE_DERIVATIVE_WIDTHS = [
+    int(width)
+    for width in os.getenv("IMAGE_DERIVATIVE_WIDTHS", "160,320,640").split(",")
+]
+
+# Folder cache pomniejszonych obrazów (domyślnie ASSETS_DIR/derivatives)
+DERIVATIVES_DIR = os.getenv("DERIVATIVES_DIR", "")
+
+# Maksymalny rozmiar (w MB) cache pomniejszonych obrazów
+DERIVATIVES_MAX_MB = int(os.getenv("DERIVATIVES_MAX_MB", "512"))
+
+# Limit czasu (w ms) zapytań SQL jednego żądania API
+QUERY_BUDGET_MS = int(os.getenv("QUERY_BUDGET_MS", "2000"))
+
+# Limity czasu (w ms) dla wybranych endpointów (nazwy adresów URL)
+QUERY_BUDGETS_MS = {
+    "recipe_filter": int(os.getenv("QUERY_BUDGET_FILTER_MS", "1000")),
+    "recipe_facets": int(os.getenv("QUERY_BUDGET_FACETS_MS", "1500")),
+}
+
+# Log JSONL wolnych zapytań SQL żądań API (pusty = wyłączony)
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "")
+
+# Czas (w ms), od którego zapytanie jest zapisywane w logu wolnych zapytań
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Rozmiar (w MB) pliku logu wolnych zapytań przed rotacją i liczba starszych plików
+SLOW_QUERY_LOG_MAX_MB = int(os.getenv("SLOW_QUERY_LOG_MAX_MB", "10"))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+
+# Plik migawki katalogu współdzielonej przez procesy serwera (pusty = wyłączona)
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", "")
+
+# Folder statycznych odpowiedzi API renderowanych po imporcie (pusty = wyłączone)
+STATIC_API_DIR = os.getenv("STATIC_API_DIR", "")
+
+# Liczba pierwszych stron list i filtrów renderowanych do statycznego API
+STATIC_API_PAGES = int(os.getenv("STATIC_API_PAGES", "5"))
+
+# Czas życia (w sekundach) wpisów cache liczników facet
+FACETS_CACHE_TIMEOUT = int(os.getenv("FACETS_CACHE_TIMEOUT", "300"))
+
+# Plik z wersją katalogu współdzieloną przez procesy serwera
+# (pusty = wersja w cache, widoczna tylko w bieżącym procesie)
+CATALOG_VERSION_FILE = os.getenv("CATALOG_VERSION_FILE", "")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,8 @@
+"""
+Moduł z sygnałami aplikacji core.
+"""
+
+from django.dispatch import Signal
+
+# Wysyłany po zakończeniu importu przepisów (np. przez komendę import_recipes).
+catalog_updated = Signal()
@@ -0,0 +1,158 @@
+"""
+Moduł zapisujący wolne zapytania SQL żądań API do logu JSONL.
+
+Middleware obejmuje każde żądanie wrapperem ``execute_wrapper`` na
+wszystkich połączeniach. Zapytanie trwające co najmniej ``SLOW_QUERY_MS``
+jest zapisywane jako jedna linia JSON: SQL, parametry, czas, widok,
+ścieżka i parametry żądania oraz plan ``EXPLAIN QUERY PLAN``. Log jest
+rotowany według rozmiaru (``RotatingFileHandler``), a komenda
+``slow_queries`` podsumowuje najbardziej kosztowne zapytania.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from core.query_budget import normalized_query
+
+_handler_lock = threading.Lock()
+_local = threading.local()
+logger = logging.getLogger(__name__)
+logger.propagate = False
+
+# Listy parametrów (IN (%s, %s, ...)) o różnej długości to to samo zapytanie
+PLACEHOLDER_LIST_RE = re.compile(r"\((?:%s|\?)(?:,\s*(?:%s|\?))+\)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def sql_fingerprint(sql: str) -> str:
+    """
+    Normalizuje tekst SQL do grupowania: białe znaki są zwijane, a listy
+    parametrów dowolnej długości zastępowane jednym znacznikiem.
+
+    :param sql: Tekst zapytania
+    :type sql: str
+    :return: Znormalizowany tekst zapytania
+    :rtype: str
+    """
+    return PLACEHOLDER_LIST_RE.sub("(%s, ...)", WHITESPACE_RE.sub(" ", sql).strip())
+
+
+def _configure_logger(path: str):
+    with _handler_lock:
+        handler = logger.handlers[0] if logger.handlers else None
+        if handler is not None and handler.baseFilename == os.path.abspath(path):
+            return
+        if handler is not None:
+            logger.removeHandler(handler)
+            handler.close()
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_MB * 1024 * 1024,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8",
+            delay=True,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+def _json_param(value):
+    if isinstance(value, (bytes, memoryview)):
+        return f"<{len(value)} bytes>"
+    return str(value)
+
+
+def explain(connection, sql: str, params) -> Optional[List[list]]:
+    """
+    Zwraca plan zapytania SELECT z ``EXPLAIN QUERY PLAN``.
+
+    :param connection: Wrapper połączenia Django
+    :type connection: BaseDatabaseWrapper
+    :param sql: Tekst zapytania z parametrami ``%s``
+    :type sql: str
+    :param params: Parametry zapytania
+    :return: Wiersze planu [id, rodzic, opis] albo None, gdy plan jest niedostępny
+    :rtype: Optional[List[list]]
+    """
+    if connection.vendor != "sqlite" or not sql.lstrip().upper().startswith(
+        ("SELECT", "WITH")
+    ):
+        return None
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [[row[0], row[1], row[3]] for row in cursor.fetchall()]
+    except DatabaseError:
+        # Np. zapytanie przerwane przez budżet czasu żądania
+        return None
+    finally:
+        _local.explaining = False
+
+
+class SlowQueryRecorder:
+    """
+    Wrapper ``execute_wrapper`` mierzący czas zapytań jednego żądania.
+    """
+
+    def __init__(self, request):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, "explaining", False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= settings.SLOW_QUERY_MS:
+                self.record(sql, params, many, duration_ms, context["connection"])
+
+    def record(self, sql, params, many, duration_ms, connection):
+        match = self.request.resolver_match
+        entry = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration_ms, 3),
+            "database": connection.alias,
+            "view": match.view_name if match else None,
+            "method": self.request.method,
+            "path": self.request.path,
+            "query": normalized_query(self.request.GET),
+            "sql": sql,
+            "params": None if many else params,
+            "plan": None if many else explain(connection, sql, params),
+        }
+        logger.info(json.dumps(entry, ensure_ascii=False, default=_json_param))
+
+
+class SlowQueryMiddleware:
+    """
+    Middleware zapisujące wolne zapytania SQL żądań, gdy ustawiono
+    ``SLOW_QUERY_LOG``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SLOW_QUERY_LOG:
+            return self.get_response(request)
+        _configure_logger(settings.SLOW_QUERY_LOG)
+        recorder = SlowQueryRecorder(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return self.get_response(request)
@@ -0,0 +1,327 @@
+"""
+Moduł budujący i odczytujący migawkę katalogu przepisów.
+
+Migawka to jeden plik tylko do odczytu z tablicami liczb (identyfikatory
+przepisów, kuchni, diet i składników, powiązania diet i składników
+w formacie CSR) oraz gotowymi obiektami JSON przepisów z tabelą
+przesunięć. Procesy serwera mapują plik przez ``mmap``, więc wszystkie
+korzystają z jednej kopii w pamięci podręcznej systemu zamiast budować
+własne struktury.
+
+Plik jest budowany obok docelowego i podmieniany atomowo po każdym
+sygnale ``catalog_updated``; procesy wykrywają nowy plik po jego i-węźle
+i otwierają go bez restartu.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import receiver
+
+from core.models import Recipe
+from core.signals import catalog_updated
+from core.sql_serializers import recipe_object_sql
+
+MAGIC = b"NCCSNAP1"
+# Sekcje pliku w kolejności zapisu: nazwa -> typ elementów modułu array
+SECTIONS = {
+    "recipe_ids": "q",
+    "recipe_cuisine": "i",
+    "cuisine_ids": "q",
+    "diet_ids": "q",
+    "ingredient_ids": "q",
+    "diet_indptr": "q",
+    "diet_indices": "i",
+    "ingredient_indptr": "q",
+    "ingredient_indices": "i",
+    "payload_offsets": "q",
+    "payloads": "B",
+}
+# Nagłówek: magia, kolejność bajtów (0 = little, 1 = big), liczba sekcji
+HEADER = struct.Struct("<8sII")
+# Wpis tabeli sekcji: przesunięcie w bajtach i liczba elementów
+SECTION_ENTRY = struct.Struct("<QQ")
+ALIGNMENT = 8
+
+_lock = threading.Lock()
+_current = None
+
+
+class CatalogSnapshot:
+    """
+    Migawka katalogu zamapowana w pamięci.
+
+    Tablice są widokami ``memoryview`` na zamapowany plik, więc nie są
+    kopiowane do pamięci procesu. Obiekty JSON przepisów są zapisane jeden
+    po drugim i rozdzielone przecinkami, dzięki czemu strona wyników jest
+    jednym wycinkiem pliku.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        magic, byteorder, count = HEADER.unpack_from(buffer)
+        if magic != MAGIC or count != len(SECTIONS):
+            raise ValueError(f"Nieprawidłowy plik migawki: {path}")
+        if byteorder != (sys.byteorder == "big"):
+            raise ValueError(f"Migawka zbudowana dla innej kolejności bajtów: {path}")
+        self.arrays: Dict[str, memoryview] = {}
+        for position, (name, typecode) in enumerate(SECTIONS.items()):
+            offset, length = SECTION_ENTRY.unpack_from(
+                buffer, HEADER.size + position * SECTION_ENTRY.size
+            )
+            size = length * array(typecode).itemsize
+            self.arrays[name] = buffer[offset : offset + size].cast(typecode)
+
+    def __len__(self) -> int:
+        return len(self.arrays["recipe_ids"])
+
+    def index_of(self, recipe_id: int) -> Optional[int]:
+        """
+        Zwraca pozycję przepisu w migawce (przepisy są posortowane po id).
+
+        :param recipe_id: Identyfikator przepisu
+        :type recipe_id: int
+        :return: Pozycja przepisu albo None, gdy go nie ma
+        :rtype: Optional[int]
+        """
+        ids = self.arrays["recipe_ids"]
+        index = bisect.bisect_left(ids, recipe_id)
+        if index < len(ids) and ids[index] == recipe_id:
+            return index
+        return None
+
+    def _related(self, prefix: str, index: int) -> List[int]:
+        indptr = self.arrays[f"{prefix}_indptr"]
+        targets = self.arrays[f"{prefix}_ids"]
+        indices = self.arrays[f"{prefix}_indices"][indptr[index] : indptr[index + 1]]
+        return [targets[i] for i in indices]
+
+    def diet_ids(self, index: int) -> List[int]:
+        """
+        Zwraca identyfikatory diet przepisu.
+
+        :param index: Pozycja przepisu w migawce
+        :type index: int
+        :return: Identyfikatory diet
+        :rtype: List[int]
+        """
+        return self._related("diet", index)
+
+    def ingredient_ids(self, index: int) -> List[int]:
+        """
+        Zwraca identyfikatory składników przepisu.
+
+        :param index: Pozycja przepisu w migawce
+        :type index: int
+        :return: Identyfikatory składników
+        :rtype: List[int]
+        """
+        return self._related("ingredient", index)
+
+    def cuisine_id(self, index: int) -> Optional[int]:
+        """
+        Zwraca identyfikator kuchni przepisu.
+
+        :param index: Pozycja przepisu w migawce
+        :type index: int
+        :return: Identyfikator kuchni albo None
+        :rtype: Optional[int]
+        """
+        position = self.arrays["recipe_cuisine"][index]
+        return self.arrays["cuisine_ids"][position] if position >= 0 else None
+
+    def page_json(self, start: int, stop: int) -> str:
+        """
+        Zwraca tablicę JSON przepisów z pozycji ``start`` do ``stop``
+        (bez ``stop``), identyczną z wynikiem ``recipe_page_json``.
+
+        :param start: Pierwsza pozycja
+        :type start: int
+        :param stop: Pozycja za ostatnim przepisem
+        :type stop: int
+        :return: Tablica JSON z przepisami
+        :rtype: str
+        """
+        stop = min(stop, len(self))
+        if start >= stop:
+            return "[]"
+        offsets = self.arrays["payload_offsets"]
+        # Ostatni obiekt nie ma przecinka za sobą
+        data = self.arrays["payloads"][offsets[start] : offsets[stop] - 1]
+        return f"[{str(data, 'utf-8')}]"
+
+
+def _aligned(f) -> int:
+    padding = -f.tell() % ALIGNMENT
+    f.write(b"\0" * padding)
+    return f.tell()
+
+
+def _csr(pairs, recipe_index: Dict[int, int], target_index: Dict[int, int], count: int):
+    indptr = array("q", [0] * (count + 1))
+    indices = array("i")
+    for recipe_id, target_id in pairs:
+        indptr[recipe_index[recipe_id] + 1] += 1
+        indices.append(target_index[target_id])
+    for i in range(count):
+        indptr[i + 1] += indptr[i]
+    return indptr, indices
+
+
+def build_snapshot(path: str, using: str = "default") -> int:
+    """
+    Buduje migawkę katalogu i atomowo podmienia plik ``path``.
+
+    Obiekty JSON przepisów pochodzą z ``recipe_object_sql``, więc są
+    identyczne z wynikiem serializacji stron w SQL.
+
+    :param path: Ścieżka pliku migawki
+    :type path: str
+    :param using: Alias bazy danych
+    :type using: str
+    :return: Liczba przepisów w migawce
+    :rtype: int
+    """
+    meta = Recipe._meta
+    cuisine_table = meta.get_field("cuisine").related_model._meta.db_table
+    with connections[using].cursor() as cursor:
+
+        def ids(model) -> array:
+            cursor.execute(f'SELECT "id" FROM "{model._meta.db_table}" ORDER BY "id"')
+            return array("q", (row[0] for row in cursor.fetchall()))
+
+        def pairs(field_name: str):
+            field = meta.get_field(field_name)
+            source = field.m2m_column_name()
+            target = field.m2m_reverse_name()
+            cursor.execute(
+                f'SELECT "{source}", "{target}" FROM '
+                f'"{field.remote_field.through._meta.db_table}" '
+                f'ORDER BY "{source}", "{target}"'
+            )
+            return cursor.fetchall()
+
+        cuisine_ids = ids(meta.get_field("cuisine").related_model)
+        diet_ids = ids(meta.get_field("diet").related_model)
+        ingredient_ids = ids(meta.get_field("ingredients").related_model)
+        cursor.execute(
+            f'SELECT r."id", r."cuisine_id", {recipe_object_sql()} '
+            f'FROM "{meta.db_table}" r '
+            f'LEFT JOIN "{cuisine_table}" c ON c."id" = r."cuisine_id" '
+            'ORDER BY r."id"'
+        )
+        rows = cursor.fetchall()
+        diet_pairs = pairs("diet")
+        ingredient_pairs = pairs("ingredients")
+
+    cuisine_index = {cuisine_id: i for i, cuisine_id in enumerate(cuisine_ids)}
+    recipe_index = {row[0]: i for i, row in enumerate(rows)}
+    payloads = bytearray()
+    payload_offsets = array("q")
+    for _, _, obj in rows:
+        payload_offsets.append(len(payloads))
+        payloads += obj.encode("utf-8") + b","
+    payload_offsets.append(len(payloads))
+    diet_indptr, diet_indices = _csr(
+        diet_pairs, recipe_index, {d: i for i, d in enumerate(diet_ids)}, len(rows)
+    )
+    ingredient_indptr, ingredient_indices = _csr(
+        ingredient_pairs,
+        recipe_index,
+        {d: i for i, d in enumerate(ingredient_ids)},
+        len(rows),
+    )
+    sections = {
+        "recipe_ids": array("q", (row[0] for row in rows)),
+        "recipe_cuisine": array("i", (cuisine_index.get(row[1], -1) for row in rows)),
+        "cuisine_ids": cuisine_ids,
+        "diet_ids": diet_ids,
+        "ingredient_ids": ingredient_ids,
+        "diet_indptr": diet_indptr,
+        "diet_indices": diet_indices,
+        "ingredient_indptr": ingredient_indptr,
+        "ingredient_indices": ingredient_indices,
+        "payload_offsets": payload_offsets,
+        "payloads": payloads,
+    }
+
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".part", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, sys.byteorder == "big", len(SECTIONS)))
+            table_offset = f.tell()
+            f.write(b"\0" * SECTION_ENTRY.size * len(SECTIONS))
+            entries = []
+            for name in SECTIONS:
+                entries.append((_aligned(f), len(sections[name])))
+                f.write(sections[name])
+            f.seek(table_offset)
+            for entry in entries:
+                f.write(SECTION_ENTRY.pack(*entry))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return len(rows)
+
+
+def current_snapshot() -> Optional[CatalogSnapshot]:
+    """
+    Zwraca migawkę z ustawienia ``CATALOG_SNAPSHOT``, otwierając ją ponownie,
+    gdy plik został podmieniony.
+
+    :return: Migawka albo None, gdy jest wyłączona lub plik nie istnieje
+    :rtype: Optional[CatalogSnapshot]
+    """
+    global _current
+    path = settings.CATALOG_SNAPSHOT
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+    snapshot = _current
+    if snapshot is None or snapshot.key != key:
+        with _lock:
+            snapshot = _current
+            if snapshot is None or snapshot.key != key:
+                try:
+                    snapshot = CatalogSnapshot(path)
+                except (OSError, ValueError):
+                    return None
+                # Stara migawka jest zwalniana, gdy nikt już z niej nie korzysta
+                _current = snapshot
+    return snapshot
+
+
+@receiver(catalog_updated, dispatch_uid="core.snapshot.rebuild_snapshot")
+def rebuild_snapshot(sender=None, **kwargs) -> Optional[int]:
+    """
+    Przebudowuje migawkę po zmianie katalogu, gdy jest włączona.
+
+    :param sender: Nadawca sygnału
+    :return: Liczba przepisów w migawce albo None, gdy migawka jest wyłączona
+    :rtype: Optional[int]
+    """
+    if not settings.CATALOG_SNAPSHOT:
+        return None
+    return build_snapshot(settings.CATALOG_SNAPSHOT)
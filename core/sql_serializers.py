@@ -0,0 +1,129 @@
+"""
+Moduł serializujący strony przepisów bezpośrednio w SQL.
+
+Zamiast pobierać przepisy, diety i składniki trzema zapytaniami
+i składać słowniki w Pythonie, cała strona wyników jest budowana jednym
+zapytaniem (po pobraniu identyfikatorów strony) z użyciem funkcji JSON SQLite (``json_object``,
+``json_group_array``). Wynik jest gotowym tekstem JSON, identycznym
+bajt w bajt z ``json.dumps(serialize_recipe(recipe), **COMPACT_JSON)``.
+
+SQLite zapisuje liczby zmiennoprzecinkowe z 15 cyframi znaczącymi, a Python
+najkrótszą dokładną postacią, dlatego obie serializacje zaokrąglają długość
+nagrania do ``DURATION_DECIMALS`` miejsc (dokładność inwentarza zasobów).
+Wyniki są identyczne dla wartości poniżej 10^12 sekund.
+"""
+
+import json
+
+from django.db import connections
+from django.db.models import QuerySet
+
+from core.derivatives import srcset_sql
+from core.media import audio_playlist_sql
+from core.models import Recipe
+
+# Liczba miejsc po przecinku długości nagrania w odpowiedziach API
+DURATION_DECIMALS = 3
+
+
+def _related_names_sql(field_name: str) -> str:
+    """
+    Buduje podzapytanie zwracające tablicę JSON nazw powiązanych obiektów
+    (diet lub składników) jednego przepisu.
+
+    Kolejność elementów odpowiada kolejności zwracanej przez
+    ``prefetch_related`` (po identyfikatorze powiązanego obiektu).
+
+    :param field_name: Nazwa pola ManyToMany modelu Recipe
+    :type field_name: str
+    :return: Fragment SQL
+    :rtype: str
+    """
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through._meta
+    target = field.related_model._meta
+    source_column = field.m2m_column_name()
+    target_column = field.m2m_reverse_name()
+    return (
+        f'(SELECT json_group_array("name") FROM ('
+        f'SELECT t."name" AS "name" FROM "{through.db_table}" m '
+        f'INNER JOIN "{target.db_table}" t ON t."id" = m."{target_column}" '
+        f'WHERE m."{source_column}" = r."id" '
+        f'ORDER BY m."{target_column}"))'
+    )
+
+
+def _json_bool(column: str) -> str:
+    """
+    Buduje wyrażenie zwracające wartość logiczną JSON (``true``/``false``)
+    zamiast liczby 0/1, w której SQLite przechowuje pola BooleanField.
+
+    :param column: Nazwa kolumny tabeli przepisów
+    :type column: str
+    :return: Fragment SQL
+    :rtype: str
+    """
+    return f"json(CASE WHEN r.\"{column}\" THEN 'true' ELSE 'false' END)"
+
+
+def recipe_object_sql() -> str:
+    """
+    Buduje wyrażenie SQL tworzące obiekt JSON jednego przepisu (alias ``r``)
+    z kuchnią (alias ``c``), w tym samym kształcie co ``serialize_recipe``.
+
+    :return: Fragment SQL
+    :rtype: str
+    """
+    return (
+        "json_object("
+        "'name', r.\"name\", "
+        "'cuisine', c.\"name\", "
+        f"'diets', json({_related_names_sql('diet')}), "
+        f"'ingredients', json({_related_names_sql('ingredients')}), "
+        "'recipe', inflate_text(r.\"recipe\"), "
+        "'image_path', r.\"image_path\", "
+        "'audio_path', r.\"audio_path\", "
+        f"'has_image', {_json_bool('has_image')}, "
+        "'image_size', r.\"image_size\", "
+        "'image_width', r.\"image_width\", "
+        "'image_height', r.\"image_height\", "
+        "'image_placeholder', r.\"image_placeholder\", "
+        "'image_color', r.\"image_color\", "
+        f"'has_audio', {_json_bool('has_audio')}, "
+        "'audio_size', r.\"audio_size\", "
+        f"'audio_duration', round(r.\"audio_duration\", {DURATION_DECIMALS}), "
+        f"'audio_playlist', {audio_playlist_sql()}, "
+        f"'srcset', {srcset_sql()})"
+    )
+
+
+def recipe_page_json(page_qs: QuerySet) -> str:
+    """
+    Serializuje stronę przepisów do tekstu tablicy JSON.
+
+    Identyfikatory strony (z filtrami, sortowaniem i LIMIT/OFFSET) są
+    pobierane osobno i przekazywane jako tablica JSON; ``json_each`` zwraca
+    je razem z pozycją w tablicy, więc kolejność wyników nie zależy od
+    kolejności wierszy podzapytania.
+
+    :param page_qs: QuerySet przepisów jednej strony (np. ``page_obj.object_list``)
+    :type page_qs: QuerySet
+    :return: Tablica JSON z przepisami
+    :rtype: str
+    """
+    ids = list(page_qs.values_list("pk", flat=True))
+    if not ids:
+        return "[]"
+    recipe_table = Recipe._meta.db_table
+    cuisine_table = Recipe._meta.get_field("cuisine").related_model._meta.db_table
+    sql = (
+        "SELECT '[' || coalesce(group_concat(obj, ','), '') || ']' FROM ("
+        f"SELECT {recipe_object_sql()} AS obj "
+        "FROM json_each(%s) p "
+        f'INNER JOIN "{recipe_table}" r ON r."id" = p."value" '
+        f'INNER JOIN "{cuisine_table}" c ON c."id" = r."cuisine_id" '
+        'ORDER BY p."key")'
+    )
+    with connections[page_qs.db].cursor() as cursor:
+        cursor.execute(sql, [json.dumps(ids)])
+        return cursor.fetchone()[0]
@@ -0,0 +1,225 @@
+"""
+Moduł renderujący najczęściej pobierane odpowiedzi API do statycznych plików.
+
+Odpowiedzi (listy kuchni i diet, pierwsze strony przepisów i składników,
+pierwsze strony filtrów po kuchni i diecie oraz dodatkowe zapytania
+z pliku) są renderowane przez te same widoki co w Django, równolegle,
+i zapisywane razem z wersjami skompresowanymi (``.gz`` oraz ``.br``, gdy
+zainstalowany jest moduł ``brotli``).
+
+Każde renderowanie trafia do nowego folderu w ``releases/``, a dowiązanie
+``current`` jest podmieniane atomowo, więc serwer nigdy nie widzi
+niepełnego zestawu plików. Układ plików odpowiada adresom URL:
+``/api/recipes/?page=2`` -> ``current/api/recipes/index@page=2.json``,
+a adres bez parametrów -> ``index.json``. Przykładowa konfiguracja nginx,
+która niepasujące zapytania przekazuje do Django::
+
+    map $args $static_api_file {
+        ""      "index.json";
+        default "index@$args.json";
+    }
+
+    location /api/ {
+        root /srv/static-api/current;
+        default_type application/json;
+        gzip_static on;
+        # brotli_static on;  # moduł ngx_brotli
+        try_files $uri$static_api_file @django;
+    }
+
+Parametry zapytania muszą mieć tę samą kolejność i kodowanie co
+w ``urllib.parse.urlencode``; inne warianty są obsługiwane przez Django.
+"""
+
+import gzip
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import receiver
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from core.models import Cuisine, Diet, Ingredient, Recipe
+from core.signals import catalog_updated
+from core.views import DEFAULT_PER_PAGE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Liczba poprzednich wersji zostawianych obok bieżącej
+KEEP_RELEASES = 2
+
+
+def _url(name: str, **params) -> str:
+    path = reverse(name)
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def _pages(count: int, per_page: int) -> int:
+    return max(1, math.ceil(count / per_page))
+
+
+def default_urls(pages: int, all_pages: bool = False) -> List[str]:
+    """
+    Zwraca adresy najczęściej pobieranych odpowiedzi API.
+
+    :param pages: Liczba pierwszych stron list przepisów, składników i filtrów
+    :type pages: int
+    :param all_pages: Czy renderować wszystkie strony listy przepisów
+    :type all_pages: bool
+    :return: Lista adresów z parametrami zapytania
+    :rtype: List[str]
+    """
+    recipe_pages = _pages(Recipe.objects.count(), DEFAULT_PER_PAGE)
+    if not all_pages:
+        recipe_pages = min(pages, recipe_pages)
+    ingredient_pages = min(pages, _pages(Ingredient.objects.count(), DEFAULT_PER_PAGE))
+
+    urls = [_url("list_cuisines"), _url("list_diets")]
+    for name, total in (
+        ("recipe_list", recipe_pages),
+        ("list_ingredients", ingredient_pages),
+    ):
+        urls.append(_url(name))
+        urls.extend(_url(name, page=page) for page in range(1, total + 1))
+    urls.append(_url("recipe_filter"))
+    for param, model in (("cuisine", Cuisine), ("diet", Diet)):
+        for value in model.objects.order_by("name").values_list("name", flat=True):
+            urls.append(_url("recipe_filter", **{param: value}))
+            urls.extend(
+                _url("recipe_filter", **{param: value, "page": page})
+                for page in range(2, pages + 1)
+            )
+    return urls
+
+
+def static_file_path(root: str, url: str) -> str:
+    """
+    Zwraca ścieżkę statycznego pliku odpowiedzi dla adresu URL.
+
+    :param root: Folder wersji statycznego API
+    :type root: str
+    :param url: Adres z parametrami zapytania
+    :type url: str
+    :return: Ścieżka pliku JSON
+    :rtype: str
+    """
+    path, _, query = url.partition("?")
+    name = f"index@{query}.json" if query else "index.json"
+    return os.path.join(root, path.strip("/"), name)
+
+
+def render_url(url: str) -> Optional[bytes]:
+    """
+    Renderuje odpowiedź widoku dla adresu URL bez serwera HTTP.
+
+    :param url: Adres z parametrami zapytania
+    :type url: str
+    :return: Treść odpowiedzi albo None, gdy status jest inny niż 200
+    :rtype: Optional[bytes]
+    """
+    request = RequestFactory().get(url)
+    match = resolve(request.path_info)
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+    finally:
+        # Wątki puli nie są zarządzane przez Django
+        connections.close_all()
+    return response.content if response.status_code == 200 else None
+
+
+def write_variants(path: str, content: bytes) -> int:
+    """
+    Zapisuje plik odpowiedzi oraz jego wersje skompresowane.
+
+    :param path: Ścieżka pliku JSON
+    :type path: str
+    :param content: Treść odpowiedzi
+    :type content: bytes
+    :return: Liczba zapisanych plików
+    :rtype: int
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    variants = {path: content, f"{path}.gz": gzip.compress(content, 9, mtime=0)}
+    if brotli is not None:
+        variants[f"{path}.br"] = brotli.compress(content)
+    for variant_path, data in variants.items():
+        with open(variant_path, "wb") as f:
+            f.write(data)
+    return len(variants)
+
+
+def render_static_api(
+    output: str, urls: Iterable[str], workers: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Renderuje odpowiedzi do nowej wersji i atomowo ustawia ją jako bieżącą.
+
+    :param output: Folder statycznego API (z ``releases/`` i ``current``)
+    :type output: str
+    :param urls: Adresy do wyrenderowania
+    :type urls: Iterable[str]
+    :param workers: Liczba wątków, domyślnie jak w ThreadPoolExecutor
+    :type workers: Optional[int]
+    :return: Liczby wyrenderowanych adresów, pominiętych adresów i plików
+    :rtype: Dict[str, int]
+    """
+    releases = os.path.join(output, "releases")
+    os.makedirs(releases, exist_ok=True)
+    release = tempfile.mkdtemp(prefix="release-", dir=releases)
+    os.chmod(release, 0o755)
+    urls = list(dict.fromkeys(urls))
+
+    def render(url: str) -> int:
+        content = render_url(url)
+        if content is None:
+            return 0
+        return write_variants(static_file_path(release, url), content)
+
+    with ThreadPoolExecutor(workers) as executor:
+        written = list(executor.map(render, urls))
+
+    # Podmiana dowiązania: nowe dowiązanie pod tymczasową nazwą i rename
+    current = os.path.join(output, "current")
+    temp_link = f"{current}.{os.getpid()}"
+    if os.path.lexists(temp_link):
+        os.remove(temp_link)
+    os.symlink(os.path.relpath(release, output), temp_link)
+    os.replace(temp_link, current)
+
+    previous = sorted(
+        (entry.path for entry in os.scandir(releases) if entry.path != release),
+        key=os.path.getmtime,
+    )
+    for path in previous[: max(0, len(previous) - KEEP_RELEASES)]:
+        shutil.rmtree(path, ignore_errors=True)
+    return {
+        "rendered": sum(1 for files in written if files),
+        "skipped": sum(1 for files in written if not files),
+        "files": sum(written),
+    }
+
+
+@receiver(catalog_updated, dispatch_uid="core.static_api.render_after_import")
+def render_after_import(sender=None, **kwargs) -> Optional[Dict[str, int]]:
+    """
+    Renderuje statyczne API po zmianie katalogu, gdy jest włączone.
+
+    :param sender: Nadawca sygnału
+    :return: Statystyki renderowania albo None, gdy statyczne API jest wyłączone
+    :rtype: Optional[Dict[str, int]]
+    """
+    if not settings.STATIC_API_DIR:
+        return None
+    return render_static_api(
+        settings.STATIC_API_DIR, default_urls(settings.STATIC_API_PAGES)
+    )
@@ -0,0 +1,209 @@
+import os
+import shutil
+import struct
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core.assets import update_recipe_assets
+from core.models import Cuisine, Recipe
+from MediaGenCommon.asset_inventory import AssetInventory
+
+
+def jpeg_bytes(width, height):
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + sof + b"\xff\xd9"
+
+
+def opus_bytes(seconds, pre_skip=312):
+    def page(header_type, granule, data):
+        return (
+            b"OggS"
+            + bytes([0, header_type])
+            + struct.pack("<qIII", granule, 1, 0, 0)
+            + bytes([1, len(data)])
+            + data
+        )
+
+    head = b"OpusHead" + bytes([1, 1]) + struct.pack("<H", pre_skip) + b"\0" * 7
+    return (
+        page(2, 0, head)
+        + page(0, 0, b"OpusTags")
+        + page(4, int(seconds * 48000) + pre_skip, b"x" * 10)
+    )
+
+
+class RecipeAssetsTestCase(TestCase):
+    def setUp(self):
+        self.assets_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.assets_dir)
+        self.write("images-output/polska/zurek.jpg", jpeg_bytes(1024, 768))
+        self.write("audio-output/polska/zurek.opus", opus_bytes(12.5))
+        self.write("images-output/polska/bigos.jpg", jpeg_bytes(10, 10)[:-2])
+        c = Cuisine.objects.create(name="Polska")
+        self.zurek = Recipe.objects.create(
+            name="Żurek",
+            recipe="",
+            image_path="polska/zurek.jpg",
+            audio_path="polska/zurek.opus",
+            cuisine=c,
+        )
+        self.bigos = Recipe.objects.create(
+            name="Bigos",
+            recipe="",
+            image_path="polska/bigos.jpg",
+            audio_path="polska/bigos.opus",
+            cuisine=c,
+        )
+
+    def write(self, path, data):
+        path = os.path.join(self.assets_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def test_records_metadata(self):
+        self.assertEqual(update_recipe_assets(self.assets_dir), 1)
+        self.zurek.refresh_from_db()
+        self.assertTrue(self.zurek.has_image)
+        self.assertEqual((self.zurek.image_width, self.zurek.image_height), (1024, 768))
+        self.assertEqual(self.zurek.image_size, len(jpeg_bytes(1024, 768)))
+        self.assertTrue(self.zurek.has_audio)
+        self.assertEqual(self.zurek.audio_duration, 12.5)
+        # Ucięty obraz i brakujące nagranie
+        self.bigos.refresh_from_db()
+        self.assertFalse(self.bigos.has_image)
+        self.assertIsNone(self.bigos.image_width)
+        self.assertFalse(self.bigos.has_audio)
+
+    def test_truncated_headers_are_corrupt(self):
+        self.write("images-output/polska/flaki.jpg", jpeg_bytes(10, 10)[:8])
+        self.write("audio-output/polska/flaki.opus", opus_bytes(1)[:36])
+        inventory = AssetInventory(self.assets_dir)
+        inventory.refresh()
+        self.assertIsNone(inventory.get("images", "polska/flaki.jpg")["metadata"])
+        self.assertIsNone(inventory.get("audio", "polska/flaki.opus")["metadata"])
+        report = inventory.report(
+            [
+                {
+                    "name": "Flaki",
+                    "image": "polska/flaki.jpg",
+                    "audio": "polska/flaki.opus",
+                }
+            ]
+        )
+        self.assertIn("polska/flaki.jpg", report["images"]["corrupt"])
+        self.assertIn("polska/flaki.opus", report["audio"]["corrupt"])
+
+    def test_only_file_name_is_case_insensitive(self):
+        self.write("images-output/Polska/schabowy.jpg", jpeg_bytes(20, 10))
+        Recipe.objects.create(
+            name="Schabowy",
+            recipe="",
+            image_path="Polska/Schabowy.jpg",
+            audio_path="",
+            cuisine=self.zurek.cuisine,
+        )
+        self.zurek.image_path = "POLSKA/zurek.jpg"
+        self.zurek.save()
+        update_recipe_assets(self.assets_dir)
+        self.assertTrue(Recipe.objects.get(name="Schabowy").has_image)
+        self.zurek.refresh_from_db()
+        self.assertFalse(self.zurek.has_image)
+        inventory = AssetInventory(self.assets_dir)
+        report = inventory.report(
+            [{"name": "Schabowy", "image": "Polska/Schabowy.jpg"}]
+        )
+        self.assertEqual(report["images"]["missing"], [])
+
+    def test_incremental_update(self):
+        update_recipe_assets(self.assets_dir)
+        self.assertEqual(update_recipe_assets(self.assets_dir), 0)
+        os.remove(os.path.join(self.assets_dir, "audio-output/polska/zurek.opus"))
+        self.assertEqual(update_recipe_assets(self.assets_dir), 1)
+        self.zurek.refresh_from_db()
+        self.assertFalse(self.zurek.has_audio)
+        self.assertIsNone(self.zurek.audio_duration)
+
+    def test_api_fields_and_filter(self):
+        update_recipe_assets(self.assets_dir)
+        for sql in (False, True):
+            with override_settings(RECIPE_SQL_SERIALIZER=sql):
+                resp = self.client.get(reverse("recipe_filter"), {"has_audio": "1"})
+                results = resp.json()["results"]
+                self.assertEqual([r["name"] for r in results], ["Żurek"])
+                self.assertEqual(results[0]["audio_duration"], 12.5)
+                self.assertIs(results[0]["has_image"], True)
+                resp = self.client.get(reverse("recipe_filter"), {"has_image": "0"})
+                self.assertEqual([r["name"] for r in resp.json()["results"]], ["Bigos"])
+
+    def test_image_placeholder(self):
+        path = os.path.join(self.assets_dir, "images-output/polska/zurek.jpg")
+        image = Image.new("RGB", (400, 300), (0, 0, 255))
+        image.paste((255, 0, 0), (0, 0, 100, 100))
+        image.save(path, "JPEG")
+        update_recipe_assets(self.assets_dir, workers=1)
+        self.zurek.refresh_from_db()
+        self.assertTrue(
+            self.zurek.image_placeholder.startswith("data:image/jpeg;base64,")
+        )
+        self.assertLess(len(self.zurek.image_placeholder), 1000)
+        red, green, blue = (
+            int(self.zurek.image_color[i : i + 2], 16) for i in (1, 3, 5)
+        )
+        self.assertTrue(blue > 200 and red < 50 and green < 50)
+        # Niezdekodowany obraz nie ma podglądu, brakujący również
+        self.bigos.refresh_from_db()
+        self.assertIsNone(self.bigos.image_placeholder)
+        # Podgląd jest liczony ponownie tylko po zmianie obrazu
+        self.assertEqual(update_recipe_assets(self.assets_dir, workers=1), 0)
+        Image.new("RGB", (40, 30), (0, 255, 0)).save(path, "JPEG")
+        self.assertEqual(update_recipe_assets(self.assets_dir, workers=1), 1)
+        self.zurek.refresh_from_db()
+        self.assertEqual(self.zurek.image_width, 40)
+        self.assertEqual(self.zurek.image_color[3:5], "ff")
+
+    def test_audio_playlist(self):
+        playlist = "\n".join(
+            [
+                "#EXTM3U",
+                "#EXT-X-TARGETDURATION:4",
+                '#EXT-X-MAP:URI="init.mp4"',
+                "#EXTINF:4.000000,",
+                "seg_00000.m4s",
+                "#EXTINF:2.500000,",
+                "seg_00001.m4s",
+                "#EXT-X-ENDLIST",
+            ]
+        )
+        for name in ("init.mp4", "seg_00000.m4s", "seg_00001.m4s"):
+            self.write(f"audio-output/polska/zurek.hls/{name}", b"x")
+        self.write("audio-output/polska/zurek.hls/index.m3u8", playlist.encode())
+        update_recipe_assets(self.assets_dir)
+        self.zurek.refresh_from_db()
+        self.assertTrue(self.zurek.has_audio_segments)
+        for sql in (False, True):
+            with override_settings(RECIPE_SQL_SERIALIZER=sql):
+                resp = self.client.get(reverse("recipe_filter"), {"has_audio": "1"})
+                url = resp.json()["results"][0]["audio_playlist"]
+                self.assertEqual(
+                    url,
+                    reverse(
+                        "serve_media", args=["audio", "polska/zurek.hls/index.m3u8"]
+                    ),
+                )
+        with override_settings(ASSETS_DIR=self.assets_dir):
+            resp = self.client.get(url)
+        self.assertEqual(resp["Content-Type"], "application/vnd.apple.mpegurl")
+        # Brakujący segment: playlista jest traktowana jak uszkodzona
+        os.remove(
+            os.path.join(self.assets_dir, "audio-output/polska/zurek.hls/seg_00001.m4s")
+        )
+        self.write(
+            "audio-output/polska/zurek.hls/index.m3u8", (playlist + "\n").encode()
+        )
+        update_recipe_assets(self.assets_dir)
+        self.zurek.refresh_from_db()
+        self.assertFalse(self.zurek.has_audio_segments)
@@ -0,0 +1,221 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import derivatives
+from core.derivatives import evict_derivatives, render_derivatives
+from core.models import Cuisine, Recipe
+from core.sql_serializers import recipe_page_json
+from core.views import COMPACT_JSON, serialize_recipe
+
+
+class DerivativesTestCase(TestCase):
+    def setUp(self):
+        self.assets_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.assets_dir)
+        os.makedirs(os.path.join(self.assets_dir, "images-output", "polska"))
+        self.source = os.path.join(
+            self.assets_dir, "images-output", "polska", "zurek.jpg"
+        )
+        Image.new("RGB", (800, 600), (200, 100, 50)).save(self.source, "JPEG")
+        settings = override_settings(
+            ASSETS_DIR=self.assets_dir,
+            DERIVATIVES_DIR="",
+            IMAGE_DERIVATIVE_WIDTHS=[160, 320, 1024],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.cache_dir = os.path.join(self.assets_dir, "derivatives")
+
+    def cached_files(self):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(self.cache_dir)
+            for name in names
+        )
+
+    def test_on_demand_derivative(self):
+        url = reverse("serve_derivative", args=["webp", 320, "polska/zurek.jpg"])
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "image/webp")
+        image = Image.open(io.BytesIO(b"".join(resp.streaming_content)))
+        self.assertEqual((image.format, image.size), ("WEBP", (320, 240)))
+        self.assertEqual(len(self.cached_files()), 1)
+        # Drugie żądanie korzysta z cache
+        self.client.get(url)
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_no_upscaling_and_invalid_requests(self):
+        url = reverse("serve_derivative", args=["jpeg", 1024, "polska/zurek.jpg"])
+        resp = self.client.get(url)
+        image = Image.open(io.BytesIO(b"".join(resp.streaming_content)))
+        self.assertEqual((image.format, image.size), ("JPEG", (800, 600)))
+        for args in (
+            ["png", 320, "polska/zurek.jpg"],
+            ["webp", 300, "polska/zurek.jpg"],
+            ["webp", 320, "polska/brak.jpg"],
+            ["webp", 320, "../x.jpg"],
+        ):
+            resp = self.client.get(reverse("serve_derivative", args=args))
+            self.assertEqual(resp.status_code, 404)
+
+    def test_render_and_evict(self):
+        self.assertEqual(
+            render_derivatives(
+                self.source, self.cache_dir, [160, 320], ["webp", "jpeg"]
+            ),
+            4,
+        )
+        self.assertEqual(
+            render_derivatives(
+                self.source, self.cache_dir, [160, 320], ["webp", "jpeg"]
+            ),
+            0,
+        )
+        files = self.cached_files()
+        for age, path in enumerate(files):
+            os.utime(path, (1000 + age, 1000 + age))
+        newest = os.path.getsize(files[-1])
+        self.assertEqual(evict_derivatives(self.cache_dir, newest), 3)
+        self.assertEqual(self.cached_files(), files[-1:])
+
+    def test_generate_command(self):
+        cuisine = Cuisine.objects.create(name="Polska")
+        Recipe.objects.create(
+            name="Żurek",
+            cuisine=cuisine,
+            recipe="...",
+            has_image=True,
+            image_path="polska/zurek.jpg",
+        )
+        call_command("generate_derivatives", "--workers", "1", stdout=io.StringIO())
+        self.assertEqual(len(self.cached_files()), 6)
+
+    def test_srcset_matches_sql_serializer(self):
+        cuisine = Cuisine.objects.create(name="Polska")
+        Recipe.objects.create(
+            name="A",
+            cuisine=cuisine,
+            recipe="...",
+            has_image=True,
+            image_path="polska/zurek.jpg",
+        )
+        Recipe.objects.create(
+            name="B", cuisine=cuisine, recipe="...", image_path="polska/b.jpg"
+        )
+        qs = Recipe.objects.order_by("name")
+        expected = json.dumps([serialize_recipe(r) for r in qs], **COMPACT_JSON)
+        self.assertEqual(recipe_page_json(qs), expected)
+        srcset = serialize_recipe(qs[0])["srcset"]
+        self.assertEqual(set(srcset), {"webp", "jpeg"})
+        self.assertTrue(
+            srcset["webp"].endswith("/media/derived/webp/1024/polska/zurek.jpg 1024w")
+        )
+        self.assertIsNone(serialize_recipe(qs[1])["srcset"])
+
+    def test_cache_hit_does_not_hash_source(self):
+        url = reverse("serve_derivative", args=["webp", 160, "polska/zurek.jpg"])
+        self.client.get(url)
+        with patch("core.derivatives.source_checksum") as checksum:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        checksum.assert_not_called()
+
+    def test_checksum_from_inventory(self):
+        stat = os.stat(self.source)
+        index = {
+            "images": {
+                "polska/zurek.jpg": {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": "ab" * 32,
+                }
+            }
+        }
+        with open(os.path.join(self.assets_dir, "asset-index.json"), "w") as f:
+            json.dump(index, f)
+        url = reverse("serve_derivative", args=["jpeg", 160, "polska/zurek.jpg"])
+        with patch("core.derivatives.source_checksum") as checksum:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        checksum.assert_not_called()
+        self.assertTrue(
+            os.path.exists(
+                derivatives.derivative_path(self.cache_dir, "ab" * 32, 160, "jpeg")
+            )
+        )
+
+    def test_derivative_evicted_before_serving_is_rendered_again(self):
+        url = reverse("serve_derivative", args=["webp", 320, "polska/zurek.jpg"])
+        real_render = render_derivatives
+        evicted = []
+
+        def render_then_evict(*args, **kwargs):
+            created = real_render(*args, **kwargs)
+            if not evicted:
+                # Równoległe czyszczenie cache usuwa świeżą pochodną
+                evicted.extend(self.cached_files())
+                for path in evicted:
+                    os.remove(path)
+            return created
+
+        with patch(
+            "core.derivatives.render_derivatives", side_effect=render_then_evict
+        ):
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(evicted), 1)
+        b"".join(resp.streaming_content)
+
+    def test_etag_stable_across_hits_and_rerender(self):
+        url = reverse("serve_derivative", args=["webp", 160, "polska/zurek.jpg"])
+        etag = self.client.get(url)["ETag"]
+        (path,) = self.cached_files()
+        mtime_ns = os.stat(path).st_mtime_ns
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime_ns)
+        # Stary czas dostępu: trafienie odświeża atime, ale nie mtime
+        os.utime(path, ns=(0, mtime_ns))
+        self.assertEqual(self.client.get(url)["ETag"], etag)
+        self.assertGreater(os.stat(path).st_atime, 0)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime_ns)
+        os.remove(path)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_truncated_source_returns_404(self):
+        with open(self.source, "rb") as f:
+            data = f.read()
+        broken = os.path.join(self.assets_dir, "images-output", "polska", "bigos.jpg")
+        with open(broken, "wb") as f:
+            f.write(data[: len(data) // 2])
+        url = reverse("serve_derivative", args=["webp", 160, "polska/bigos.jpg"])
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 404)
+        self.assertIn("error", resp.json())
+        self.assertEqual(self.cached_files(), [])
+
+    def test_srcset_escapes_path(self):
+        cuisine = Cuisine.objects.create(name="Polska")
+        Recipe.objects.create(
+            name="A",
+            cuisine=cuisine,
+            recipe="...",
+            has_image=True,
+            image_path="polska/zupa ogórkowa, 100%.jpg",
+        )
+        qs = Recipe.objects.all()
+        expected = json.dumps([serialize_recipe(r) for r in qs], **COMPACT_JSON)
+        self.assertEqual(recipe_page_json(qs), expected)
+        srcset = serialize_recipe(qs[0])["srcset"]["webp"]
+        self.assertIn("/polska/zupa%20ogórkowa%2C%20100%25.jpg 160w, ", srcset)
+        self.assertEqual(len(srcset.split(", ")), 3)
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.catalog import bump_catalog_version, catalog_version
+from core.models import Cuisine, Diet, Ingredient, Recipe
+
+
+class RecipeFacetsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        c1 = Cuisine.objects.create(name="C1")
+        c2 = Cuisine.objects.create(name="C2")
+        d1 = Diet.objects.create(name="D1")
+        d2 = Diet.objects.create(name="D2")
+        i1, i2, i3 = [Ingredient.objects.create(name=n) for n in ["I1", "I2", "I3"]]
+        a = Recipe.objects.create(name="A", recipe="", cuisine=c1)
+        a.diet.add(d1)
+        a.ingredients.add(i1, i2)
+        b = Recipe.objects.create(name="B", recipe="", cuisine=c2)
+        b.diet.add(d1, d2)
+        b.ingredients.add(i1)
+        c = Recipe.objects.create(name="C", recipe="", cuisine=c1)
+        c.ingredients.add(i1, i3)
+
+    def get(self, params=None):
+        resp = self.client.get(reverse("recipe_facets"), params or {})
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_unfiltered_counts(self):
+        data = self.get()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(
+            data["cuisines"], [{"name": "C1", "count": 2}, {"name": "C2", "count": 1}]
+        )
+        self.assertEqual(
+            data["diets"], [{"name": "D1", "count": 2}, {"name": "D2", "count": 1}]
+        )
+        self.assertEqual(
+            data["ingredients"],
+            [
+                {"name": "I1", "count": 3},
+                {"name": "I2", "count": 1},
+                {"name": "I3", "count": 1},
+            ],
+        )
+
+    def test_filtered_counts_and_top(self):
+        data = self.get({"cuisine": "C1", "top": 1})
+        self.assertEqual(data["total"], 2)
+        self.assertEqual(data["diets"], [{"name": "D1", "count": 1}])
+        self.assertEqual(data["ingredients"], [{"name": "I1", "count": 2}])
+        data = self.get({"q": "diet:D2 OR ingredient:I3"})
+        self.assertEqual(data["total"], 2)
+
+    def test_total_matches_filter_view(self):
+        params = {"diet": "D1", "exclude_ingredient": "I2"}
+        total = self.client.get(reverse("recipe_filter"), params).json()["pagination"][
+            "total"
+        ]
+        self.assertEqual(self.get(params)["total"], total)
+
+    def test_empty_selection(self):
+        data = self.get({"ingredient": "Nope"})
+        self.assertEqual(
+            data, {"total": 0, "cuisines": [], "diets": [], "ingredients": []}
+        )
+
+    def test_single_query_and_cache(self):
+        # Rozwiązanie nazw diet i jedno zapytanie agregujące
+        with self.assertNumQueries(2):
+            self.get({"diet": "D1"})
+        with self.assertNumQueries(0):
+            self.get({"diet": ["D1", "D1"]})
+
+    def test_cache_invalidated_on_catalog_update(self):
+        self.assertEqual(self.get()["total"], 3)
+        Recipe.objects.create(name="D", recipe="", cuisine=Cuisine.objects.first())
+        self.assertEqual(self.get()["total"], 3)
+        bump_catalog_version()
+        self.assertEqual(self.get()["total"], 4)
+
+    def test_version_file_shared_between_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "catalog-version")
+        with override_settings(CATALOG_VERSION_FILE=path):
+            self.assertEqual(catalog_version(), 1)
+            self.assertEqual(self.get()["total"], 3)
+            Recipe.objects.create(name="D", recipe="", cuisine=Cuisine.objects.first())
+            # Import w innym procesie zapisuje nową wersję do pliku
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("5\n")
+            self.assertEqual(self.get()["total"], 4)
+            self.assertEqual(bump_catalog_version(), 6)
+            self.assertEqual(catalog_version(), 6)
+            self.assertEqual(os.listdir(directory), ["catalog-version"])
+
+    def test_invalid_query(self):
+        resp = self.client.get(reverse("recipe_facets"), {"q": "diet:A OR"})
+        self.assertEqual(resp.status_code, 400)
@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from core.fields import compress_text, decompress_text
+from core.models import Cuisine, Recipe
+
+
+class CompressTextTestCase(TestCase):
+    def test_round_trip(self):
+        text = "Pokrój cebulę w kostkę. Dodaj sól i pieprz do smaku. " * 20
+        data = compress_text(text)
+        self.assertLess(len(data), len(text.encode("utf-8")))
+        self.assertEqual(decompress_text(data), text)
+
+    def test_empty(self):
+        self.assertEqual(decompress_text(b""), "")
+        self.assertEqual(decompress_text(compress_text("")), "")
+
+    def test_unknown_header(self):
+        with self.assertRaises(ValueError):
+            decompress_text(b"\x7fabc")
+
+
+class CompressedTextFieldTestCase(TestCase):
+    def setUp(self):
+        self.cuisine = Cuisine.objects.create(name="C")
+
+    def test_stored_compressed_and_read_back(self):
+        recipe = Recipe.objects.create(
+            name="R", recipe="Gotuj 10 minut.", cuisine=self.cuisine
+        )
+        loaded = Recipe.objects.get(pk=recipe.pk)
+        self.assertIsInstance(loaded.__dict__["recipe"], bytes)
+        self.assertEqual(loaded.recipe, "Gotuj 10 minut.")
+        self.assertEqual(loaded.__dict__["recipe"], "Gotuj 10 minut.")
+
+    def test_update_keeps_text(self):
+        recipe = Recipe.objects.create(name="R", recipe="A", cuisine=self.cuisine)
+        recipe.recipe = "B"
+        recipe.save()
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).recipe, "B")
@@ -0,0 +1,67 @@
+from django.http import QueryDict
+from django.test import TestCase
+
+from core.filters import filter_recipes, resolve_name_ids
+from core.models import Cuisine, Diet, Ingredient, Recipe
+
+
+class FilterRecipesTestCase(TestCase):
+    def setUp(self):
+        c1 = Cuisine.objects.create(name="C1")
+        c2 = Cuisine.objects.create(name="C2")
+        d1, d2, d3 = [Diet.objects.create(name=n) for n in ["D1", "D2", "D3"]]
+        i1, i2, i3 = [Ingredient.objects.create(name=n) for n in ["I1", "I2", "I3"]]
+        self.rA = Recipe.objects.create(name="A", recipe="", cuisine=c1)
+        self.rA.diet.add(d1, d2)
+        self.rA.ingredients.add(i1, i2, i3)
+        self.rB = Recipe.objects.create(name="B", recipe="", cuisine=c2)
+        self.rB.diet.add(d1)
+        self.rB.ingredients.add(i1, i2)
+        self.rC = Recipe.objects.create(name="C", recipe="", cuisine=c1)
+        self.rC.diet.add(d2, d3)
+        self.rC.ingredients.add(i3)
+
+    def names(self, query):
+        qs = filter_recipes(Recipe.objects.order_by("name"), QueryDict(query))
+        return list(qs.values_list("name", flat=True))
+
+    def test_has_all_diets_and_ingredients(self):
+        self.assertEqual(self.names("diet=D1&diet=D2"), ["A"])
+        self.assertEqual(self.names("ingredient=I1&ingredient=I2"), ["A", "B"])
+        self.assertEqual(self.names("diet=D1&ingredient=I1&ingredient=I3"), ["A"])
+
+    def test_repeated_value_counts_once(self):
+        self.assertEqual(self.names("diet=D1&diet=D1"), ["A", "B"])
+
+    def test_unknown_name_matches_nothing(self):
+        self.assertEqual(self.names("ingredient=I1&ingredient=Nope"), [])
+        self.assertEqual(self.names("cuisine=Nope"), [])
+
+    def test_exclude_is_anti_join(self):
+        self.assertEqual(self.names("exclude_diet=D3"), ["A", "B"])
+        self.assertEqual(
+            self.names("exclude_ingredient=I3&exclude_ingredient=Nope"), ["B"]
+        )
+        self.assertEqual(
+            self.names("diet=D2&exclude_cuisine=C2&exclude_diet=D3"), ["A"]
+        )
+
+    def test_no_duplicate_rows(self):
+        qs = filter_recipes(Recipe.objects.all(), QueryDict("diet=D1&ingredient=I1"))
+        self.assertEqual(qs.count(), 2)
+
+    def test_duplicate_names_in_catalog(self):
+        Diet.objects.create(name="D1")
+        self.assertEqual(self.names("diet=D1&diet=D2"), ["A"])
+
+    def test_names_resolved_once_per_taxonomy(self):
+        # jedno zapytanie na kuchnie, diety i składniki oraz zapytanie główne
+        with self.assertNumQueries(4):
+            self.names(
+                "cuisine=C1&diet=D1&diet=D2&exclude_diet=D3"
+                "&ingredient=I1&exclude_ingredient=I2"
+            )
+
+    def test_resolve_name_ids(self):
+        self.assertEqual(set(resolve_name_ids(Diet, ["D1", "X"])), {"D1"})
+        self.assertEqual(resolve_name_ids(Diet, []), {})
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class ServeMediaTestCase(TestCase):
+    def setUp(self):
+        self.assets_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.assets_dir)
+        os.makedirs(os.path.join(self.assets_dir, "audio-output", "polska"))
+        self.data = bytes(range(256)) * 40
+        with open(
+            os.path.join(self.assets_dir, "audio-output", "polska", "zurek.opus"), "wb"
+        ) as f:
+            f.write(self.data)
+        settings = override_settings(ASSETS_DIR=self.assets_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.url = reverse("serve_media", args=["audio", "polska/zurek.opus"])
+
+    def body(self, resp):
+        return b"".join(resp.streaming_content)
+
+    def test_full_file_with_cache_headers(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.body(resp), self.data)
+        self.assertEqual(resp["Content-Type"], "audio/ogg")
+        self.assertEqual(resp["Content-Length"], str(len(self.data)))
+        self.assertEqual(resp["Accept-Ranges"], "bytes")
+        self.assertIn("max-age=", resp["Cache-Control"])
+        self.assertTrue(resp["ETag"].startswith('"'))
+
+    def test_range_requests(self):
+        resp = self.client.get(self.url, headers={"Range": "bytes=100-199"})
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp["Content-Range"], f"bytes 100-199/{len(self.data)}")
+        self.assertEqual(self.body(resp), self.data[100:200])
+        resp = self.client.get(self.url, headers={"Range": "bytes=-10"})
+        self.assertEqual(self.body(resp), self.data[-10:])
+        resp = self.client.get(self.url, headers={"Range": "bytes=10000-"})
+        self.assertEqual(self.body(resp), self.data[10000:])
+        resp = self.client.get(self.url, headers={"Range": f"bytes={len(self.data)}-"})
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)["ETag"]
+        resp = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+        # Nieaktualny If-Range: zwracany jest cały plik
+        resp = self.client.get(
+            self.url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+        )
+        self.assertEqual(resp.status_code, 200)
+        resp = self.client.get(
+            self.url, headers={"Range": "bytes=0-9", "If-Range": etag}
+        )
+        self.assertEqual(resp.status_code, 206)
+
+    def test_missing_and_traversal(self):
+        for path in ["polska/bigos.opus", "../../etc/passwd"]:
+            resp = self.client.get(f"/api/media/audio/{path}")
+            self.assertEqual(resp.status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
@@ -0,0 +1,38 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.bench import populate_catalog
+from core.models import Recipe
+from core.query_budget import exceeded_counts
+
+
+class QueryBudgetTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        populate_catalog(recipes=300, ingredients=60)
+
+    def test_within_budget(self):
+        resp = self.client.get(reverse("recipe_filter"), {"ingredient": "Ingredient 1"})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_exceeded_budget_is_cancelled(self):
+        params = {
+            "ingredient": [f"Ingredient {i}" for i in range(40)],
+            "order_by": "-ingredients_count",
+        }
+        before = exceeded_counts().get("recipe_filter", 0)
+        with override_settings(QUERY_BUDGETS_MS={"recipe_filter": 0}):
+            with self.assertLogs("core.query_budget", "WARNING") as logs:
+                resp = self.client.get(reverse("recipe_filter"), params)
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.json()["budget_ms"], 0)
+        self.assertIn("error", resp.json())
+        self.assertEqual(exceeded_counts()["recipe_filter"], before + 1)
+        self.assertIn(
+            "ingredient=ingredient+0&ingredient=ingredient+1&", logs.output[0]
+        )
+        # Termin nie obowiązuje poza żądaniem
+        self.assertEqual(Recipe.objects.count(), 300)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
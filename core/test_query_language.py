@@ -0,0 +1,136 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Cuisine, Diet, Ingredient, Recipe
+from core.query_language import (
+    QuerySyntaxError,
+    canonical,
+    clear_plan_cache,
+    get_plan,
+    parse_query,
+)
+
+
+class ParseQueryTestCase(TestCase):
+    def test_precedence_and_grouping(self):
+        self.assertEqual(
+            canonical(parse_query("diet:A OR diet:B AND NOT diet:C")),
+            '(diet:"A" OR (diet:"B" AND NOT diet:"C"))',
+        )
+        self.assertEqual(
+            canonical(parse_query("(diet:A OR diet:B) diet:C")),
+            '(diet:"C" AND (diet:"A" OR diet:"B"))',
+        )
+
+    def test_normalization(self):
+        a = parse_query("ingredient:b and (ingredient:a AND ingredient:b)")
+        b = parse_query("ingredient:a AND ingredient:b")
+        self.assertEqual(a, b)
+        self.assertEqual(parse_query("NOT NOT cuisine:X"), parse_query("cuisine:X"))
+
+    def test_quoted_values(self):
+        tree = parse_query('ingredient:"olive oil" OR ingredient:"say \\"hi\\""')
+        self.assertEqual(
+            canonical(tree), '(ingredient:"olive oil" OR ingredient:"say \\"hi\\"")'
+        )
+
+    def test_syntax_errors(self):
+        for text in [
+            "",
+            "color:red",
+            "diet:A OR",
+            "(diet:A",
+            "diet:A)",
+            "diet:A XOR diet:B",
+            " OR ".join(f"diet:{i}" for i in range(40)),
+        ]:
+            with self.assertRaises(QuerySyntaxError, msg=text):
+                parse_query(text)
+
+    def test_deep_nesting_rejected(self):
+        for text in ["(" * 2000 + "diet:a" + ")" * 2000, "NOT " * 1200 + "diet:a"]:
+            with self.assertRaises(QuerySyntaxError):
+                parse_query(text)
+        parse_query("(" * 16 + "NOT " * 16 + "diet:a" + ")" * 16)
+
+    def test_deep_nesting_returns_400(self):
+        response = self.client.get(
+            reverse("recipe_filter"), {"q": "(" * 2000 + "diet:a" + ")" * 2000}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_plan_cached_by_canonical_form(self):
+        get_plan("ingredient:cache1 OR ingredient:cache2")
+        plan, cached = get_plan("(ingredient:cache2) or ingredient:cache1")
+        self.assertTrue(cached)
+        self.assertEqual(plan.canonical, '(ingredient:"cache1" OR ingredient:"cache2")')
+
+
+class QueryFilterViewTestCase(TestCase):
+    def setUp(self):
+        c1 = Cuisine.objects.create(name="Polska")
+        c2 = Cuisine.objects.create(name="Włoska")
+        vegan = Diet.objects.create(name="Vegan")
+        chicken, turkey, nuts = [
+            Ingredient.objects.create(name=n) for n in ["chicken", "turkey", "nuts"]
+        ]
+        a = Recipe.objects.create(name="A", recipe="", cuisine=c1)
+        a.ingredients.add(chicken)
+        b = Recipe.objects.create(name="B", recipe="", cuisine=c2)
+        b.ingredients.add(turkey, nuts)
+        c = Recipe.objects.create(name="C", recipe="", cuisine=c2)
+        c.ingredients.add(turkey)
+        c.diet.add(vegan)
+        Recipe.objects.create(name="D", recipe="", cuisine=c1)
+
+    def names(self, params):
+        resp = self.client.get(reverse("recipe_filter"), params)
+        self.assertEqual(resp.status_code, 200)
+        return [r["name"] for r in resp.json()["results"]]
+
+    def test_or_and_not(self):
+        q = "(ingredient:chicken OR ingredient:turkey) AND NOT ingredient:nuts"
+        self.assertEqual(self.names({"q": q}), ["A", "C"])
+        self.assertEqual(self.names({"q": "NOT diet:Vegan"}), ["A", "B", "D"])
+        self.assertEqual(
+            self.names({"q": "cuisine:Polska OR diet:Vegan", "order_by": "-name"}),
+            ["D", "C", "A"],
+        )
+
+    def test_combined_with_classic_filters(self):
+        self.assertEqual(
+            self.names(
+                {"q": "ingredient:turkey", "cuisine": "Włoska", "exclude_diet": "Vegan"}
+            ),
+            ["B"],
+        )
+
+    def test_invalid_query(self):
+        resp = self.client.get(reverse("recipe_filter"), {"q": "diet:("})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn("error", resp.json())
+
+    def test_explain(self):
+        resp = self.client.get(
+            reverse("recipe_filter"),
+            {"q": "ingredient:turkey AND NOT ingredient:nuts", "explain": "1"},
+        )
+        explain = resp.json()["explain"]
+        self.assertEqual(
+            explain["canonical"], '(ingredient:"turkey" AND NOT ingredient:"nuts")'
+        )
+        self.assertEqual(explain["total_recipes"], 4)
+        self.assertEqual(explain["cost"], 3)
+        self.assertEqual(explain["plan"]["op"], "and")
+        self.assertEqual(
+            [child["estimated_rows"] for child in explain["plan"]["children"]], [2, 3]
+        )
+        self.assertIn("sql", explain)
+
+    def test_explain_reports_plan_cache_hit(self):
+        clear_plan_cache()
+        params = {"q": "ingredient:turkey OR diet:vegan", "explain": "1"}
+        first = self.client.get(reverse("recipe_filter"), params).json()["explain"]
+        second = self.client.get(reverse("recipe_filter"), params).json()["explain"]
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
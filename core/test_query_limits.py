@@ -0,0 +1,165 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.bench import populate_catalog
+from core.models import Cuisine, Recipe
+from core.query_limits import QueryLimits
+from core.views import FILTER_MAX_PER_PAGE, MAX_PER_PAGE
+
+# Najwięcej wierszy na przepis przy prefetch w populate_catalog:
+# przepis, do 3 diet i do 15 składników
+ROWS_PER_RECIPE = 1 + 3 + 15
+
+# Zapytania przy serializacji w Pythonie: COUNT, strona, prefetch diet
+# i prefetch składników; serializacja SQL zastępuje prefetch jednym
+# zapytaniem budującym JSON strony
+PAGE_QUERIES = {False: 4, True: 3}
+
+
+def page_rows(sql: bool, per_page: int) -> int:
+    # COUNT, wiersze strony i (w SQL) jeden wiersz z tablicą JSON
+    return 1 + per_page * (1 if sql else ROWS_PER_RECIPE) + (1 if sql else 0)
+
+
+# Filtry widoku filtrowania i liczba zapytań o identyfikatory wartości
+FILTERS = [
+    ({}, 0),
+    ({"cuisine": "Cuisine 1"}, 1),
+    ({"diet": "Diet 1", "order_by": "-ingredients_count"}, 1),
+    ({"ingredient": ["Ingredient 0", "Ingredient 1"], "diet": "Diet 2"}, 2),
+    ({"q": 'ingredient:"Ingredient 0" AND NOT diet:"Diet 2"', "order_by": "name"}, 0),
+    ({"cuisine": "Cuisine 3", "diet": "Diet 0", "order_by": "cuisine"}, 2),
+]
+
+
+class QueryLimitsTestCase(TestCase):
+    def setUp(self):
+        self.cuisine = Cuisine.objects.create(name="C")
+
+    def test_counts_queries_and_rows(self):
+        Recipe.objects.create(name="A", recipe="x", cuisine=self.cuisine)
+        Recipe.objects.create(name="B", recipe="y", cuisine=self.cuisine)
+        with QueryLimits() as limits:
+            list(Recipe.objects.all())
+            Recipe.objects.count()
+        self.assertEqual(len(limits.queries), 2)
+        self.assertEqual(limits.rows, 3)
+
+    def test_rows_are_counted_when_fetched(self):
+        Recipe.objects.create(name="A", recipe="x", cuisine=self.cuisine)
+        Recipe.objects.create(name="B", recipe="y", cuisine=self.cuisine)
+        with QueryLimits() as limits:
+            names = list(Recipe.objects.values_list("name", flat=True))
+            Recipe.objects.all().delete()
+        self.assertEqual(len(names), 2)
+        self.assertEqual(limits.queries[0]["rows"], 2)
+
+    def test_exceeded_limit_lists_queries(self):
+        with self.assertRaises(AssertionError) as raised:
+            with QueryLimits(max_queries=1):
+                Recipe.objects.count()
+                Recipe.objects.exists()
+        self.assertIn("2 queries (limit 1)", str(raised.exception))
+        self.assertIn("COUNT(*)", str(raised.exception))
+
+    def test_decorator(self):
+        @QueryLimits(max_rows=0)
+        def fetch():
+            Recipe.objects.create(name="A", recipe="x", cuisine=self.cuisine)
+            list(Recipe.objects.all())
+
+        with self.assertRaisesMessage(AssertionError, "1 rows fetched (limit 0)"):
+            fetch()
+
+
+class EndpointQueryLimitsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        populate_catalog(recipes=500, ingredients=200)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, params, max_queries, max_rows, **kwargs):
+        with QueryLimits(max_queries, max_rows):
+            resp = self.client.get(reverse(name, kwargs=kwargs or None), params)
+        return resp
+
+    def test_dictionaries(self):
+        self.assertEqual(self.get("list_cuisines", {}, 1, 20).status_code, 200)
+        self.assertEqual(self.get("list_diets", {}, 1, 8).status_code, 200)
+
+    def test_ingredients(self):
+        for per_page in (1, 10, MAX_PER_PAGE):
+            for params in ({}, {"search": "ingredient 1"}, {"page": "3"}):
+                with self.subTest(per_page=per_page, params=params):
+                    resp = self.get(
+                        "list_ingredients",
+                        {**params, "per_page": per_page},
+                        2,
+                        per_page + 1,
+                    )
+                    self.assertEqual(resp.status_code, 200)
+
+    def test_recipe_list(self):
+        for sql in PAGE_QUERIES:
+            for per_page in (1, 10, MAX_PER_PAGE):
+                for page in ("1", "7"):
+                    with self.subTest(sql=sql, per_page=per_page, page=page):
+                        max_rows = page_rows(sql, per_page)
+                        with override_settings(RECIPE_SQL_SERIALIZER=sql):
+                            resp = self.get(
+                                "recipe_list",
+                                {"per_page": per_page, "page": page},
+                                PAGE_QUERIES[sql],
+                                max_rows,
+                            )
+                        self.assertEqual(resp.status_code, 200)
+                        self.assertEqual(len(resp.json()["results"]), per_page)
+
+    def test_recipe_filter(self):
+        for sql in PAGE_QUERIES:
+            for per_page in (1, 5, FILTER_MAX_PER_PAGE):
+                for params, lookups in FILTERS:
+                    with self.subTest(sql=sql, per_page=per_page, params=params):
+                        # Zapytania o identyfikatory zwracają po kilka wierszy
+                        max_rows = 2 * lookups + page_rows(sql, per_page)
+                        with override_settings(RECIPE_SQL_SERIALIZER=sql):
+                            resp = self.get(
+                                "recipe_filter",
+                                {**params, "per_page": per_page},
+                                PAGE_QUERIES[sql] + lookups,
+                                max_rows,
+                            )
+                        self.assertEqual(resp.status_code, 200)
+
+    def test_recipe_facets(self):
+        for top in (1, 10, 50):
+            for params, lookups in FILTERS[:4]:
+                with self.subTest(top=top, params=params):
+                    cache.clear()
+                    # Kuchnie, diety i najczęstsze składniki
+                    max_rows = 20 + 8 + top + 1 + 2 * lookups
+                    resp = self.get(
+                        "recipe_facets", {**params, "top": top}, 1 + lookups, max_rows
+                    )
+                    self.assertEqual(resp.status_code, 200)
+                    # Trafienie w cache nie wykonuje zapytań
+                    self.get("recipe_facets", {**params, "top": top}, 0, 0)
+
+    def test_media_without_queries(self):
+        resp = self.get(
+            "serve_media", {}, 0, 0, kind="images", path="cuisine_0/recipe_0.jpg"
+        )
+        self.assertEqual(resp.status_code, 404)
+        resp = self.get(
+            "serve_derivative",
+            {},
+            0,
+            0,
+            fmt="webp",
+            width=320,
+            path="cuisine_0/recipe_0.jpg",
+        )
+        self.assertEqual(resp.status_code, 404)
@@ -0,0 +1,134 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import media, views
+from core.models import Cuisine, Recipe
+from core.replicas import (
+    ReplicaReadMiddleware,
+    ReplicaRouter,
+    refresh_replicas,
+    replica_reads,
+)
+from core.signals import catalog_updated
+
+
+class RefreshReplicasTestCase(TransactionTestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.paths = [
+            os.path.join(self.folder, f"replica{i}.sqlite3") for i in range(2)
+        ]
+        cuisine = Cuisine.objects.create(name="Polska")
+        Recipe.objects.create(
+            name="Żurek", recipe="", image_path="", audio_path="", cuisine=cuisine
+        )
+
+    def count_recipes(self, path):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return conn.execute(
+                f'SELECT COUNT(*) FROM "{Recipe._meta.db_table}"'
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_snapshot_after_import(self):
+        with override_settings(READ_REPLICAS=self.paths):
+            catalog_updated.send(sender=self.__class__)
+            self.assertEqual([self.count_recipes(p) for p in self.paths], [1, 1])
+            # Otwarte połączenie czyta dalej starą kopię po podmianie pliku
+            old = sqlite3.connect(f"file:{self.paths[0]}?mode=ro", uri=True)
+            self.addCleanup(old.close)
+            Recipe.objects.create(
+                name="Bigos",
+                recipe="",
+                image_path="",
+                audio_path="",
+                cuisine=Cuisine.objects.get(),
+            )
+            self.assertEqual(refresh_replicas(), 2)
+        self.assertEqual([self.count_recipes(p) for p in self.paths], [2, 2])
+        table = Recipe._meta.db_table
+        self.assertEqual(
+            old.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0], 1
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.folder)), ["replica0.sqlite3", "replica1.sqlite3"]
+        )
+
+
+class ReplicaRouterTestCase(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.paths = [
+            os.path.join(self.folder, f"replica{i}.sqlite3") for i in range(3)
+        ]
+
+    def test_reads_go_to_existing_replicas(self):
+        router = ReplicaRouter()
+        with override_settings(READ_REPLICAS=self.paths):
+            with replica_reads():
+                self.assertIsNone(router.db_for_read(Recipe))
+            for path in self.paths[1:]:
+                open(path, "wb").close()
+            self.assertIsNone(router.db_for_read(Recipe))
+            chosen = set()
+            for _ in range(50):
+                with replica_reads():
+                    # Wszystkie odczyty bloku trafiają do jednej repliki
+                    reads = {router.db_for_read(Recipe) for _ in range(5)}
+                self.assertEqual(len(reads), 1)
+                chosen |= reads
+            self.assertEqual(chosen, {"replica_1", "replica_2"})
+            self.assertEqual(router.db_for_write(Recipe), "default")
+            self.assertFalse(router.allow_migrate("replica_1", "core"))
+
+    def test_middleware_only_for_api_reads(self):
+        seen = []
+        router = ReplicaRouter()
+        open(self.paths[0], "wb").close()
+
+        def get_response(request):
+            seen.append(router.db_for_read(Recipe))
+            return None
+
+        middleware = ReplicaReadMiddleware(get_response)
+        factory = RequestFactory()
+        cases = [
+            (factory.get(reverse("list_cuisines")), views.list_cuisines),
+            (factory.get(reverse("recipe_list")), views.RecipeListView.as_view()),
+            (factory.post(reverse("list_cuisines")), views.list_cuisines),
+            (factory.get("/api/media/audio/x.opus"), media.serve_media),
+        ]
+        with override_settings(READ_REPLICAS=self.paths[:1]):
+            for request, view in cases:
+                middleware.process_view(request, view, (), {})
+                middleware(request)
+            self.assertIsNone(router.db_for_read(Recipe))
+        self.assertEqual(seen, ["replica_0", "replica_0", None, None])
+
+    def test_middleware_uses_one_replica_per_request(self):
+        router = ReplicaRouter()
+        for path in self.paths:
+            open(path, "wb").close()
+        seen = []
+
+        def get_response(request):
+            seen.append({router.db_for_read(Recipe) for _ in range(10)})
+            return None
+
+        middleware = ReplicaReadMiddleware(get_response)
+        with override_settings(READ_REPLICAS=self.paths):
+            for _ in range(20):
+                request = RequestFactory().get(reverse("recipe_list"))
+                middleware.process_view(request, views.RecipeListView.as_view(), (), {})
+                middleware(request)
+        self.assertTrue(all(len(reads) == 1 for reads in seen))
+        self.assertGreater(len(set().union(*seen)), 1)
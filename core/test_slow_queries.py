@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.bench import populate_catalog
+from core.slow_queries import sql_fingerprint
+
+
+class SlowQueryLogTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        populate_catalog(recipes=50, ingredients=20)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.tmp.name, "slow.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def entries(self):
+        with open(self.log, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_disabled_by_default(self):
+        resp = self.client.get(reverse("recipe_filter"), {"cuisine": "Cuisine 1"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_slow_queries_are_logged_with_plan(self):
+        with override_settings(SLOW_QUERY_LOG=self.log, SLOW_QUERY_MS=0):
+            resp = self.client.get(
+                reverse("recipe_filter"), {"cuisine": " Cuisine 1 ", "page": "1"}
+            )
+        self.assertEqual(resp.status_code, 200)
+        entries = self.entries()
+        self.assertTrue(entries)
+        entry = entries[0]
+        self.assertEqual(entry["view"], "recipe_filter")
+        self.assertEqual(entry["method"], "GET")
+        self.assertEqual(entry["path"], reverse("recipe_filter"))
+        self.assertEqual(entry["query"], "cuisine=cuisine+1&page=1")
+        self.assertGreaterEqual(entry["duration_ms"], 0)
+        self.assertTrue(any(e["plan"] for e in entries))
+        # Zapytania EXPLAIN nie trafiają do logu
+        self.assertFalse(any(e["sql"].startswith("EXPLAIN") for e in entries))
+
+    def test_threshold(self):
+        with override_settings(SLOW_QUERY_LOG=self.log, SLOW_QUERY_MS=60_000):
+            self.client.get(reverse("recipe_filter"), {"cuisine": "Cuisine 1"})
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_fingerprint_collapses_parameter_lists(self):
+        self.assertEqual(
+            sql_fingerprint('SELECT *\n  FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            sql_fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s)'),
+        )
+
+    def test_summary_command(self):
+        with override_settings(SLOW_QUERY_LOG=self.log, SLOW_QUERY_MS=0):
+            for name in ("Cuisine 1", "Cuisine 2"):
+                self.client.get(reverse("recipe_filter"), {"cuisine": name})
+            out = StringIO()
+            call_command("slow_queries", "--top", "3", "--sort", "p95", stdout=out)
+        output = out.getvalue()
+        self.assertIn("slow queries", output)
+        self.assertIn("#1 total", output)
+        self.assertIn("views: recipe_filter", output)
+        self.assertIn("plan: ", output)
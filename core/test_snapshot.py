@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Cuisine, Diet, Ingredient, Recipe
+from core.signals import catalog_updated
+from core.snapshot import CatalogSnapshot, build_snapshot, current_snapshot
+
+
+class CatalogSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.path = os.path.join(self.folder, "catalog.snapshot")
+        c1 = Cuisine.objects.create(name="Polska")
+        c2 = Cuisine.objects.create(name="Włoska")
+        diets = [Diet.objects.create(name=n) for n in ["Wegańska", "Bez glutenu"]]
+        ings = [Ingredient.objects.create(name=n) for n in ["Żurek", "Jajko", "Sól"]]
+        self.recipes = []
+        for i in range(7):
+            recipe = Recipe.objects.create(
+                name=f"Przepis {i} 😀",
+                recipe=f'Krok {i}.\n"cytat"',
+                image_path=f"polska/{i}.jpg",
+                audio_path="",
+                cuisine=c1 if i % 2 else c2,
+            )
+            recipe.diet.add(*diets[: i % 3])
+            recipe.ingredients.add(*ings[i % 2 :])
+            self.recipes.append(recipe)
+
+    def test_arrays_match_database(self):
+        self.assertEqual(build_snapshot(self.path), 7)
+        snapshot = CatalogSnapshot(self.path)
+        self.assertEqual(len(snapshot), 7)
+        for recipe in self.recipes:
+            index = snapshot.index_of(recipe.id)
+            self.assertEqual(snapshot.cuisine_id(index), recipe.cuisine_id)
+            self.assertEqual(
+                snapshot.diet_ids(index), sorted(d.id for d in recipe.diet.all())
+            )
+            self.assertEqual(
+                snapshot.ingredient_ids(index),
+                sorted(i.id for i in recipe.ingredients.all()),
+            )
+        self.assertIsNone(snapshot.index_of(10**6))
+
+    def test_list_view_matches_database(self):
+        url = reverse("recipe_list")
+        params = [{"page": p, "per_page": 3} for p in (1, 2, 3, 99)] + [{}]
+        with override_settings(RECIPE_SQL_SERIALIZER=True):
+            expected = [self.client.get(url, p).content for p in params]
+        with override_settings(CATALOG_SNAPSHOT=self.path):
+            catalog_updated.send(sender=self.__class__)
+            self.assertIsNotNone(current_snapshot())
+            with self.assertNumQueries(0):
+                actual = [self.client.get(url, p).content for p in params]
+        self.assertEqual(actual, expected)
+
+    def test_swapped_without_restart(self):
+        with override_settings(CATALOG_SNAPSHOT=self.path):
+            self.assertIsNone(current_snapshot())
+            build_snapshot(self.path)
+            first = current_snapshot()
+            self.assertIs(current_snapshot(), first)
+            Recipe.objects.filter(pk=self.recipes[0].pk).delete()
+            build_snapshot(self.path)
+            second = current_snapshot()
+            self.assertIsNot(second, first)
+            self.assertEqual((len(first), len(second)), (7, 6))
+        self.assertEqual(
+            [name for name in os.listdir(self.folder)], ["catalog.snapshot"]
+        )
@@ -0,0 +1,83 @@
+import json
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Cuisine, Diet, Ingredient, Recipe
+from core.sql_serializers import recipe_page_json
+from core.views import COMPACT_JSON, serialize_recipe
+
+
+class RecipePageJsonTestCase(TestCase):
+    def setUp(self):
+        c1 = Cuisine.objects.create(name="Polska")
+        c2 = Cuisine.objects.create(name='Kuchnia "domowa"')
+        diets = [Diet.objects.create(name=n) for n in ["Wegańska", "Bez glutenu"]]
+        ings = [
+            Ingredient.objects.create(name=n)
+            for n in ["Żurek", "Jajko", "Kiełbasa", "Sól\tmorska"]
+        ]
+        self.r1 = Recipe.objects.create(
+            name="Żurek",
+            recipe="Ugotuj.\nPodawaj z jajkiem \\ chlebem 😀",
+            image_path="polska/zurek.jpg",
+            audio_path="polska/zurek.opus",
+            has_image=True,
+            image_size=123456,
+            image_width=1024,
+            image_height=1024,
+            has_audio=True,
+            audio_size=654321,
+            audio_duration=83.123,
+            cuisine=c1,
+        )
+        self.r1.diet.add(diets[1], diets[0])
+        self.r1.ingredients.add(ings[2], ings[0], ings[1])
+        self.r2 = Recipe.objects.create(
+            name="Pusty", recipe="", image_path="", audio_path="", cuisine=c2
+        )
+        self.r3 = Recipe.objects.create(
+            name="Sól", recipe="x", image_path="", audio_path="", cuisine=c1
+        )
+        self.r3.ingredients.add(ings[3])
+
+    def python_page_json(self, qs):
+        qs = qs.select_related("cuisine").prefetch_related("diet", "ingredients")
+        return json.dumps([serialize_recipe(r) for r in qs], **COMPACT_JSON)
+
+    def test_byte_identical_to_serialize_recipe(self):
+        qs = Recipe.objects.order_by("id")
+        self.assertEqual(recipe_page_json(qs), self.python_page_json(qs))
+
+    def test_float_durations_byte_identical(self):
+        # SQLite zapisuje REAL z 15 cyframi znaczącymi, obie strony zaokrąglają
+        for duration in [0.1 + 0.2, 1e-07, 12.345, 99999.999, 123456789.1234]:
+            Recipe.objects.filter(pk=self.r1.pk).update(audio_duration=duration)
+            qs = Recipe.objects.filter(pk=self.r1.pk)
+            with self.subTest(duration=duration):
+                self.assertEqual(recipe_page_json(qs), self.python_page_json(qs))
+
+    def test_keeps_page_order_and_slice(self):
+        qs = Recipe.objects.order_by("-name")[1:3]
+        self.assertEqual(recipe_page_json(qs), self.python_page_json(qs))
+
+    def test_empty_page(self):
+        self.assertEqual(recipe_page_json(Recipe.objects.none()), "[]")
+        self.assertEqual(recipe_page_json(Recipe.objects.filter(name="?")), "[]")
+
+    def test_query_count(self):
+        # Identyfikatory strony i JSON strony
+        qs = Recipe.objects.order_by("id")
+        with self.assertNumQueries(2):
+            recipe_page_json(qs)
+
+    def test_views_return_same_results(self):
+        for name, params in [
+            ("recipe_list", {"per_page": 2, "page": 2}),
+            ("recipe_filter", {"order_by": "-ingredients_count"}),
+            ("recipe_filter", {"cuisine": "Polska", "order_by": "name"}),
+        ]:
+            default = self.client.get(reverse(name), params).json()
+            with override_settings(RECIPE_SQL_SERIALIZER=True):
+                resp = self.client.get(reverse(name), params)
+            self.assertEqual(resp["Content-Type"], "application/json")
+            self.assertEqual(resp.json(), default)
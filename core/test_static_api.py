@@ -0,0 +1,74 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from urllib.parse import urlencode
+
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.models import Cuisine, Diet, Recipe
+from core.signals import catalog_updated
+
+
+class StaticApiTestCase(TransactionTestCase):
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output)
+        polska = Cuisine.objects.create(name="Polska kuchnia")
+        Diet.objects.create(name="Wegańska")
+        for i in range(25):
+            Recipe.objects.create(
+                name=f"Przepis {i}",
+                recipe="...",
+                image_path="",
+                audio_path="",
+                cuisine=polska,
+            )
+
+    def static_file(self, url, name):
+        return os.path.join(self.output, "current", url.strip("/"), name)
+
+    def test_render_command(self):
+        call_command(
+            "render_static_api",
+            "--output",
+            self.output,
+            "--pages",
+            "2",
+            "--workers",
+            "2",
+            stdout=io.StringIO(),
+        )
+        recipes = reverse("recipe_list")
+        with open(self.static_file(recipes, "index@page=2.json"), "rb") as f:
+            content = f.read()
+        self.assertEqual(content, self.client.get(recipes, {"page": 2}).content)
+        with open(self.static_file(recipes, "index@page=2.json.gz"), "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), content)
+        self.assertTrue(os.path.isfile(self.static_file(recipes, "index.json")))
+        self.assertFalse(os.path.exists(self.static_file(recipes, "index@page=3.json")))
+        self.assertTrue(
+            os.path.isfile(self.static_file(reverse("list_cuisines"), "index.json"))
+        )
+        query = urlencode({"cuisine": "Polska kuchnia"})
+        path = self.static_file(reverse("recipe_filter"), f"index@{query}.json")
+        with open(path, "rb") as f:
+            self.assertEqual(
+                f.read(), self.client.get(f"{reverse('recipe_filter')}?{query}").content
+            )
+
+    def test_rendered_after_import_with_atomic_swap(self):
+        with override_settings(STATIC_API_DIR=self.output, STATIC_API_PAGES=1):
+            for _ in range(4):
+                catalog_updated.send(sender=self.__class__)
+        releases = os.listdir(os.path.join(self.output, "releases"))
+        # Bieżąca wersja i dwie poprzednie
+        self.assertEqual(len(releases), 3)
+        current = os.readlink(os.path.join(self.output, "current"))
+        self.assertIn(os.path.basename(current), releases)
+        recipes = reverse("recipe_list")
+        self.assertTrue(os.path.isfile(self.static_file(recipes, "index@page=1.json")))
+        self.assertFalse(os.path.exists(self.static_file(recipes, "index@page=2.json")))
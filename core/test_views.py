@@ -61,6 +61,17 @@ class SerializeRecipeTestCase(TestCase):
             "recipe",
             "image_path",
             "audio_path",
+            "has_image",
+            "image_size",
+            "image_width",
+            "image_height",
+            "image_placeholder",
+            "image_color",
+            "has_audio",
+            "audio_size",
+            "audio_duration",
+            "audio_playlist",
+            "srcset",
         }
         self.assertEqual(set(data.keys()), expected_keys)
         self.assertEqual(data["diets"], ["D"])
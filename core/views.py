@@ -2,18 +2,32 @@
 Moduł widoków do obsługi API przepisów kulinarnych.
 """
 
+import json
 from typing import List, Optional
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.views import View
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.db.models import Count, OuterRef, Subquery, IntegerField
 
+from core.derivatives import image_srcset
+from core.facets import cached_facet_counts
+from core.filters import filter_recipes
+from core.media import audio_playlist_url
 from core.models import Cuisine, Diet, Ingredient, Recipe
+from core.query_language import QuerySyntaxError, apply_query
+from core.snapshot import current_snapshot
+from core.sql_serializers import DURATION_DECIMALS, recipe_page_json
 
 # Stałe
 DEFAULT_PER_PAGE = 10
 MAX_PER_PAGE = 25
 FILTER_MAX_PER_PAGE = 10
+DEFAULT_FACET_TOP = 20
+MAX_FACET_TOP = 100
+
+# Zwarty format JSON zgodny z wynikiem funkcji JSON SQLite
+COMPACT_JSON = {"ensure_ascii": False, "separators": (",", ":")}
 
 
 def clamp_int(
@@ -25,7 +39,7 @@ def clamp_int(
     """
     Bezpiecznie konwertuje parametr zapytania na int,
     ograniczając wartość między min_value a max_value.
-    
+
     :param value: Wartość do konwersji na liczbę całkowitą
     :type value: Optional[str]
     :param default: Domyślna wartość używana gdy konwersja nie powiedzie się
@@ -52,7 +66,7 @@ def get_pagination_page(paginator: Paginator, page_number: Optional[str]):
     """
     Zwraca stronę wyników z paginatora,
     obsługując nieprawidłowy lub brakujący numer strony.
-    
+
     :param paginator: Obiekt paginatora Django
     :type paginator: Paginator
     :param page_number: Numer strony do pobrania
@@ -68,12 +82,33 @@ def get_pagination_page(paginator: Paginator, page_number: Optional[str]):
         return paginator.page(paginator.num_pages)
 
 
+def pagination_data(paginator: Paginator, page_obj) -> dict:
+    """
+    Buduje słownik z metadanymi paginacji.
+
+    :param paginator: Obiekt paginatora Django
+    :type paginator: Paginator
+    :param page_obj: Obiekt strony z paginatora
+    :type page_obj: Page
+    :return: Słownik z metadanymi paginacji
+    :rtype: dict
+    """
+    return {
+        "total": paginator.count,
+        "per_page": paginator.per_page,
+        "current_page": page_obj.number,
+        "total_pages": paginator.num_pages,
+        "has_next": page_obj.has_next(),
+        "has_previous": page_obj.has_previous(),
+    }
+
+
 def json_paginated_response(
     items: List, paginator: Paginator, page_obj
 ) -> JsonResponse:
     """
     Buduje jednolitą odpowiedź JSON dla paginowanych endpointów.
-    
+
     :param items: Lista elementów do zwrócenia w odpowiedzi
     :type items: List
     :param paginator: Obiekt paginatora Django
@@ -86,22 +121,38 @@ def json_paginated_response(
     return JsonResponse(
         {
             "results": items,
-            "pagination": {
-                "total": paginator.count,
-                "per_page": paginator.per_page,
-                "current_page": page_obj.number,
-                "total_pages": paginator.num_pages,
-                "has_next": page_obj.has_next(),
-                "has_previous": page_obj.has_previous(),
-            },
+            "pagination": pagination_data(paginator, page_obj),
         }
     )
 
 
+def json_paginated_raw_response(
+    results_json: str, paginator: Paginator, page_obj
+) -> HttpResponse:
+    """
+    Buduje odpowiedź paginowaną z gotowego tekstu JSON wyników,
+    bez ponownego parsowania i serializacji elementów.
+
+    :param results_json: Tablica JSON z elementami strony
+    :type results_json: str
+    :param paginator: Obiekt paginatora Django
+    :type paginator: Paginator
+    :param page_obj: Obiekt strony z paginatora
+    :type page_obj: Page
+    :return: Odpowiedź HTTP w formacie JSON z paginowanymi danymi
+    :rtype: HttpResponse
+    """
+    pagination = json.dumps(pagination_data(paginator, page_obj), **COMPACT_JSON)
+    return HttpResponse(
+        f'{{"results":{results_json},"pagination":{pagination}}}',
+        content_type="application/json",
+    )
+
+
 def list_cuisines(request):
     """
     Zwraca listę nazw wszystkich kuchni.
-    
+
     :param request: Obiekt żądania HTTP
     :type request: HttpRequest
     :return: Lista nazw kuchni w formacie JSON
@@ -114,7 +165,7 @@ def list_cuisines(request):
 def list_diets(request):
     """
     Zwraca listę nazw wszystkich diet.
-    
+
     :param request: Obiekt żądania HTTP
     :type request: HttpRequest
     :return: Lista nazw diet w formacie JSON
@@ -128,7 +179,7 @@ def list_ingredients(request):
     """
     Zwraca paginowaną listę nazw składników,
     z opcjonalnym filtrowaniem po wyszukiwanym ciągu.
-    
+
     :param request: Obiekt żądania HTTP z parametrami: page, per_page, search
     :type request: HttpRequest
     :return: Paginowana lista nazw składników w formacie JSON
@@ -154,7 +205,7 @@ def list_ingredients(request):
 def serialize_recipe(recipe: Recipe) -> dict:
     """
     Serializuje instancję Recipe do słownika JSON-owalnego.
-    
+
     :param recipe: Obiekt przepisu do serializacji
     :type recipe: Recipe
     :return: Słownik z danymi przepisu gotowy do konwersji na JSON
@@ -168,9 +219,52 @@ def serialize_recipe(recipe: Recipe) -> dict:
         "recipe": recipe.recipe,
         "image_path": recipe.image_path,
         "audio_path": recipe.audio_path,
+        "has_image": recipe.has_image,
+        "image_size": recipe.image_size,
+        "image_width": recipe.image_width,
+        "image_height": recipe.image_height,
+        "image_placeholder": recipe.image_placeholder,
+        "image_color": recipe.image_color,
+        "has_audio": recipe.has_audio,
+        "audio_size": recipe.audio_size,
+        "audio_duration": (
+            round(recipe.audio_duration, DURATION_DECIMALS)
+            if recipe.audio_duration is not None
+            else None
+        ),
+        "audio_playlist": audio_playlist_url(
+            recipe.audio_path, recipe.has_audio_segments
+        ),
+        "srcset": image_srcset(recipe.image_path, recipe.has_image),
     }
 
 
+def recipe_page_response(qs, request, per_page: int) -> HttpResponse:
+    """
+    Paginuje QuerySet przepisów i zwraca stronę wyników w formacie JSON.
+
+    Gdy ustawienie ``RECIPE_SQL_SERIALIZER`` jest włączone, strona jest
+    budowana w SQL zamiast przez ``serialize_recipe``.
+
+    :param qs: QuerySet przepisów z filtrami i sortowaniem
+    :type qs: QuerySet
+    :param request: Obiekt żądania HTTP z parametrem page
+    :type request: HttpRequest
+    :param per_page: Liczba przepisów na stronie
+    :type per_page: int
+    :return: Paginowana lista przepisów w formacie JSON
+    :rtype: HttpResponse
+    """
+    paginator = Paginator(qs, per_page)
+    page_obj = get_pagination_page(paginator, request.GET.get("page"))
+    if settings.RECIPE_SQL_SERIALIZER:
+        return json_paginated_raw_response(
+            recipe_page_json(page_obj.object_list), paginator, page_obj
+        )
+    items = [serialize_recipe(r) for r in page_obj.object_list]
+    return json_paginated_response(items, paginator, page_obj)
+
+
 class RecipeListView(View):
     """
     Widok zwracający listę wszystkich przepisów, paginowaną.
@@ -179,17 +273,28 @@ class RecipeListView(View):
     def get(self, request):
         """
         Obsługuje GET: zwraca paginowaną listę przepisów.
-        
+
+        Gdy migawka katalogu jest włączona (``CATALOG_SNAPSHOT``), strona
+        jest wycinana z zamapowanego pliku bez zapytań do bazy.
+
         :param request: Obiekt żądania HTTP z parametrami: page, per_page
         :type request: HttpRequest
         :return: Paginowana lista przepisów w formacie JSON
         :rtype: JsonResponse
         """
-        page = request.GET.get("page")
         per_page = clamp_int(
             request.GET.get("per_page"), DEFAULT_PER_PAGE, max_value=MAX_PER_PAGE
         )
 
+        snapshot = current_snapshot()
+        if snapshot is not None:
+            paginator = Paginator(range(len(snapshot)), per_page)
+            page_obj = get_pagination_page(paginator, request.GET.get("page"))
+            positions = page_obj.object_list
+            return json_paginated_raw_response(
+                snapshot.page_json(positions.start, positions.stop), paginator, page_obj
+            )
+
         qs = (
             Recipe.objects.select_related("cuisine")
             .prefetch_related("diet", "ingredients")
@@ -197,11 +302,7 @@ class RecipeListView(View):
             .order_by("id")
         )
 
-        paginator = Paginator(qs, per_page)
-        page_obj = get_pagination_page(paginator, page)
-        items = [serialize_recipe(r) for r in page_obj.object_list]
-
-        return json_paginated_response(items, paginator, page_obj)
+        return recipe_page_response(qs, request, per_page)
 
 
 class RecipeFilterView(View):
@@ -212,49 +313,31 @@ class RecipeFilterView(View):
     def get(self, request):
         """
         Obsługuje GET: filtruje i sortuje przepisy na podstawie parametrów zapytania.
-        
+
+        Parametr ``q`` przyjmuje wyrażenie AND/OR/NOT (zob. ``core.query_language``),
+        a ``explain=1`` zwraca zamiast wyników plan tego wyrażenia i jego koszt.
+
         :param request: Obiekt żądania HTTP z parametrami filtrowania, sortowania i paginacji
         :type request: HttpRequest
         :return: Przefiltrowana i posortowana paginowana lista przepisów
         :rtype: JsonResponse
         :raises ValueError: Gdy podany parametr order_by jest nieprawidłowy
         """
-        page = request.GET.get("page")
         per_page = clamp_int(
             request.GET.get("per_page"), DEFAULT_PER_PAGE, max_value=FILTER_MAX_PER_PAGE
         )
 
-        qs = (
-            Recipe.objects.select_related("cuisine")
-            .prefetch_related("diet", "ingredients")
-            .distinct()
+        qs = Recipe.objects.select_related("cuisine").prefetch_related(
+            "diet", "ingredients"
         )
+        qs = filter_recipes(qs, request.GET)
 
-        # Filtry inkluzywne
-        cuisines = request.GET.getlist("cuisine")
-        if cuisines:
-            qs = qs.filter(cuisine__name__in=cuisines)
-
-        diets = request.GET.getlist("diet")
-        for diet in diets:
-            qs = qs.filter(diet__name=diet)
-
-        ingredients = request.GET.getlist("ingredient")
-        for ing in ingredients:
-            qs = qs.filter(ingredients__name=ing)
-
-        # Filtry ekskluzywne
-        exclude_cuisines = request.GET.getlist("exclude_cuisine")
-        if exclude_cuisines:
-            qs = qs.exclude(cuisine__name__in=exclude_cuisines)
-
-        exclude_diets = request.GET.getlist("exclude_diet")
-        if exclude_diets:
-            qs = qs.exclude(diet__name__in=exclude_diets)
-
-        exclude_ingredients = request.GET.getlist("exclude_ingredient")
-        if exclude_ingredients:
-            qs = qs.exclude(ingredients__name__in=exclude_ingredients)
+        # Wyrażenie filtrujące q (AND/OR/NOT)
+        query = request.GET.get("q")
+        try:
+            qs, plan, cached = apply_query(qs, query)
+        except QuerySyntaxError as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
         # Sortowanie
         order_by = request.GET.get("order_by")
@@ -266,11 +349,31 @@ class RecipeFilterView(View):
         else:
             qs = qs.order_by("id")
 
-        paginator = Paginator(qs, per_page)
-        page_obj = get_pagination_page(paginator, page)
-        items = [serialize_recipe(r) for r in page_obj.object_list]
+        if plan is not None and request.GET.get("explain") in ("1", "true"):
+            return JsonResponse(
+                {"explain": {**plan.explain(), "cached": cached, "sql": qs.explain()}}
+            )
+
+        return recipe_page_response(qs, request, per_page)
 
-        return json_paginated_response(items, paginator, page_obj)
+
+def recipe_facets(request):
+    """
+    Zwraca liczby przepisów pasujących do filtrów (te same parametry co
+    RecipeFilterView) łącznie oraz w podziale na kuchnie, diety
+    i najczęstsze składniki.
+
+    :param request: Obiekt żądania HTTP z parametrami filtrowania i top
+    :type request: HttpRequest
+    :return: Liczniki facet w formacie JSON
+    :rtype: JsonResponse
+    """
+    top = clamp_int(request.GET.get("top"), DEFAULT_FACET_TOP, max_value=MAX_FACET_TOP)
+    try:
+        facets = cached_facet_counts(request.GET, top)
+    except QuerySyntaxError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(facets)
 
 
 def apply_ordering(qs, order_by: str):
@@ -278,7 +381,7 @@ def apply_ordering(qs, order_by: str):
     Zastosuj kolejność dla querysetu przepisów na podstawie dozwolonych pól:
     name, cuisine, diet, ingredients_count.
     Prefix '-' dla porządku malejącego.
-    
+
     :param qs: QuerySet z przepisami do posortowania
     :type qs: QuerySet
     :param order_by: Pole po którym sortować, opcjonalnie z prefixem '-'
@@ -13,7 +13,21 @@ pdoc.render.configure(docformat="restructuredtext", search=True)
 
 modules_to_document = [
     "core.management.commands",
+    "core.assets",
+    "core.catalog",
+    "core.derivatives",
+    "core.facets",
+    "core.fields",
+    "core.filters",
+    "core.media",
     "core.models",
+    "core.query_budget",
+    "core.query_language",
+    "core.query_limits",
+    "core.slow_queries",
+    "core.snapshot",
+    "core.sql_serializers",
+    "core.static_api",
     "core.views",
 ]
 
@@ -5,28 +5,39 @@ Zawiera mapowanie ścieżek URL do odpowiednich widoków, umożliwiając
 dostęp do funkcji związanych z kuchniami, dietami, składnikami oraz przepisami.
 """
 
-from django.urls import path
+from django.urls import path, re_path
+from core.derivatives import serve_derivative
+from core.media import serve_media
 from core.views import (
     list_cuisines,
     list_diets,
     list_ingredients,
     RecipeListView,
     RecipeFilterView,
+    recipe_facets,
 )
 
 urlpatterns = [
     # ścieżka zwracająca listę wszystkich dostępnych kuchni
     path("cuisines/", list_cuisines, name="list_cuisines"),
-    
     # ścieżka zwracająca listę wszystkich dostępnych diet
     path("diets/", list_diets, name="list_diets"),
-    
     # ścieżka zwracająca paginowaną listę składników z opcjonalnym filtrowaniem
     path("ingredients/", list_ingredients, name="list_ingredients"),
-    
     # ścieżka zwracająca paginowaną listę wszystkich przepisów
     path("recipes/", RecipeListView.as_view(), name="recipe_list"),
-    
     # ścieżka zwracająca paginowaną listę przepisów z zaawansowanym filtrowaniem i sortowaniem
     path("recipes/filter/", RecipeFilterView.as_view(), name="recipe_filter"),
+    # ścieżka zwracająca liczby przepisów dla kuchni, diet i składników przy wybranych filtrach
+    path("recipes/facets/", recipe_facets, name="recipe_facets"),
+    # ścieżka zwracająca plik obrazu lub nagrania przepisu (Range, ETag, cache)
+    re_path(
+        r"^media/(?P<kind>images|audio)/(?P<path>.+)$", serve_media, name="serve_media"
+    ),
+    # ścieżka zwracająca pomniejszony obraz przepisu w formacie WebP lub JPEG
+    path(
+        "media/derived/<str:fmt>/<int:width>/<path:path>",
+        serve_derivative,
+        name="serve_derivative",
+    ),
 ]